@@ -0,0 +1,244 @@
+"""
+Vectorized mesh quality and GPU efficiency checks
+
+All functions work on numpy arrays as returned by ogre_mesh_buffers and do not need Ogre,
+so they can run on a worker thread or process.
+"""
+import numpy as np
+
+# render operation types, see ROP2STR in ogre_mesh_reader
+OT_TRIANGLE_LIST = 4
+OT_TRIANGLE_STRIP = 5
+OT_TRIANGLE_FAN = 6
+
+def triangles(indices, operation=OT_TRIANGLE_LIST):
+    """(n, 3) vertex indices of the triangles or None if operation does not produce triangles"""
+    indices = np.asarray(indices)
+    if operation == OT_TRIANGLE_LIST:
+        return indices[:len(indices) // 3 * 3].reshape(-1, 3)
+
+    if operation not in (OT_TRIANGLE_STRIP, OT_TRIANGLE_FAN):
+        return None
+    n = len(indices) - 2
+    if n <= 0:
+        return np.empty((0, 3), indices.dtype)
+
+    k = np.arange(n)
+    if operation == OT_TRIANGLE_FAN:
+        return np.stack([np.full(n, indices[0]), indices[k + 1], indices[k + 2]], axis=1)
+
+    # every other strip triangle has flipped winding
+    odd = k % 2 == 1
+    a = np.where(odd, indices[k + 1], indices[k])
+    b = np.where(odd, indices[k], indices[k + 1])
+    return np.stack([a, b, indices[k + 2]], axis=1)
+
+def index_degenerate(tris):
+    """mask of triangles referencing a vertex more than once"""
+    return (tris[:, 0] == tris[:, 1]) | (tris[:, 1] == tris[:, 2]) | (tris[:, 0] == tris[:, 2])
+
+def triangle_areas(tris, positions):
+    p = positions.astype(np.float64)
+    a, b, c = p[tris[:, 0]], p[tris[:, 1]], p[tris[:, 2]]
+    return 0.5 * np.linalg.norm(np.cross(b - a, c - a), axis=1)
+
+def zero_area(tris, positions, rel_eps=1e-12):
+    """mask of triangles without area, relative to the size of the mesh"""
+    extent = np.ptp(positions, axis=0).max() if len(positions) else 0
+    return triangle_areas(tris, positions) <= rel_eps * max(extent, 1e-30) ** 2
+
+def duplicate_triangles(tris):
+    """number of triangles using the same vertices as an earlier one, regardless of order"""
+    if len(tris) == 0:
+        return 0
+    _, counts = np.unique(np.sort(tris, axis=1), axis=0, return_counts=True)
+    return int((counts - 1).sum())
+
+def unreferenced_vertices(tris, vertex_count):
+    used = np.zeros(vertex_count, dtype=bool)
+    used[tris.ravel()] = True
+    return int(vertex_count - np.count_nonzero(used))
+
+def vertex_hashes(raw):
+    """64 bit hash over all attributes of each vertex, given as (vertexCount, vertexSize) uint8 rows"""
+    pad = -raw.shape[1] % 8
+    if pad:
+        raw = np.hstack([raw, np.zeros((len(raw), pad), dtype=np.uint8)])
+    words = np.ascontiguousarray(raw).view(np.uint64)
+
+    # FNV-1a over 64 bit words
+    h = np.full(len(words), 0xcbf29ce484222325, dtype=np.uint64)
+    for col in words.T:
+        h = (h ^ col) * np.uint64(0x100000001b3)
+    return h
+
+def duplicate_vertices(raw):
+    """number of vertices equal to an earlier one in position and all other attributes"""
+    if len(raw) == 0:
+        return 0
+    return len(raw) - len(np.unique(vertex_hashes(raw)))
+
+def previous_use(indices):
+    """position of the previous occurrence of each index in the stream, -1 for the first one"""
+    order = np.argsort(indices, kind="stable")
+    prev = np.full(len(indices), -1, dtype=np.int64)
+    same = indices[order[1:]] == indices[order[:-1]]
+    prev[order[1:][same]] = order[:-1][same]
+    return prev
+
+def cache_misses(indices, cache_size=16, max_window=None):
+    """
+    mask of the indices causing a vertex shader invocation with a LRU post-transform cache
+
+    An index hits if fewer than cache_size distinct vertices were used since its previous use.
+    That is counted vectorized over the reuse window, which is bounded by max_window
+    (default 8 * cache_size). Longer windows are counted as misses.
+    """
+    indices = np.asarray(indices).ravel()
+    if max_window is None:
+        max_window = 8 * cache_size
+
+    n = len(indices)
+    prev = previous_use(indices)
+    gap = np.arange(n) - prev
+
+    miss = (prev < 0) | (gap > max_window)
+
+    # a window of up to cache_size indices cannot hold cache_size distinct vertices, so only check longer ones
+    cand = np.nonzero((prev >= 0) & (gap > cache_size) & (gap <= max_window))[0]
+    p = prev[cand]
+    g = gap[cand]
+    distinct = np.zeros(len(cand), dtype=np.int64)
+
+    for d in range(1, max_window):
+        # index cand - d is new within the window if it was not used since p
+        distinct += prev[cand - d] <= p
+        done = (d + 1 >= g) | (distinct >= cache_size)
+        if done.any():
+            miss[cand[done]] = distinct[done] >= cache_size
+            keep = ~done
+            cand, p, g, distinct = cand[keep], p[keep], g[keep], distinct[keep]
+        if len(cand) == 0:
+            break
+    return miss
+
+def acmr(tris, cache_size=16, max_window=None):
+    """average cache miss ratio, vertex shader invocations per triangle"""
+    if len(tris) == 0:
+        return 0.0
+    return float(np.count_nonzero(cache_misses(tris.ravel(), cache_size, max_window)) / len(tris))
+
+def overdraw(tris, positions, resolution=256, max_samples=1 << 22, seed=0):
+    """
+    average depth complexity of the front faces, seen orthographically from the six axis directions
+
+    The projected areas are summed and divided by the covered area, which is estimated by
+    scattering random points over each triangle into a resolution^2 grid.
+    """
+    if len(tris) == 0:
+        return 0.0
+    p = positions.astype(np.float64)
+    a, b, c = p[tris[:, 0]], p[tris[:, 1]], p[tris[:, 2]]
+    normals = np.cross(b - a, c - a)
+    rng = np.random.default_rng(seed)
+
+    ret = []
+    for axis in range(3):
+        u, v = [i for i in range(3) if i != axis]
+        lo = p[:, [u, v]].min(axis=0)
+        scale = (resolution - 1) / max(np.ptp(p[:, [u, v]], axis=0).max(), 1e-30)
+        # twice the signed projected area in pixels
+        area2 = normals[:, axis] * scale ** 2
+
+        for sign in (1, -1):
+            front = np.nonzero(sign * area2 > 0)[0]
+            if len(front) == 0:
+                continue
+            area = np.abs(area2[front]) / 2
+
+            # about 2 samples per pixel, at least one per triangle
+            counts = np.maximum(1, np.ceil(area * 2)).astype(np.int64)
+            if counts.sum() > max_samples:
+                counts = np.maximum(1, (counts * (max_samples / counts.sum())).astype(np.int64))
+            tri = np.repeat(front, counts)
+
+            r1 = np.sqrt(rng.random(len(tri)))
+            r2 = rng.random(len(tri))
+            w = np.stack([1 - r1, r1 * (1 - r2), r1 * r2], axis=1)
+            pts = w[:, :1] * a[tri][:, [u, v]] + w[:, 1:2] * b[tri][:, [u, v]] + w[:, 2:] * c[tri][:, [u, v]]
+            pix = np.clip(((pts - lo) * scale).astype(np.int64), 0, resolution - 1)
+            covered = len(np.unique(pix[:, 0] * resolution + pix[:, 1]))
+
+            ret.append(area.sum() / covered)
+    return float(np.mean(ret)) if ret else 0.0
+
+def analyze_submesh(indices, operation, raw_vertices, positions, index_bits, cache_size=16, shared=False):
+    """the quality report of a single submesh as json serializable dict"""
+    vertex_count = len(raw_vertices)
+    ret = {"triangles": 0, "operation_supported": True,
+           "wasteful_32bit": index_bits == 32 and vertex_count <= 0x10000}
+
+    if indices is None:
+        indices = np.arange(vertex_count, dtype=np.uint32)
+    tris = triangles(indices, operation)
+    if tris is None:
+        ret["operation_supported"] = False
+        return ret
+
+    tris = tris.astype(np.int64)
+    ret["triangles"] = len(tris)
+    degenerate = index_degenerate(tris)
+    ret["degenerate_triangles"] = int(np.count_nonzero(degenerate | zero_area(tris, positions)))
+    ret["duplicate_triangles"] = duplicate_triangles(tris[~degenerate])
+    # unused shared vertices may be referenced by another submesh
+    ret["unreferenced_vertices"] = None if shared else unreferenced_vertices(tris, vertex_count)
+    ret["duplicate_vertices"] = None if shared else duplicate_vertices(raw_vertices)
+    ret["acmr"] = acmr(tris, cache_size)
+    # 0.5 is the best case for a regular grid, 3 the worst case
+    ret["atvr"] = ret["acmr"] * len(tris) / max(1, len(np.unique(tris)))
+    return ret
+
+def analyze_mesh(submeshes, shared=None, cache_size=16):
+    """
+    quality report of a mesh as json serializable dict
+
+    submeshes is a list of dicts with indices, operation, raw_vertices, positions and index_bits,
+    where raw_vertices and positions are None for submeshes using the shared vertices given by shared.
+    """
+    ret = {"cache_size": cache_size, "submeshes": []}
+    all_tris = []
+    all_pos = []
+    base = 0
+
+    if shared is not None:
+        ret["shared_duplicate_vertices"] = duplicate_vertices(shared["raw_vertices"])
+        all_pos.append(shared["positions"])
+        base = len(shared["positions"])
+        shared_used = np.zeros(base, dtype=bool)
+
+    for sm in submeshes:
+        is_shared = sm["raw_vertices"] is None
+        raw = shared["raw_vertices"] if is_shared else sm["raw_vertices"]
+        pos = shared["positions"] if is_shared else sm["positions"]
+
+        info = analyze_submesh(sm["indices"], sm["operation"], raw, pos, sm["index_bits"], cache_size, is_shared)
+        ret["submeshes"].append(info)
+        if not info["operation_supported"]:
+            continue
+
+        indices = sm["indices"] if sm["indices"] is not None else np.arange(len(raw))
+        tris = triangles(indices, sm["operation"]).astype(np.int64)
+        if is_shared:
+            shared_used[tris.ravel()] = True
+            all_tris.append(tris)
+        else:
+            all_tris.append(tris + base)
+            all_pos.append(pos)
+            base += len(pos)
+
+    if shared is not None:
+        ret["shared_unreferenced_vertices"] = int(len(shared_used) - np.count_nonzero(shared_used))
+
+    if all_tris:
+        ret["overdraw"] = overdraw(np.concatenate(all_tris), np.concatenate(all_pos))
+    return ret
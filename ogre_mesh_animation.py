@@ -0,0 +1,142 @@
+"""
+Bake skeletal animations to poses at a fixed rate and measure what playing animations costs
+
+A baked animation stores the local transform of every bone per sample, so scrubbing only sets
+the bones instead of evaluating the keyframe tracks. Vertex animation is not baked, as its
+keyframes already are the vertex positions to blend.
+"""
+import collections
+import math
+import time
+
+import Ogre
+
+class BakedAnimation:
+    """bone transforms of one skeletal animation, sampled rate times per second"""
+
+    def __init__(self, name, length, rate, poses):
+        self.name = name
+        self.length = length
+        self.rate = rate
+        self.poses = poses  # per sample, (position, orientation, scale) per bone
+
+    def pose(self, time_pos):
+        i = int(round(time_pos * self.rate))
+        return self.poses[min(max(i, 0), len(self.poses) - 1)]
+
+def _isolate(states, name):
+    """enable only the named animation state, returning what to restore"""
+    saved = {n: (s.getEnabled(), s.getTimePosition()) for n, s in states.items()}
+    for n, s in states.items():
+        s.setEnabled(n == name)
+    return saved
+
+def _restore(states, saved):
+    for n, (enabled, time_pos) in saved.items():
+        states[n].setEnabled(enabled)
+        states[n].setTimePosition(time_pos)
+
+def bake_animation(entity, name, rate=30):
+    """sample the skeletal animation name of entity"""
+    release_bones(entity)
+    skel = entity.getSkeleton()
+    state_set = entity.getAllAnimationStates()
+    states = dict(state_set.getAnimationStates().items())
+    astate = states[name]
+    bones = skel.getBones()
+
+    poses = []
+    saved = _isolate(states, name)
+    try:
+        for i in range(int(math.ceil(astate.getLength() * rate)) + 1):
+            astate.setTimePosition(min(i / rate, astate.getLength()))
+            skel.setAnimationState(state_set)
+            poses.append([(Ogre.Vector3(b.getPosition()), Ogre.Quaternion(b.getOrientation()),
+                           Ogre.Vector3(b.getScale())) for b in bones])
+    finally:
+        _restore(states, saved)
+    return BakedAnimation(name, astate.getLength(), rate, poses)
+
+def apply_pose(entity, baked, time_pos):
+    """pose the skeleton of entity from baked, taking the bones over from the animation states"""
+    for bone, (pos, orient, scale) in zip(entity.getSkeleton().getBones(), baked.pose(time_pos)):
+        bone.setManuallyControlled(True)
+        bone.setPosition(pos)
+        bone.setOrientation(orient)
+        bone.setScale(scale)
+
+def release_bones(entity):
+    """hand the bones back to the animation states"""
+    if entity.hasSkeleton():
+        for bone in entity.getSkeleton().getBones():
+            bone.setManuallyControlled(False)
+
+class AnimationProfiler:
+    """
+    measures each animation over several frames, one sample per frame
+
+    Entity._updateAnimation evaluates the skeleton and skins the vertices at most once per frame,
+    so it is called by step before the frame renders. Each sample is taken with software skinning
+    forced and as configured, which is hardware skinning if the materials support it.
+    """
+
+    def __init__(self, entity, baked=None, samples=20):
+        self.entity = entity
+        self.baked = baked or {}
+        self.state_set = entity.getAllAnimationStates()
+        self.states = dict(self.state_set.getAnimationStates().items())
+        self.saved = {n: (s.getEnabled(), s.getTimePosition()) for n, s in self.states.items()}
+        self.queue = collections.deque((name, software, i / samples) for name in self.states
+                                       for software in (True, False) for i in range(samples))
+        self.times = collections.defaultdict(list)  # (animation, measurement): [ms]
+        self.software = False
+        self.hardware = entity.isHardwareAnimationEnabled()
+
+    def _end_sample(self):
+        if self.software:
+            self.entity.removeSoftwareAnimationRequest(False)
+            self.software = False
+
+    def step(self):
+        """take the next sample, returns False once done"""
+        self._end_sample()
+        if not self.queue:
+            self.finish()
+            return False
+
+        name, self.software, fraction = self.queue.popleft()
+        astate = self.states[name]
+        _isolate(self.states, name)
+        astate.setTimePosition(astate.getLength() * fraction)
+        if self.software:
+            self.entity.addSoftwareAnimationRequest(False)
+
+        skel = self.entity.getSkeleton() if self.entity.hasSkeleton() else None
+        if skel is not None and not self.software:
+            start = time.perf_counter()
+            skel.setAnimationState(self.state_set)
+            self.times[(name, "evaluate")].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        self.entity._updateAnimation()
+        self.times[(name, "software" if self.software else "configured")].append((time.perf_counter() - start) * 1000)
+
+        if name in self.baked and not self.software:
+            start = time.perf_counter()
+            apply_pose(self.entity, self.baked[name], astate.getTimePosition())
+            self.times[(name, "baked")].append((time.perf_counter() - start) * 1000)
+            release_bones(self.entity)
+        return True
+
+    def finish(self):
+        """stop early or after the last sample, restoring the animation states"""
+        self._end_sample()
+        self.queue.clear()
+        _restore(self.states, self.saved)
+
+    def results(self):
+        """{animation: {measurement: mean ms}}, software and configured include evaluating the animation"""
+        ret = collections.defaultdict(dict)
+        for (name, key), ms in self.times.items():
+            ret[name][key] = sum(ms) / len(ms)
+        return dict(ret)
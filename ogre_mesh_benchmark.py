@@ -0,0 +1,338 @@
+"""
+Reproducible performance benchmark of the mesh viewer
+
+Each scenario generates a synthetic mesh, loads it into MeshViewer and times loading until all submeshes
+are shown, the first frame, steady state frames with the sidebar expanded, picking and taking a screenshot.
+Every scenario runs in a fresh process with a hidden window, so no GPU is needed: by default the GL
+render system is forced to software rasterization and started inside xvfb-run when there is no display.
+
+The results are written as json and can be compared against an earlier run with --compare.
+"""
+import json
+import os.path
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCENARIOS = {
+    "small": {"submeshes": 1, "vertices": 1000},
+    "many_submeshes": {"submeshes": 256, "vertices": 500},
+    "large_32bit": {"submeshes": 1, "vertices": 1000000, "index_bits": 32},
+    "lods": {"submeshes": 4, "vertices": 50000, "lod_levels": 3},
+    "skinned": {"submeshes": 2, "vertices": 20000, "bones": 32, "animations": 2},
+}
+
+RS_GL = "OpenGL 3+ Rendering Subsystem"
+RS_TINY = "Tiny Rendering Subsystem"
+
+# only timings are compared, lower is better
+def timings(result):
+    return {k: v for k, v in result.items() if k.endswith("_ms")}
+
+def grid(vertices, offset):
+    """triangulated height field with about the given number of vertices as positions, normals, uvs, indices"""
+    import numpy as np
+
+    side = max(2, int(vertices ** 0.5))
+    u, v = np.meshgrid(np.linspace(0, 1, side, dtype=np.float32), np.linspace(0, 1, side, dtype=np.float32))
+    u, v = u.ravel(), v.ravel()
+    h = 0.05 * np.sin(u * 20) * np.cos(v * 20)
+    pos = np.stack([u + offset, v, h], axis=1).astype(np.float32)
+    nrm = np.tile(np.float32([0, 0, 1]), (len(pos), 1))
+    uv = np.stack([u, v], axis=1)
+
+    i = np.arange(side - 1)
+    quad = (i[None, :] + i[:, None] * side).ravel()
+    idx = np.stack([quad, quad + 1, quad + side, quad + 1, quad + side + 1, quad + side], axis=1)
+    return pos, nrm, uv, idx.ravel()
+
+def build_skeleton(name, group, bones, animations):
+    """chain of bones along y, each animation bending it differently"""
+    import Ogre
+
+    skel = Ogre.SkeletonManager.getSingleton().create(name, group, True)
+    bone = skel.createBone(0)
+    for handle in range(1, bones):
+        bone = bone.createChild(handle, Ogre.Vector3(0, 1 / bones, 0))
+    skel.setBindingPose()
+
+    for a in range(animations):
+        anim = skel.createAnimation("Bend{}".format(a), 2)
+        axis = Ogre.Vector3.UNIT_Z if a % 2 == 0 else Ogre.Vector3.UNIT_X
+        for handle in range(bones):
+            track = anim.createNodeTrack(handle, skel.getBone(handle))
+            for t in range(3):
+                kf = track.createNodeKeyFrame(t)
+                kf.setRotation(Ogre.Quaternion(Ogre.Radian(0.1 * (t % 2)), axis))
+    return skel
+
+def build_mesh(name, group, submeshes=1, vertices=1000, index_bits=16, skeleton=None):
+    import numpy as np
+
+    import Ogre
+    from ogre_mesh_buffers import create_index_buffer, create_vertex_buffer, interleave
+
+    mesh = Ogre.MeshManager.getSingleton().createManual(name, group)
+    if skeleton is not None:
+        mesh.setSkeletonName(skeleton.getName())
+        bones = skeleton.getNumBones()
+
+    for s in range(submeshes):
+        pos, nrm, uv, idx = grid(vertices, s * 1.1)
+
+        vdata = Ogre.VertexData()
+        vdata.vertexCount = len(pos)
+        decl = vdata.vertexDeclaration
+        decl.addElement(0, 0, Ogre.VET_FLOAT3, Ogre.VES_POSITION)
+        decl.addElement(0, 12, Ogre.VET_FLOAT3, Ogre.VES_NORMAL)
+        decl.addElement(0, 24, Ogre.VET_FLOAT2, Ogre.VES_TEXTURE_COORDINATES)
+        vdata.vertexBufferBinding.setBinding(0, create_vertex_buffer(interleave(pos, nrm, uv)))
+
+        sm = mesh.createSubMesh()
+        sm.useSharedVertices = False
+        vdata.disown()  # owned by the submesh now
+        sm.vertexData = vdata
+        sm.indexData.indexBuffer = create_index_buffer(idx, index_bits == 32)
+        sm.indexData.indexCount = len(idx)
+        sm.setMaterialName("BaseWhite")
+
+        if skeleton is not None:
+            owner = np.minimum((pos[:, 1] * bones).astype(int), bones - 1)
+            for vi, bi in enumerate(owner):
+                vba = Ogre.VertexBoneAssignment()
+                vba.vertexIndex = vi
+                vba.boneIndex = int(bi)
+                vba.weight = 1
+                sm.addBoneAssignment(vba)
+
+    size = submeshes * 1.1
+    mesh._setBounds(Ogre.AxisAlignedBox(Ogre.Vector3(0, 0, -0.1), Ogre.Vector3(size, 1, 0.1)))
+    mesh._setBoundingSphereRadius(size / 2 + 1)
+    return mesh
+
+def generate(outdir, name, submeshes=1, vertices=1000, index_bits=16, lod_levels=0, bones=0, animations=0):
+    """
+    write the synthetic mesh and its manual LOD meshes to outdir
+
+    the bindings cannot serialize skeletons, so the skeleton is kept as a manual resource
+    that the mesh finds by name when it is loaded in this process.
+    """
+    import Ogre
+
+    mesh_mgr = Ogre.MeshManager.getSingleton()
+    serializer = Ogre.MeshSerializer()
+    group = Ogre.RGN_DEFAULT
+
+    skeleton = None
+    if bones:
+        skeleton = build_skeleton(name + ".skeleton", group, bones, animations)
+
+    mesh = build_mesh(name + ".mesh", group, submeshes, vertices, index_bits, skeleton)
+
+    if lod_levels:
+        mesh._setLodInfo(lod_levels + 1)
+        strategy = mesh.getLodStrategy()
+        for level in range(1, lod_levels + 1):
+            lod_name = "{}_lod{}.mesh".format(name, level)
+            lod = build_mesh(lod_name, group, submeshes, vertices // 4 ** level, index_bits)
+            serializer.exportMesh(lod, os.path.join(outdir, lod_name))
+            mesh_mgr.remove(lod)
+
+            usage = Ogre.MeshLodUsage()
+            usage.userValue = 5.0 * level * mesh.getBoundingSphereRadius()
+            usage.value = strategy.transformUserValue(usage.userValue)
+            usage.manualName = lod_name
+            mesh._setLodUsage(level, usage)
+
+    path = os.path.join(outdir, name + ".mesh")
+    serializer.exportMesh(mesh, path)
+    mesh_mgr.remove(mesh)
+    return path
+
+def median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+def run_scenario(name, outdir, rendersystem, frames, size=(1280, 720)):
+    """run a single scenario in this process and return the measurements"""
+    import Ogre.Bites as OgreBites
+    from ogre_mesh_viewer import MeshViewer
+
+    params = SCENARIOS[name]
+
+    class BenchmarkViewer(MeshViewer):
+
+        def oneTimeConfig(self):
+            root = self.getRoot()
+            root.setRenderSystem(root.getRenderSystemByName(rendersystem))
+            return True
+
+        def createWindow(self, title, w, h, misc):
+            # fixed size, no vsync, and nothing shown on screen
+            misc = dict(misc)
+            misc.update(hidden="true", vsync="false")
+            return OgreBites.ApplicationContext.createWindow(self, title, size[0], size[1], misc)
+
+        def locateResources(self):
+            generate(outdir, "bench_" + name, **params)
+            MeshViewer.locateResources(self)
+
+        def setup(self):
+            start = time.perf_counter()
+            MeshViewer.setup(self)
+            self.setup_ms = (time.perf_counter() - start) * 1000
+
+    app = BenchmarkViewer(os.path.join(outdir, "bench_{}.mesh".format(name)), None)
+    app.initApp()
+    root = app.getRoot()
+
+    # the mesh is loaded in the background over the following frames
+    start = time.perf_counter()
+    while app.loader is not None:
+        if app.loader.error:
+            raise RuntimeError(app.loader.error)
+        root.renderOneFrame()
+    ret = {"setup_ms": app.setup_ms, "loaded_ms": (time.perf_counter() - start) * 1000,
+           "load_ms": app.summary["load_time"] * 1000,
+           "vertices": sum(sm["vertices"] for sm in app.summary["submeshes"]),
+           "indices": sum(sm["indices"] for sm in app.summary["submeshes"])}
+
+    ret["first_frame_ms"] = median_time(root.renderOneFrame, 1)
+
+    app.gui.expand_all = True
+    for _ in range(30):
+        root.renderOneFrame()
+    app.profiler.frames.clear()
+    for _ in range(frames):
+        root.renderOneFrame()
+
+    p50, p95, p99 = app.profiler.percentiles()
+    ret.update(frame_mean_ms=statistics.mean(f[0] for f in app.profiler.frames),
+               frame_p50_ms=p50, frame_p95_ms=p95, frame_p99_ms=p99)
+    for phase, ms in app.profiler.phase_means().items():
+        ret["phase_{}_ms".format(phase)] = ms
+
+    # picking is triangle exact once the BVH is built in the background
+    while app.mesh_bvh(app.entity.getMesh()) is None:
+        root.renderOneFrame()
+
+    vp = app.cam.getViewport()
+    ret["pick_ms"] = median_time(lambda: app.pick(vp.getActualWidth() / 2, vp.getActualHeight() / 2), 50)
+    ret["screenshot_ms"] = median_time(app._save_screenshot, 3)
+
+    app.closeApp()
+    return ret
+
+def child_command(name, args, result_path):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", name, "--result", result_path,
+           "--rendersystem", args.rendersystem, "--frames", str(args.frames)]
+
+    env = dict(os.environ)
+    if args.rendersystem == RS_GL:
+        if not args.hardware_gl:
+            # identical rasterizer on every machine
+            env["LIBGL_ALWAYS_SOFTWARE"] = "1"
+        if not env.get("DISPLAY") and shutil.which("xvfb-run"):
+            cmd = ["xvfb-run", "-a", "-s", "-screen 0 1920x1080x24"] + cmd
+    return cmd, env
+
+def run_all(args):
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        runs = []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                result_path = os.path.join(tmpdir, "result.json")
+                cmd, env = child_command(name, args, result_path)
+                proc = subprocess.run(cmd, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+                if proc.returncode != 0 or not os.path.exists(result_path):
+                    sys.stderr.write(proc.stderr)
+                    raise RuntimeError("scenario '{}' failed".format(name))
+                with open(result_path) as f:
+                    runs.append(json.load(f))
+
+        # the median over the repetitions is less sensitive to a single slow run
+        results[name] = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        print("{}: {}".format(name, ", ".join("{} {:.2f}".format(k, v) for k, v in timings(results[name]).items())),
+              file=sys.stderr)
+    return results
+
+def metadata(args):
+    import Ogre
+
+    ret = {"date": time.strftime("%Y-%m-%dT%H:%M:%S"), "ogre": Ogre.__version__, "python": platform.python_version(),
+           "platform": platform.platform(), "rendersystem": args.rendersystem, "software_gl": not args.hardware_gl,
+           "frames": args.frames, "repeat": args.repeat}
+    try:
+        ret["revision"] = subprocess.check_output(["git", "rev-parse", "HEAD"], text=True,
+                                                  cwd=os.path.dirname(os.path.abspath(__file__)),
+                                                  stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return ret
+
+def compare(old, new, threshold):
+    """print the ratio of each timing and return the number of regressions beyond threshold"""
+    regressions = 0
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        base = timings(old["results"][name])
+        for key, value in timings(result).items():
+            if key not in base:
+                continue
+            ratio = value / base[key] if base[key] > 0 else 1
+            mark = ""
+            if ratio > 1 + threshold:
+                mark = "  REGRESSION"
+                regressions += 1
+            print("{:16} {:22} {:10.3f} {:10.3f} {:6.2f}x{}".format(name, key, base[key], value, ratio, mark),
+                  file=sys.stderr)
+    return regressions
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="benchmark the Ogre Mesh Viewer with synthetic meshes")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run, can be repeated (default: all)")
+    parser.add_argument("-o", "--output", help="write the results json to this file instead of stdout")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="compare against the results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown reported as regression by --compare (default: 0.1)")
+    parser.add_argument("--frames", type=int, default=300, help="number of measured steady state frames")
+    parser.add_argument("--repeat", type=int, default=1, help="run each scenario this often and keep the median")
+    parser.add_argument("--rendersystem", default=RS_GL, help="render system name, e.g. '{}' (default: %(default)s)".format(RS_TINY))
+    parser.add_argument("--hardware-gl", action="store_true", help="do not force software rasterization")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with tempfile.TemporaryDirectory() as outdir:
+            result = run_scenario(args.child, outdir, args.rendersystem, args.frames)
+        with open(args.result, "w") as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    report = {"meta": metadata(args), "results": run_all(args)}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        sys.exit(1 if compare(old, report, args.threshold) else 0)
@@ -0,0 +1,121 @@
+"""
+Copy vertex and index data between Ogre hardware buffers and numpy arrays
+"""
+import numpy as np
+
+import Ogre
+
+# numpy dtype and component count per vertex element type, indexed like VET2STR
+VET2DTYPE = {
+    Ogre.VET_FLOAT1: (np.float32, 1), Ogre.VET_FLOAT2: (np.float32, 2),
+    Ogre.VET_FLOAT3: (np.float32, 3), Ogre.VET_FLOAT4: (np.float32, 4),
+    Ogre.VET_SHORT1: (np.int16, 1), Ogre.VET_SHORT2: (np.int16, 2),
+    Ogre.VET_SHORT3: (np.int16, 3), Ogre.VET_SHORT4: (np.int16, 4),
+    Ogre.VET_UBYTE4: (np.uint8, 4), Ogre.VET_UBYTE4_NORM: (np.uint8, 4),
+    Ogre.VET_BYTE4: (np.int8, 4), Ogre.VET_BYTE4_NORM: (np.int8, 4),
+    Ogre.VET_SHORT2_NORM: (np.int16, 2), Ogre.VET_SHORT4_NORM: (np.int16, 4),
+    Ogre.VET_USHORT2_NORM: (np.uint16, 2), Ogre.VET_USHORT4_NORM: (np.uint16, 4),
+    Ogre.VET_DOUBLE1: (np.float64, 1), Ogre.VET_DOUBLE2: (np.float64, 2),
+    Ogre.VET_DOUBLE3: (np.float64, 3), Ogre.VET_DOUBLE4: (np.float64, 4),
+    Ogre.VET_USHORT1: (np.uint16, 1), Ogre.VET_USHORT2: (np.uint16, 2),
+    Ogre.VET_USHORT3: (np.uint16, 3), Ogre.VET_USHORT4: (np.uint16, 4),
+    Ogre.VET_INT1: (np.int32, 1), Ogre.VET_INT2: (np.int32, 2),
+    Ogre.VET_INT3: (np.int32, 3), Ogre.VET_INT4: (np.int32, 4),
+    Ogre.VET_UINT1: (np.uint32, 1), Ogre.VET_UINT2: (np.uint32, 2),
+    Ogre.VET_UINT3: (np.uint32, 3), Ogre.VET_UINT4: (np.uint32, 4),
+    Ogre.VET_INT_10_10_10_2_NORM: (np.uint32, 1),
+}
+
+def read_buffer(buf):
+    """copy of a hardware buffer as uint8 array"""
+    ret = np.empty(buf.getSizeInBytes(), dtype=np.uint8)
+    buf.readData(0, ret.nbytes, ret)
+    return ret
+
+def write_buffer(buf, arr):
+    arr = np.ascontiguousarray(arr)
+    buf.writeData(0, arr.nbytes, arr, True)
+
+def read_indices(index_data):
+    """indices of an IndexData as uint32 array"""
+    ibuf = index_data.indexBuffer
+    dtype = np.uint32 if ibuf.getType() == Ogre.HardwareIndexBuffer.IT_32BIT else np.uint16
+    raw = read_buffer(ibuf).view(dtype)
+    return raw[index_data.indexStart:index_data.indexStart + index_data.indexCount].astype(np.uint32)
+
+def read_vertex_buffers(vertex_data):
+    """raw vertices of all bound buffers as {source: (vertexCount, vertexSize) uint8 array}"""
+    ret = {}
+    bindings = vertex_data.vertexBufferBinding
+    for source, buf in bindings.getBindings().items():
+        raw = read_buffer(buf).reshape(-1, buf.getVertexSize())
+        ret[source] = raw[vertex_data.vertexStart:vertex_data.vertexStart + vertex_data.vertexCount]
+    return ret
+
+def read_element(vertex_data, semantic, index=0, buffers=None):
+    """the values of one vertex element as (vertexCount, components) array or None if it does not exist"""
+    elem = vertex_data.vertexDeclaration.findElementBySemantic(semantic, index)
+    if elem is None:
+        return None
+    if buffers is None:
+        buffers = read_vertex_buffers(vertex_data)
+
+    dtype, count = VET2DTYPE[elem.getType()]
+    raw = buffers[elem.getSource()]
+    nbytes = np.dtype(dtype).itemsize * count
+    return raw[:, elem.getOffset():elem.getOffset() + nbytes].copy().view(dtype).reshape(-1, count)
+
+def create_vertex_buffer(vertices, usage=Ogre.HBU_GPU_ONLY, shadow=False):
+    """hardware buffer holding vertices given as (vertexCount, vertexSize) uint8 array"""
+    vertices = np.ascontiguousarray(vertices, dtype=np.uint8)
+    hbm = Ogre.HardwareBufferManager.getSingleton()
+    buf = hbm.createVertexBuffer(vertices.shape[1], vertices.shape[0], usage, shadow)
+    write_buffer(buf, vertices)
+    return buf
+
+def create_index_buffer(indices, use32bit=None, usage=Ogre.HBU_GPU_ONLY, shadow=False):
+    """hardware buffer holding indices, 16 bit if they fit unless use32bit is given"""
+    if use32bit is None:
+        use32bit = len(indices) > 0 and int(indices.max()) > 0xFFFF
+    dtype = np.uint32 if use32bit else np.uint16
+    itype = Ogre.HardwareIndexBuffer.IT_32BIT if use32bit else Ogre.HardwareIndexBuffer.IT_16BIT
+
+    hbm = Ogre.HardwareBufferManager.getSingleton()
+    buf = hbm.createIndexBuffer(itype, len(indices), usage, shadow)
+    write_buffer(buf, np.asarray(indices, dtype=dtype))
+    return buf
+
+def interleave(*columns):
+    """pack per vertex arrays, e.g. float32 positions and normals, into (vertexCount, vertexSize) uint8 rows"""
+    n = len(columns[0])
+    return np.hstack([np.ascontiguousarray(c).reshape(n, -1).view(np.uint8) for c in columns])
+
+def read_vertex_data(vertex_data):
+    """all attributes as (vertexCount, vertexSize) uint8 rows and the positions as float32"""
+    buffers = read_vertex_buffers(vertex_data)
+    raw = np.hstack([buffers[source] for source in sorted(buffers)])
+    positions = read_element(vertex_data, Ogre.VES_POSITION, buffers=buffers)[:, :3].astype(np.float32)
+    return raw, positions
+
+def read_mesh_buffers(mesh):
+    """
+    copy the geometry of a mesh into numpy arrays as expected by ogre_mesh_analysis.analyze_mesh
+
+    returns the submeshes and the shared vertex data or None
+    """
+    shared = None
+    if mesh.sharedVertexData:
+        raw, positions = read_vertex_data(mesh.sharedVertexData)
+        shared = {"raw_vertices": raw, "positions": positions}
+
+    submeshes = []
+    for sm in mesh.getSubMeshes():
+        info = {"operation": sm.operationType, "raw_vertices": None, "positions": None, "indices": None,
+                "index_bits": None}
+        if sm.indexData.indexCount:
+            info["indices"] = read_indices(sm.indexData)
+            info["index_bits"] = sm.indexData.indexBuffer.getIndexSize() * 8
+        if not sm.useSharedVertices:
+            info["raw_vertices"], info["positions"] = read_vertex_data(sm.vertexData)
+        submeshes.append(info)
+    return submeshes, shared
@@ -0,0 +1,143 @@
+"""
+Bounding volume hierarchy for triangle exact ray picking
+
+The triangles are sorted along a Morton curve and grouped into fixed size leaves.
+The inner nodes form an implicit tree with a wide branching factor, so both building
+and traversing it are a few vectorized numpy operations per level.
+"""
+import numpy as np
+
+from ogre_mesh_analysis import triangles
+
+def _spread_bits(x):
+    """insert two zero bits between each of the lower 10 bits"""
+    x = x.astype(np.uint32) & 0x3FF
+    x = (x | (x << 16)) & 0x030000FF
+    x = (x | (x << 8)) & 0x0300F00F
+    x = (x | (x << 4)) & 0x030C30C3
+    x = (x | (x << 2)) & 0x09249249
+    return x
+
+def morton_codes(points):
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, 1e-30)
+    q = ((points - lo) / extent * 1023).astype(np.uint32)
+    return (_spread_bits(q[:, 0]) << 2) | (_spread_bits(q[:, 1]) << 1) | _spread_bits(q[:, 2])
+
+class BVH:
+    """implicit bounding volume hierarchy over triangles with per triangle submesh ids"""
+
+    def __init__(self, tris, positions, submesh_ids, leaf_size=16, branching=16):
+        self.leaf_size = leaf_size
+        self.branching = branching
+        self.num_tris = len(tris)
+        self.levels = []
+        if self.num_tris == 0:
+            return
+
+        p = positions.astype(np.float32)
+        p0, p1, p2 = p[tris[:, 0]], p[tris[:, 1]], p[tris[:, 2]]
+
+        order = np.argsort(morton_codes((p0 + p1 + p2) / 3), kind="stable")
+        p0, p1, p2 = p0[order], p1[order], p2[order]
+        self.submesh = np.asarray(submesh_ids)[order]
+        self.order = order
+
+        # precomputed for Moeller-Trumbore
+        self.v0 = p0
+        self.e1 = p1 - p0
+        self.e2 = p2 - p0
+
+        starts = np.arange(0, self.num_tris, leaf_size)
+        tri_min = np.minimum(np.minimum(p0, p1), p2)
+        tri_max = np.maximum(np.maximum(p0, p1), p2)
+        level = (np.minimum.reduceat(tri_min, starts), np.maximum.reduceat(tri_max, starts))
+
+        # root first, leaves last
+        self.levels = [level]
+        while len(level[0]) > 1:
+            starts = np.arange(0, len(level[0]), branching)
+            level = (np.minimum.reduceat(level[0], starts), np.maximum.reduceat(level[1], starts))
+            self.levels.insert(0, level)
+
+    @staticmethod
+    def _hit_boxes(bmin, bmax, origin, inv_dir, tmax):
+        with np.errstate(invalid="ignore"):
+            t1 = (bmin - origin) * inv_dir
+            t2 = (bmax - origin) * inv_dir
+        # fmin/fmax ignore the nan of 0 * inf, when the ray runs along a slab border
+        tnear = np.fmax.reduce(np.fmin(t1, t2), axis=1)
+        tfar = np.fmin.reduce(np.fmax(t1, t2), axis=1)
+        return (tnear <= tfar) & (tfar >= 0) & (tnear <= tmax)
+
+    def intersect(self, origin, direction, tmax=np.inf):
+        """closest hit along origin + t * direction as (t, submesh index, triangle index) or None"""
+        if self.num_tris == 0:
+            return None
+        origin = np.asarray(origin, dtype=np.float32)
+        direction = np.asarray(direction, dtype=np.float32)
+        with np.errstate(divide="ignore"):
+            inv_dir = 1 / direction
+
+        nodes = np.zeros(1, dtype=np.int64)
+        bmin, bmax = self.levels[0]
+        nodes = nodes[self._hit_boxes(bmin[nodes], bmax[nodes], origin, inv_dir, tmax)]
+
+        children = np.arange(self.branching)
+        for bmin, bmax in self.levels[1:]:
+            if len(nodes) == 0:
+                return None
+            nodes = (nodes[:, None] * self.branching + children).ravel()
+            nodes = nodes[nodes < len(bmin)]
+            nodes = nodes[self._hit_boxes(bmin[nodes], bmax[nodes], origin, inv_dir, tmax)]
+
+        ids = (nodes[:, None] * self.leaf_size + np.arange(self.leaf_size)).ravel()
+        ids = ids[ids < self.num_tris]
+        if len(ids) == 0:
+            return None
+
+        # Moeller-Trumbore, both sides
+        e1, e2 = self.e1[ids], self.e2[ids]
+        pvec = np.cross(direction, e2)
+        det = np.einsum("ij,ij->i", e1, pvec)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inv_det = 1 / det
+            tvec = origin - self.v0[ids]
+            u = np.einsum("ij,ij->i", tvec, pvec) * inv_det
+            qvec = np.cross(tvec, e1)
+            v = qvec @ direction * inv_det
+            t = np.einsum("ij,ij->i", e2, qvec) * inv_det
+        hit = (np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= tmax)
+        if not hit.any():
+            return None
+
+        best = np.nonzero(hit)[0][np.argmin(t[hit])]
+        return float(t[best]), int(self.submesh[ids[best]]), int(self.order[ids[best]])
+
+def build_mesh_bvh(submeshes, shared=None):
+    """BVH over all triangles of a mesh, given in the layout returned by ogre_mesh_buffers.read_mesh_buffers"""
+    all_tris, all_pos, all_ids = [], [], []
+    base = 0
+    if shared is not None:
+        all_pos.append(shared["positions"])
+        base = len(shared["positions"])
+
+    for i, sm in enumerate(submeshes):
+        is_shared = sm["positions"] is None
+        pos = shared["positions"] if is_shared else sm["positions"]
+        indices = sm["indices"] if sm["indices"] is not None else np.arange(len(pos))
+        tris = triangles(indices, sm["operation"])
+        if tris is None or len(tris) == 0:
+            continue
+
+        tris = tris.astype(np.int64)
+        if not is_shared:
+            tris += base
+            all_pos.append(pos)
+            base += len(pos)
+        all_tris.append(tris)
+        all_ids.append(np.full(len(tris), i, dtype=np.int32))
+
+    if not all_tris:
+        return BVH(np.empty((0, 3), np.int64), np.empty((0, 3), np.float32), np.empty(0, np.int32))
+    return BVH(np.concatenate(all_tris), np.concatenate(all_pos), np.concatenate(all_ids))
@@ -0,0 +1,321 @@
+"""
+Persistent caches of mesh summaries and converted meshes
+
+The summaries are stored as json in a SQLite database and are keyed by the file path, size and mtime.
+Optionally a content hash is used to recognize files that were touched or copied, but not modified.
+
+Meshes imported from other formats are stored as binary Ogre files, keyed by the content hash
+of the source and the importer settings.
+
+For material and GPU program scripts the names they define and reference are indexed by path and mtime,
+so only the scripts actually needed have to be parsed.
+"""
+import hashlib
+import json
+import os.path
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+
+SUMMARY_CACHE_NAME = "meshcache.sqlite"
+CONVERSION_CACHE_DIR = "conversions"
+SCRIPT_INDEX_NAME = "scripts.sqlite"
+
+_NAME = r'("[^"\n]+"|[^\s:{}]+)'
+SCRIPT_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+SCRIPT_DEFINES = (
+    ("material", re.compile(r"^\s*material\s+" + _NAME, re.MULTILINE)),
+    ("program", re.compile(r"^\s*(?:vertex|fragment|geometry|tessellation_hull|tessellation_domain|compute)_program\s+"
+                           + _NAME, re.MULTILINE)),
+    ("shared_params", re.compile(r"^\s*shared_params\s+" + _NAME, re.MULTILINE)),
+)
+SCRIPT_REFS = (
+    ("material", re.compile(r"^\s*material\s+" + _NAME + r"\s*:\s*" + _NAME, re.MULTILINE)),
+    ("material", re.compile(r"\bshadow_(?:caster|receiver)_material\s+" + _NAME)),
+    ("program", re.compile(r"\b\w*_program_ref\s+" + _NAME)),
+    ("program", re.compile(r"\b(?:delegate|attach)\s+([^\n{}]+)")),
+    ("shared_params", re.compile(r"\bshared_params_ref\s+" + _NAME)),
+)
+
+def script_symbols(text):
+    """
+    the [kind, name] pairs defined and referenced by a material or GPU program script
+
+    kind is "material", "program" or "shared_params"
+    """
+    text = SCRIPT_COMMENT.sub("", text)
+    defines = [[kind, m.strip('"')] for kind, regex in SCRIPT_DEFINES for m in regex.findall(text)]
+
+    refs = []
+    for kind, regex in SCRIPT_REFS:
+        for m in regex.findall(text):
+            if isinstance(m, tuple):
+                m = m[-1]  # the parent of a material
+            # attach takes a list of programs
+            refs += [[kind, name.strip('"')] for name in re.findall(_NAME, m)]
+    return defines, refs
+
+def file_digest(path, blocksize=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class SummaryCache:
+    """
+    size bounded LRU cache of mesh summaries
+
+    Writes are collected in one transaction, that is committed every commit_every writes and on close,
+    so inspecting many files does not sync the database per file.
+    """
+
+    def __init__(self, dbpath, max_bytes=32 << 20, use_hash=False, commit_every=256):
+        dirname = os.path.dirname(dbpath)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self.max_bytes = max_bytes
+        self.use_hash = use_hash
+        self.commit_every = commit_every
+        self.digests = {}  # remember hashes computed on a miss for the following put
+        self.touched = {}  # path: atime of the hits not written yet
+        self.writes = 0  # since the last commit
+
+        self.db = sqlite3.connect(dbpath, timeout=30)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS summaries (
+                               path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, hash TEXT,
+                               summary TEXT, atime REAL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS summaries_hash ON summaries (hash)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS summaries_atime ON summaries (atime)")
+        self.db.commit()
+        # kept up to date by _store and evict, so the table is only summed once
+        self.total = self.db.execute("SELECT TOTAL(LENGTH(summary)) FROM summaries").fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def flush(self):
+        """write the pending access times and commit"""
+        self.db.executemany("UPDATE summaries SET atime = ? WHERE path = ?",
+                            [(atime, path) for path, atime in self.touched.items()])
+        self.touched.clear()
+        self.db.commit()
+        self.writes = 0
+
+    def _written(self):
+        self.writes += 1
+        if self.writes >= self.commit_every:
+            self.flush()
+
+    def get(self, path):
+        """return the cached summary of path or None if it is missing or stale"""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        row = self.db.execute("SELECT summary FROM summaries WHERE path = ? AND size = ? AND mtime = ?",
+                              (path, st.st_size, st.st_mtime_ns)).fetchone()
+
+        if row is None and self.use_hash:
+            digest = file_digest(path)
+            self.digests[(path, st.st_size, st.st_mtime_ns)] = digest
+            row = self.db.execute("SELECT summary FROM summaries WHERE hash = ? AND size = ?",
+                                  (digest, st.st_size)).fetchone()
+            if row is not None:
+                # same content under a new name or mtime, remember it under this key too
+                self._store(path, st, digest, row[0])
+                self.evict()
+                return json.loads(row[0])
+
+        if row is None:
+            return None
+
+        self.touched[path] = time.time()
+        self._written()
+        return json.loads(row[0])
+
+    def put(self, path, summary):
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+
+        digest = None
+        if self.use_hash:
+            digest = self.digests.pop((path, st.st_size, st.st_mtime_ns), None) or file_digest(path)
+        self._store(path, st, digest, json.dumps(summary))
+        self.evict()
+
+    def _store(self, path, st, digest, summary):
+        old = self.db.execute("SELECT LENGTH(summary) FROM summaries WHERE path = ?", (path,)).fetchone()
+        self.db.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?)",
+                        (path, st.st_size, st.st_mtime_ns, digest, summary, time.time()))
+        self.touched.pop(path, None)
+        self.total += len(summary) - (old[0] if old else 0)
+        self._written()
+
+    def evict(self, fill=0.9):
+        """once the cache exceeds max_bytes, drop the least recently used entries until it fits into fill of it"""
+        if self.total <= self.max_bytes:
+            return
+        # the order depends on the pending access times
+        self.flush()
+
+        drop = []
+        for path, nbytes in self.db.execute("SELECT path, LENGTH(summary) FROM summaries ORDER BY atime"):
+            if self.total <= self.max_bytes * fill:
+                break
+            drop.append((path,))
+            self.total -= nbytes
+
+        self.db.executemany("DELETE FROM summaries WHERE path = ?", drop)
+        self.db.commit()
+
+class ConversionCache:
+    """
+    size bounded LRU cache of converted meshes
+
+    Each entry is a directory of files written by the caller, e.g. the .mesh and .material.
+    Entries are written to a staging directory first and renamed on commit,
+    so an interrupted conversion never leaves a partial entry behind.
+    Every writer gets its own staging directory, so processes may convert the same key concurrently.
+    """
+
+    def __init__(self, root, max_bytes=2 << 30):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.max_bytes = max_bytes
+
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"), timeout=30)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                               key TEXT PRIMARY KEY, size INTEGER, atime REAL)""")
+        # remember the digests, so unchanged sources are not hashed again
+        self.db.execute("""CREATE TABLE IF NOT EXISTS sources (
+                               path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, hash TEXT)""")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def key(self, path, settings):
+        """key of the conversion of path with the importer settings given as json serializable dict"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        row = self.db.execute("SELECT hash FROM sources WHERE path = ? AND size = ? AND mtime = ?",
+                              (path, st.st_size, st.st_mtime_ns)).fetchone()
+        if row is None:
+            row = (file_digest(path),)
+            self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                            (path, st.st_size, st.st_mtime_ns, row[0]))
+            self.db.commit()
+
+        h = hashlib.sha1(row[0].encode())
+        h.update(json.dumps(settings, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        """directory of the entry or None"""
+        entry = os.path.join(self.root, key)
+        found = self.db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone()
+        if found is None or not os.path.isdir(entry):
+            return None
+
+        self.db.execute("UPDATE entries SET atime = ? WHERE key = ?", (time.time(), key))
+        self.db.commit()
+        return entry
+
+    def begin(self, key):
+        """new empty staging directory to write the entry to"""
+        return tempfile.mkdtemp(prefix=key + ".", suffix=".tmp", dir=self.root)
+
+    def commit(self, key, staging):
+        """make staging the entry of key, unless another writer committed it first"""
+        entry = os.path.join(self.root, key)
+        if self.get(key) is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        # a directory without index row is left over from an interrupted run
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # lost the race against a concurrent commit
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(entry):
+                raise
+
+        size = sum(os.path.getsize(os.path.join(entry, fn)) for fn in os.listdir(entry))
+        self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, size, time.time()))
+        self.db.commit()
+        self.evict(keep=key)
+
+    def abort(self, staging):
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def evict(self, keep=None):
+        """drop the least recently used entries until the cache fits into max_bytes, if it is not None"""
+        if self.max_bytes is None:
+            return
+        total = self.db.execute("SELECT TOTAL(size) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        drop = []
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY atime"):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            drop.append((key,))
+            total -= size
+
+        for key, in drop:
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+        self.db.executemany("DELETE FROM entries WHERE key = ?", drop)
+        self.db.commit()
+
+class ScriptIndex:
+    """names defined and referenced per script file, invalidated by mtime"""
+
+    def __init__(self, dbpath):
+        dirname = os.path.dirname(dbpath)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self.db = sqlite3.connect(dbpath, timeout=30)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS scripts (
+                               path TEXT PRIMARY KEY, mtime INTEGER, symbols TEXT)""")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def lookup(self, paths):
+        """{path: (defines, refs)} as returned by script_symbols, only reading the scripts that changed"""
+        ret = {}
+        changed = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            row = self.db.execute("SELECT symbols FROM scripts WHERE path = ? AND mtime = ?", (path, mtime)).fetchone()
+            if row is None:
+                with open(path, errors="replace") as f:
+                    row = (json.dumps(script_symbols(f.read())),)
+                changed.append((path, mtime, row[0]))
+            ret[path] = tuple(json.loads(row[0]))
+
+        if changed:
+            self.db.executemany("INSERT OR REPLACE INTO scripts VALUES (?, ?, ?)", changed)
+            self.db.commit()
+        return ret
@@ -0,0 +1,242 @@
+"""
+Convert mesh vertex and index data to the compact formats supported by Ogre
+
+Normals, binormals and tangents are packed as int1010102n, texture coordinates as (u)short2n
+and colours as ubyte4n, where their value range allows. 32 bit indices are stored as 16 bit
+where the vertices fit and shared vertices are split per submesh, if that does not add any.
+Every conversion reports the maximal error it introduced.
+"""
+import numpy as np
+
+import Ogre
+
+from ogre_mesh_reader import VES2STR, VET2STR
+from ogre_mesh_buffers import create_index_buffer, create_vertex_buffer, read_indices, read_vertex_buffers
+
+def _snorm(values, bits):
+    """quantized values and what they decode to"""
+    scale = (1 << (bits - 1)) - 1
+    q = np.round(np.clip(values, -1, 1) * scale).astype(np.int64)
+    return q, np.maximum(q / scale, -1)
+
+def _unorm(values, bits):
+    scale = (1 << bits) - 1
+    q = np.round(np.clip(values, 0, 1) * scale).astype(np.int64)
+    return q, q / scale
+
+def pack_int_10_10_10_2(values):
+    """
+    pack up to 4 columns in [-1, 1] as int1010102n, x in the lowest bits
+
+    returns the packed vertices as (n, 4) uint8 and the values they decode to
+    """
+    n, cols = values.shape
+    v = np.zeros((n, 4))
+    v[:, :cols] = values
+    xyz, dxyz = _snorm(v[:, :3], 10)
+    w, dw = _snorm(v[:, 3], 2)
+
+    xyz &= 0x3FF
+    words = xyz[:, 0] | (xyz[:, 1] << 10) | (xyz[:, 2] << 20) | ((w & 0x3) << 30)
+    decoded = np.column_stack([dxyz, dw])[:, :cols]
+    return words.astype("<u4").view(np.uint8).reshape(n, 4), decoded
+
+def pack_norm16(values, signed):
+    q, decoded = _snorm(values, 16) if signed else _unorm(values, 16)
+    return q.astype("<i2" if signed else "<u2").view(np.uint8).reshape(len(values), -1), decoded
+
+def pack_ubyte4_norm(values):
+    """colours with 3 or 4 channels, missing alpha is opaque"""
+    v = np.ones((len(values), 4))
+    v[:, :values.shape[1]] = values
+    q, decoded = _unorm(v, 8)
+    return q.astype(np.uint8), decoded[:, :values.shape[1]]
+
+def _in_range(values, lo, hi):
+    return values.min() >= lo and values.max() <= hi
+
+def compact_element(semantic, vtype, values, keep_float=False):
+    """
+    compact type, packed (n, size) uint8 vertices and decoded values of an element or None to keep it
+
+    keep_float retains normals, binormals and tangents, which software skinning and morphing expect as float
+    """
+    if vtype not in (Ogre.VET_FLOAT2, Ogre.VET_FLOAT3, Ogre.VET_FLOAT4) or len(values) == 0:
+        return None
+    values = values.astype(np.float64)
+
+    if semantic in (Ogre.VES_NORMAL, Ogre.VES_BINORMAL, Ogre.VES_TANGENT):
+        if keep_float or vtype == Ogre.VET_FLOAT2:
+            return None
+        return (Ogre.VET_INT_10_10_10_2_NORM,) + pack_int_10_10_10_2(values)
+
+    if semantic == Ogre.VES_TEXTURE_COORDINATES and vtype == Ogre.VET_FLOAT2:
+        if _in_range(values, 0, 1):
+            return (Ogre.VET_USHORT2_NORM,) + pack_norm16(values, False)
+        if _in_range(values, -1, 1):
+            return (Ogre.VET_SHORT2_NORM,) + pack_norm16(values, True)
+        # wrapping coordinates would need half floats, which Ogre 13 does not have
+        return None
+
+    if semantic in (Ogre.VES_DIFFUSE, Ogre.VES_SPECULAR) and vtype != Ogre.VET_FLOAT2 and _in_range(values, 0, 1):
+        return (Ogre.VET_UBYTE4_NORM,) + pack_ubyte4_norm(values)
+    return None
+
+def plan_vertices(decl, buffers, keep_float=False):
+    """
+    compacted copy of vertex buffers given as {source: (vertexCount, vertexSize) uint8 array}
+
+    returns the new buffers, the new (source, offset, type, semantic, index) per element index
+    of decl and the conversions as json serializable dicts
+    """
+    elements = list(enumerate(decl.getElements()))
+    new_buffers = {}
+    new_elements = {}
+    conversions = []
+
+    for source, raw in buffers.items():
+        columns = []
+        offset = 0
+        for i, elem in sorted((e for e in elements if e[1].getSource() == source), key=lambda e: e[1].getOffset()):
+            vtype = elem.getType()
+            column = raw[:, elem.getOffset():elem.getOffset() + elem.getSize()]
+
+            compact = None
+            if vtype in (Ogre.VET_FLOAT2, Ogre.VET_FLOAT3, Ogre.VET_FLOAT4):
+                values = np.ascontiguousarray(column).view("<f4")
+                compact = compact_element(elem.getSemantic(), vtype, values, keep_float)
+            if compact is not None:
+                vtype, column, decoded = compact
+                conversions.append({"semantic": VES2STR[elem.getSemantic()], "index": elem.getIndex(),
+                                    "from": VET2STR[elem.getType()], "to": VET2STR[vtype],
+                                    "max_error": float(np.abs(decoded - values).max())})
+
+            new_elements[i] = (source, offset, vtype, elem.getSemantic(), elem.getIndex())
+            columns.append(column)
+            offset += column.shape[1]
+        new_buffers[source] = np.hstack(columns) if columns else raw[:, :0]
+    return new_buffers, new_elements, conversions
+
+def _apply_vertices(vertex_data, new_buffers, new_elements):
+    decl = vertex_data.vertexDeclaration
+    for i, (source, offset, vtype, semantic, index) in sorted(new_elements.items()):
+        decl.modifyElement(i, source, offset, vtype, semantic, index)
+
+    bindings = vertex_data.vertexBufferBinding
+    for source, buf in bindings.getBindings().items():
+        bindings.setBinding(source, create_vertex_buffer(new_buffers[source], buf.getUsage(), buf.hasShadowBuffer()))
+    vertex_data.vertexStart = 0
+
+def _nbytes(buffers):
+    return sum(raw.nbytes for raw in buffers.values())
+
+def _split_shared(mesh, animated):
+    """the vertices used per submesh index, if splitting the shared vertices does not duplicate any of them"""
+    users = [(i, sm) for i, sm in enumerate(mesh.getSubMeshes()) if sm.useSharedVertices]
+    generated_lods = mesh.getNumLodLevels() > 1 and not mesh.hasManualLodLevel()
+    # bone assignments, poses and generated LOD levels refer to the shared vertices by index
+    if not users or animated or generated_lods or not all(sm.indexData.indexCount for _, sm in users):
+        return None
+
+    used = {i: np.unique(read_indices(sm.indexData)) for i, sm in users}
+    if sum(len(u) for u in used.values()) > mesh.sharedVertexData.vertexCount:
+        return None
+    return used
+
+def compact_mesh(mesh, apply=True):
+    """
+    compact the vertex and index data of mesh and return the memory and error report
+
+    with apply=False nothing is modified and the report is the projected result.
+    """
+    animated = mesh.hasSkeleton() or mesh.hasVertexAnimation() or len(mesh.getPoseList()) > 0
+    ret = {"shared": None, "submeshes": []}
+
+    # the edge lists refer to the vertex data and buffers replaced below
+    edge_lists = apply and mesh.isEdgeListBuilt()
+    if edge_lists:
+        mesh.freeEdgeList()
+
+    shared = mesh.sharedVertexData
+    split = None
+    if shared:
+        shared_buffers = read_vertex_buffers(shared)
+        split = _split_shared(mesh, animated)
+        ret["shared"] = {"vertex_bytes": [_nbytes(shared_buffers), 0], "split": split is not None, "conversions": []}
+        if split is None:
+            new_buffers, new_elements, ret["shared"]["conversions"] = plan_vertices(
+                shared.vertexDeclaration, shared_buffers, animated)
+            ret["shared"]["vertex_bytes"][1] = _nbytes(new_buffers)
+            if apply:
+                _apply_vertices(shared, new_buffers, new_elements)
+
+    for i, sm in enumerate(mesh.getSubMeshes()):
+        info = {"vertex_bytes": [0, 0], "conversions": []}
+        split_off = split is not None and i in split
+        index_data = sm.indexData
+        indices = read_indices(index_data) if index_data.indexCount else None
+        bits = index_data.indexBuffer.getIndexSize() * 8 if indices is not None else None
+
+        vertex_data = None
+        if split_off:
+            # the new vertex data starts as shallow copy, that gets its own buffers below
+            used = split[i]
+            indices = np.searchsorted(used, indices)
+            buffers = {source: raw[used] for source, raw in shared_buffers.items()}
+            if apply:
+                vertex_data = shared.clone(False)
+                vertex_data.vertexCount = len(used)
+        elif not sm.useSharedVertices:
+            vertex_data = sm.vertexData
+            buffers = read_vertex_buffers(vertex_data)
+            info["vertex_bytes"][0] = _nbytes(buffers)
+        else:
+            buffers = None
+
+        if buffers is not None:
+            new_buffers, new_elements, info["conversions"] = plan_vertices(
+                (vertex_data or shared).vertexDeclaration, buffers, animated)
+            info["vertex_bytes"][1] = _nbytes(new_buffers)
+            if apply:
+                _apply_vertices(vertex_data, new_buffers, new_elements)
+
+        info["index_bits"] = [bits, bits]
+        info["index_bytes"] = [0, 0]
+        if indices is not None:
+            info["index_bytes"][0] = index_data.indexCount * bits // 8
+            if len(indices) and int(indices.max()) <= 0xFFFF:
+                info["index_bits"][1] = 16
+            info["index_bytes"][1] = len(indices) * info["index_bits"][1] // 8
+
+            if apply and (info["index_bits"] != [bits, bits] or split_off):
+                ibuf = index_data.indexBuffer
+                index_data.indexBuffer = create_index_buffer(indices, info["index_bits"][1] == 32,
+                                                             ibuf.getUsage(), ibuf.hasShadowBuffer())
+                index_data.indexStart = 0
+
+        if apply and split_off:
+            vertex_data.disown()  # owned by the submesh now
+            sm.vertexData = vertex_data
+            sm.useSharedVertices = False
+        ret["submeshes"].append(info)
+
+    if apply and split is not None:
+        mesh.sharedVertexData = None
+        # the mesh only deletes its shared vertex data on unload, so free it and its buffers here
+        shared.thisown = True
+        del shared
+    if edge_lists:
+        mesh.buildEdgeList()
+
+    before = sum(sm["vertex_bytes"][0] + sm["index_bytes"][0] for sm in ret["submeshes"])
+    after = sum(sm["vertex_bytes"][1] + sm["index_bytes"][1] for sm in ret["submeshes"])
+    if ret["shared"]:
+        before += ret["shared"]["vertex_bytes"][0]
+        after += ret["shared"]["vertex_bytes"][1]
+    conversions = [c for sm in ret["submeshes"] for c in sm["conversions"]]
+    if ret["shared"]:
+        conversions += ret["shared"]["conversions"]
+
+    ret["bytes"] = [before, after]
+    ret["max_error"] = max((c["max_error"] for c in conversions), default=0.0)
+    return ret
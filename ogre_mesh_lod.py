@@ -0,0 +1,192 @@
+"""
+Generate LOD levels by vertex clustering, as MeshLodGenerator is not part of the python bindings
+
+The vertices of a submesh are snapped to a grid and all vertices of a cell collapse into the one closest
+to their mean, so a level only needs new indices and shares the vertex buffers with the base mesh.
+The cell size is searched per level to approach the requested fraction of the triangles.
+generate_lods works on numpy arrays as returned by ogre_mesh_buffers, so it can run on a worker thread
+or process, while apply_lods and lod_stats need the mesh.
+"""
+import math
+
+import numpy as np
+
+import Ogre
+
+from ogre_mesh_analysis import OT_TRIANGLE_LIST, index_degenerate, triangles
+from ogre_mesh_buffers import create_index_buffer, read_indices
+
+# distance only keeps a distance strategy of the mesh, as those singletons are not bound
+LOD_STRATEGIES = ("distance", "pixel_count", "screen_ratio_pixel_count")
+
+def cluster_triangles(tris, positions, cell):
+    """tris with the vertices of each grid cell merged, dropping degenerate and repeated triangles"""
+    if len(tris) == 0:
+        return tris
+    used = np.unique(tris)
+    p = positions[used].astype(np.float64)
+    cells = np.floor((p - p.min(axis=0)) / cell).astype(np.int64)
+    key = (cells[:, 0] << 42) ^ (cells[:, 1] << 21) ^ cells[:, 2]
+    _, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+
+    mean = np.stack([np.bincount(inverse, p[:, k]) for k in range(3)], axis=1) / counts[:, None]
+    dist = ((p - mean[inverse]) ** 2).sum(axis=1)
+    # sorted by cell, then by distance to the mean, so each cell starts with its representative
+    order = np.lexsort((dist, inverse))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    remap = np.arange(int(used[-1]) + 1)
+    remap[used] = used[order[starts]][inverse]
+    ret = remap[tris]
+    ret = ret[~index_degenerate(ret)]
+    if len(ret) == 0:
+        return ret
+    _, first = np.unique(np.sort(ret, axis=1), axis=0, return_index=True)
+    return ret[np.sort(first)]
+
+def decimate(tris, positions, fraction, steps=12):
+    """the clustering of tris closest to fraction of the triangles, found by bisecting the cell size"""
+    target = max(1, int(len(tris) * fraction))
+    extent = float(np.ptp(positions[np.unique(tris)], axis=0).max()) if len(tris) else 0
+    if extent == 0 or target >= len(tris):
+        return tris
+
+    # cells below 2**-20 of the extent keep all vertices, and their keys fit into 21 bits per axis
+    lo, hi = extent * 2.0 ** -20, extent
+    best = tris
+    for _ in range(steps):
+        cell = math.sqrt(lo * hi)
+        clustered = cluster_triangles(tris, positions, cell)
+        if len(clustered) > target:
+            lo = cell
+        else:
+            hi = cell
+        if len(clustered) and abs(len(clustered) - target) < abs(len(best) - target):
+            best = clustered
+    return best
+
+def generate_lods(submeshes, shared, levels=3, reduction=0.5):
+    """
+    indices per level of each submesh, every level keeping reduction of the triangles of the one before
+
+    submeshes and shared are as returned by ogre_mesh_buffers.read_mesh_buffers.
+    Submeshes that are no indexed triangle lists get None and keep their indices on all levels.
+    """
+    ret = []
+    for i, sm in enumerate(submeshes):
+        if sm["indices"] is None:
+            raise ValueError("submesh #{} has no indices, which every LOD level needs".format(i))
+        if sm["operation"] != OT_TRIANGLE_LIST:
+            ret.append(None)
+            continue
+        positions = shared["positions"] if sm["positions"] is None else sm["positions"]
+        tris = triangles(sm["indices"])
+        ret.append([decimate(tris, positions, reduction ** level).ravel() for level in range(1, levels + 1)])
+    return ret
+
+def lod_values(name, radius, levels):
+    """
+    user values of the levels for the strategy name
+
+    Each level is used from where the mesh covers a quarter of the pixels of the previous one,
+    starting at 4 radii away, at 256x256 pixels or at a quarter of the screen.
+    """
+    if name == "distance":
+        return [radius * 4 * 2 ** i for i in range(levels)]
+    if name == "pixel_count":
+        return [256 ** 2 / 4 ** i for i in range(levels)]
+    return [0.25 / 4 ** i for i in range(levels)]
+
+def lod_strategy(mesh, name):
+    """the strategy singleton called name"""
+    if name == "pixel_count":
+        return Ogre.AbsolutePixelCountLodStrategy.getSingleton()
+    if name == "screen_ratio_pixel_count":
+        return Ogre.ScreenRatioPixelCountLodStrategy.getSingleton()
+
+    strategy = mesh.getLodStrategy()
+    if not strategy.getName().startswith("distance"):
+        raise ValueError("cannot switch from the {} strategy back to distance".format(strategy.getName()))
+    return strategy
+
+def _usage(strategy, user_value, manual_name="", edge_data=None):
+    usage = Ogre.MeshLodUsage()
+    usage.userValue = user_value
+    usage.value = strategy.transformUserValue(user_value)
+    usage.manualName = manual_name
+    usage.edgeData = edge_data
+    return usage
+
+def apply_lods(mesh, lods, strategy_name="distance"):
+    """replace the LOD levels of mesh by lods as returned by generate_lods"""
+    if mesh.hasManualLodLevel():
+        raise ValueError("mesh has manual LOD levels")
+    strategy = lod_strategy(mesh, strategy_name)
+    levels = max((len(sm) for sm in lods if sm is not None), default=0)
+
+    edge_lists = mesh.isEdgeListBuilt()
+    if edge_lists:
+        mesh.freeEdgeList()
+    mesh.removeLodLevels()
+    mesh._setLodInfo(levels + 1)
+    for level, value in enumerate(lod_values(strategy_name, mesh.getBoundingSphereRadius(), levels), 1):
+        mesh._setLodUsage(level, _usage(strategy, value))
+
+    for i, (sm, sm_lods) in enumerate(zip(mesh.getSubMeshes(), lods)):
+        ibuf = sm.indexData.indexBuffer
+        for level in range(1, levels + 1):
+            index_data = Ogre.IndexData()
+            if sm_lods is None:
+                index_data.indexBuffer = ibuf
+                index_data.indexStart = sm.indexData.indexStart
+                index_data.indexCount = sm.indexData.indexCount
+            else:
+                indices = sm_lods[level - 1]
+                index_data.indexBuffer = create_index_buffer(indices, None, ibuf.getUsage(), ibuf.hasShadowBuffer())
+                index_data.indexCount = len(indices)
+            index_data.disown()  # owned by the submesh now
+            mesh._setSubMeshLodFaceList(i, level, index_data)
+
+    # also sets the base value of the strategy
+    mesh.setLodStrategy(strategy)
+    if edge_lists:
+        mesh.buildEdgeList()
+
+def set_lod_value(mesh, level, user_value):
+    """change the user value of a level, returns False if it would not lie between its neighbours"""
+    strategy = mesh.getLodStrategy()
+    value = strategy.transformUserValue(user_value)
+    # the transformed values ascend for all strategies
+    if value <= mesh.getLodLevel(level - 1).value or \
+            (level + 1 < mesh.getNumLodLevels() and value >= mesh.getLodLevel(level + 1).value):
+        return False
+    usage = mesh.getLodLevel(level)
+    mesh._setLodUsage(level, _usage(strategy, user_value, usage.manualName, usage.edgeData))
+    return True
+
+def lod_stats(mesh):
+    """
+    triangles, referenced vertices and index bytes per level, starting with the base mesh
+
+    The vertex buffers are shared by all levels. Returns None for manual LOD levels, which are separate meshes.
+    """
+    if mesh.hasManualLodLevel():
+        return None
+
+    ret = []
+    for level in range(mesh.getNumLodLevels()):
+        tris, index_bytes = 0, 0
+        used = {}  # vertex data: referenced indices
+        for i, sm in enumerate(mesh.getSubMeshes()):
+            index_data = sm.indexData if level == 0 else sm.mLodFaceList[level - 1]
+            if index_data.indexCount == 0:
+                continue
+            indices = read_indices(index_data)
+            level_tris = triangles(indices, sm.operationType)
+            tris += len(level_tris) if level_tris is not None else 0
+            index_bytes += index_data.indexCount * index_data.indexBuffer.getIndexSize()
+            used.setdefault("shared" if sm.useSharedVertices else i, []).append(indices)
+        ret.append({"value": mesh.getLodLevel(level).userValue, "triangles": tris, "index_bytes": index_bytes,
+                    "vertices": sum(len(np.unique(np.concatenate(v))) for v in used.values())})
+    return ret
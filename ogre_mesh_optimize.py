@@ -0,0 +1,92 @@
+"""
+Optimize the index and vertex buffers of a mesh for the GPU vertex caches
+
+Triangles are reordered for post-transform cache locality by Ogre itself. Afterwards duplicate
+vertices are merged, unreferenced ones dropped and the remaining ones stored in the order
+they are first used, for pre-transform fetch locality.
+"""
+import numpy as np
+
+import Ogre
+
+from ogre_mesh_analysis import OT_TRIANGLE_LIST, acmr, triangles, vertex_hashes
+from ogre_mesh_buffers import create_index_buffer, create_vertex_buffer, read_indices, read_vertex_buffers
+
+def fetch_remap(indices, raw):
+    """
+    vertex order and rewritten indices that merge equal vertices and store them in order of first use
+
+    raw are the vertices as (vertexCount, vertexSize) uint8 rows.
+    returns the old vertex index for each new vertex and the new indices
+    """
+    # map each vertex to the first one with the same hash, unless the hashes just collide
+    _, first, inverse = np.unique(vertex_hashes(raw), return_index=True, return_inverse=True)
+    canonical = first[inverse.ravel()]
+    canonical = np.where((raw[canonical] == raw).all(axis=1), canonical, np.arange(len(raw)))
+    indices = canonical[indices]
+
+    used, first_use = np.unique(indices, return_index=True)
+    order = used[np.argsort(first_use)]
+    new_index = np.empty(len(raw), dtype=np.int64)
+    new_index[order] = np.arange(len(order))
+    return order, new_index[indices]
+
+def buffer_bytes(vertex_data, index_data):
+    vbytes = sum(buf.getVertexSize() * vertex_data.vertexCount
+                 for buf in vertex_data.vertexBufferBinding.getBindings().values())
+    return vbytes, index_data.indexCount * index_data.indexBuffer.getIndexSize()
+
+def _stats(vertex_data, index_data, cache_size):
+    vbytes, ibytes = buffer_bytes(vertex_data, index_data)
+    return {"acmr": acmr(triangles(read_indices(index_data)), cache_size), "vertex_bytes": vbytes,
+            "index_bytes": ibytes, "vertices": vertex_data.vertexCount}
+
+def _rewrite_vertices(vertex_data, index_data):
+    buffers = read_vertex_buffers(vertex_data)
+    raw = np.hstack([buffers[source] for source in sorted(buffers)])
+    order, indices = fetch_remap(read_indices(index_data).astype(np.int64), raw)
+
+    bindings = vertex_data.vertexBufferBinding
+    for source, buf in bindings.getBindings().items():
+        bindings.setBinding(source, create_vertex_buffer(buffers[source][order], buf.getUsage(), buf.hasShadowBuffer()))
+    vertex_data.vertexStart = 0
+    vertex_data.vertexCount = len(order)
+
+    ibuf = index_data.indexBuffer
+    index_data.indexBuffer = create_index_buffer(indices, None, ibuf.getUsage(), ibuf.hasShadowBuffer())
+    index_data.indexStart = 0
+
+def optimize_mesh(mesh, cache_size=16):
+    """
+    optimize all triangle list submeshes in place and return before and after stats per submesh
+
+    Vertices are only rewritten where nothing else refers to them by index,
+    i.e. not for shared vertices, skeletal or vertex animation and generated LOD levels.
+    """
+    keep_vertices = mesh.hasSkeleton() or mesh.hasVertexAnimation() or len(mesh.getPoseList()) > 0 or \
+        (mesh.getNumLodLevels() > 1 and not mesh.hasManualLodLevel())
+
+    # the edge lists refer to the old triangle order and vertices
+    edge_lists = mesh.isEdgeListBuilt()
+    if edge_lists:
+        mesh.freeEdgeList()
+
+    ret = []
+    for sm in mesh.getSubMeshes():
+        vertex_data = mesh.sharedVertexData if sm.useSharedVertices else sm.vertexData
+        index_data = sm.indexData
+        if sm.operationType != OT_TRIANGLE_LIST or index_data.indexCount == 0:
+            ret.append(None)
+            continue
+
+        info = {"before": _stats(vertex_data, index_data, cache_size)}
+        index_data.optimiseVertexCacheTriList()
+        info["vertices_rewritten"] = not (keep_vertices or sm.useSharedVertices)
+        if info["vertices_rewritten"]:
+            _rewrite_vertices(vertex_data, index_data)
+        info["after"] = _stats(vertex_data, index_data, cache_size)
+        ret.append(info)
+
+    if edge_lists:
+        mesh.buildEdgeList()
+    return ret
@@ -0,0 +1,295 @@
+"""
+Read the properties of binary Ogre .mesh files without initialising Ogre
+
+The file is memory mapped and only the chunk headers are parsed. Vertex and index data
+is skipped, so the cost depends on the size of the headers and not on the size of the file.
+read_mesh_layout records where that data is stored instead, so it can be mapped rather than loaded.
+"""
+import mmap
+import os.path
+import struct
+
+VES2STR = ("ERROR", "Position", "Blend Weights", "Blend Indices", "Normal", "Diffuse", "Specular", "Texcoord", "Binormal", "Tangent")
+VET2STR = ("float", "float2", "float3", "float4", "ERROR",
+           "short", "short2", "short3", "short4", "ubyte4", "argb", "abgr",
+           "double", "double2", "double3", "double4",
+           "ushort", "ushort2", "ushort3", "ushort4",
+           "int", "int2", "int3", "int4",
+           "uint", "uint2", "uint3", "uint4",
+           "byte4", "byte4n", "ubyte4n", "short2n", "short4n", "ushort2n", "ushort4n", "int1010102n")
+
+ROP2STR = ("ERROR", "Point List", "Line List", "Line Strip", "Triangle List", "Triangle Strip", "Triangle Fan")
+
+# chunk ids from OgreMeshFileFormat.h and OgreSkeletonFileFormat.h
+M_HEADER = 0x1000
+M_MESH = 0x3000
+M_SUBMESH = 0x4000
+M_SUBMESH_OPERATION = 0x4010
+M_GEOMETRY = 0x5000
+M_GEOMETRY_VERTEX_DECLARATION = 0x5100
+M_GEOMETRY_VERTEX_ELEMENT = 0x5110
+M_GEOMETRY_VERTEX_BUFFER = 0x5200
+M_GEOMETRY_VERTEX_BUFFER_DATA = 0x5210
+M_MESH_SKELETON_LINK = 0x6000
+M_MESH_LOD_LEVEL = 0x8000
+M_MESH_LOD_USAGE = 0x8100
+M_MESH_LOD_MANUAL = 0x8110
+M_MESH_LOD_GENERATED = 0x8120
+M_MESH_BOUNDS = 0x9000
+M_ANIMATIONS = 0xD000
+M_ANIMATION = 0xD100
+
+SKELETON_ANIMATION = 0x4000
+
+CHUNK_OVERHEAD = 6  # unsigned short id + unsigned int length
+
+def operation_name(op):
+    return ROP2STR[op] if op <= 6 else "Control Points"
+
+def element_type_name(vtype):
+    return VET2STR[vtype] if vtype < len(VET2STR) else "ERROR"
+
+class MeshFormatError(Exception):
+    pass
+
+class ChunkReader:
+    """sequential reader over a memory mapped Ogre serializer file"""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.pos = 0
+
+        header = buf[:2]
+        if header == b"\x00\x10":
+            self.endian = "<"
+        elif header == b"\x10\x00":
+            self.endian = ">"
+        else:
+            raise MeshFormatError("not an Ogre binary file")
+        self.pos = 2
+        self.version = self.string()
+
+    def unpack(self, fmt):
+        fmt = self.endian + fmt
+        ret = struct.unpack_from(fmt, self.buf, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return ret
+
+    def ushort(self):
+        return self.unpack("H")[0]
+
+    def uint(self):
+        return self.unpack("I")[0]
+
+    def float(self):
+        return self.unpack("f")[0]
+
+    def bool(self):
+        return self.unpack("?")[0]
+
+    def string(self):
+        end = self.buf.find(b"\n", self.pos)
+        if end < 0:
+            raise MeshFormatError("unterminated string at offset {}".format(self.pos))
+        ret = self.buf[self.pos:end].decode("utf-8", "replace")
+        self.pos = end + 1
+        return ret
+
+    def chunks(self, end):
+        """iterate over the chunks until end, skipping whatever the caller did not read"""
+        while self.pos + CHUNK_OVERHEAD <= end:
+            cid, length = self.unpack("HI")
+            chunk_end = self.pos - CHUNK_OVERHEAD + length
+            if length < CHUNK_OVERHEAD or chunk_end > end:
+                raise MeshFormatError("corrupt chunk 0x{:04x} at offset {}".format(cid, self.pos - CHUNK_OVERHEAD))
+            yield cid, chunk_end
+            self.pos = chunk_end
+
+# in release order, which is not the numeric one
+MESH_VERSIONS = ("1.10", "1.20", "1.30", "1.40", "1.41", "1.8", "1.100")
+
+def version_index(version):
+    # e.g. [MeshSerializer_v1.100]
+    try:
+        return MESH_VERSIONS.index(version.strip("[]").rsplit("_v", 1)[1])
+    except (IndexError, ValueError):
+        raise MeshFormatError("unknown serializer version '{}'".format(version))
+
+def _read_geometry(r, end):
+    count = r.uint()
+    decl = []
+    for cid, cend in r.chunks(end):
+        if cid != M_GEOMETRY_VERTEX_DECLARATION:
+            continue  # vertex buffers
+        for eid, _ in r.chunks(cend):
+            if eid != M_GEOMETRY_VERTEX_ELEMENT:
+                continue
+            source, vtype, semantic, offset, index = r.unpack("5H")
+            decl.append([VES2STR[semantic] if semantic < len(VES2STR) else "ERROR", element_type_name(vtype)])
+    return count, decl
+
+def _read_geometry_layout(r, end):
+    ret = {"vertices": r.uint(), "elements": [], "buffers": {}}
+    for cid, cend in r.chunks(end):
+        if cid == M_GEOMETRY_VERTEX_DECLARATION:
+            for eid, _ in r.chunks(cend):
+                if eid == M_GEOMETRY_VERTEX_ELEMENT:
+                    ret["elements"].append(r.unpack("5H"))  # source, type, semantic, offset, index
+        elif cid == M_GEOMETRY_VERTEX_BUFFER:
+            source, vertex_size = r.unpack("2H")
+            for did, _ in r.chunks(cend):
+                if did == M_GEOMETRY_VERTEX_BUFFER_DATA:
+                    ret["buffers"][source] = (r.pos, vertex_size)
+    return ret
+
+def _read_submesh_layout(r, end):
+    info = {"material": r.string()}
+    shared = r.bool()
+    info["indices"] = r.uint()
+    info["index_bits"] = 32 if r.bool() else 16
+    info["index_offset"] = r.pos
+    r.pos += info["indices"] * info["index_bits"] // 8
+
+    info["operation"] = 4  # triangle list, unless stated otherwise
+    info["geometry"] = None  # shared
+    for cid, cend in r.chunks(end):
+        if cid == M_GEOMETRY and not shared:
+            info["geometry"] = _read_geometry_layout(r, cend)
+        elif cid == M_SUBMESH_OPERATION:
+            info["operation"] = r.ushort()
+    return info
+
+def _read_submesh(r, end):
+    info = {"material": r.string()}
+    shared = r.bool()
+    info["indices"] = r.uint()
+    idx32 = r.bool()
+    info["index_bits"] = (32 if idx32 else 16) if info["indices"] else None
+    # skip the index data
+    r.pos += info["indices"] * (4 if idx32 else 2)
+
+    info["operation"] = operation_name(4)  # triangle list, unless stated otherwise
+    info["vertices"] = None
+    for cid, cend in r.chunks(end):
+        if cid == M_GEOMETRY and not shared:
+            info["vertices"], info["vertex_decl"] = _read_geometry(r, cend)
+        elif cid == M_SUBMESH_OPERATION:
+            info["operation"] = operation_name(r.ushort())
+    return info
+
+def _read_lod(r, end, version):
+    v18 = MESH_VERSIONS.index("1.8")
+    strategy = "distance_sphere"
+    if version >= v18:
+        strategy = r.string()
+    num_levels = r.ushort()
+    if version <= v18:
+        r.bool()  # manual
+
+    levels = []
+    for cid, _ in r.chunks(end):
+        # v1.100 dropped the usage chunk that wraps the manual and generated chunks
+        if cid in (M_MESH_LOD_USAGE, M_MESH_LOD_MANUAL, M_MESH_LOD_GENERATED):
+            value = r.float()
+            # older files store the squared distance
+            levels.append(value ** 0.5 if version < v18 else value)
+    return strategy, levels[:num_levels - 1]
+
+def map_file(f):
+    if os.fstat(f.fileno()).st_size == 0:
+        raise MeshFormatError("empty file")
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def read_skeleton_animations(path):
+    """return name and length of the animations in a binary .skeleton file"""
+    with open(path, "rb") as f, map_file(f) as buf:
+        r = ChunkReader(buf)
+        ret = []
+        for cid, _ in r.chunks(len(buf)):
+            if cid == SKELETON_ANIMATION:
+                name = r.string()
+                ret.append({"name": name, "length": r.float()})
+        return ret
+
+def read_mesh_summary(path):
+    """
+    return the properties shown in the sidebar, in the same layout as mesh_summary in ogre_mesh_viewer
+
+    skeletal animations are only listed if the linked skeleton is found next to the mesh
+    """
+    with open(path, "rb") as f, map_file(f) as buf:
+        r = ChunkReader(buf)
+        version = version_index(r.version)
+
+        ret = {"name": os.path.basename(path), "shared_vertices": None, "submeshes": [], "skeleton": None,
+               "vertex_animation": False, "animations": [], "lod_strategy": "distance_sphere", "lod_levels": [],
+               "bounds": None}
+
+        for cid, end in r.chunks(len(buf)):
+            if cid != M_MESH:
+                continue
+            r.bool()  # skeletally animated
+            for cid, cend in r.chunks(end):
+                if cid == M_GEOMETRY:
+                    ret["shared_vertices"], ret["shared_vertex_decl"] = _read_geometry(r, cend)
+                elif cid == M_SUBMESH:
+                    ret["submeshes"].append(_read_submesh(r, cend))
+                elif cid == M_MESH_SKELETON_LINK:
+                    ret["skeleton"] = r.string()
+                elif cid == M_MESH_LOD_LEVEL:
+                    ret["lod_strategy"], ret["lod_levels"] = _read_lod(r, cend, version)
+                elif cid == M_MESH_BOUNDS:
+                    minx, miny, minz, maxx, maxy, maxz, radius = r.unpack("7f")
+                    ret["bounds"] = {"size": [maxx - minx, maxy - miny, maxz - minz],
+                                     "center": [(maxx + minx) / 2, (maxy + miny) / 2, (maxz + minz) / 2],
+                                     "radius": radius}
+                elif cid == M_ANIMATIONS:
+                    ret["vertex_animation"] = True
+                    for aid, _ in r.chunks(cend):
+                        if aid == M_ANIMATION:
+                            name = r.string()
+                            ret["animations"].append({"name": name, "length": r.float()})
+
+    if ret["skeleton"]:
+        skel_path = os.path.join(os.path.dirname(path), ret["skeleton"])
+        if os.path.exists(skel_path):
+            ret["animations"] = read_skeleton_animations(skel_path) + ret["animations"]
+
+    return ret
+
+def read_mesh_layout(path):
+    """
+    file offsets of the vertex and index data of a binary .mesh, in the file's byte order given by endian
+
+    geometries list the vertex count, the declaration as (source, type, semantic, offset, index) tuples and
+    the vertex buffers as {source: (offset, vertex size)}. Submeshes list their material, operation and index
+    data, with geometry None if they use the shared one.
+    """
+    with open(path, "rb") as f, map_file(f) as buf:
+        r = ChunkReader(buf)
+        version_index(r.version)
+
+        ret = {"endian": r.endian, "shared": None, "submeshes": [], "bounds": None}
+        for cid, end in r.chunks(len(buf)):
+            if cid != M_MESH:
+                continue
+            r.bool()  # skeletally animated
+            for cid, cend in r.chunks(end):
+                if cid == M_GEOMETRY:
+                    ret["shared"] = _read_geometry_layout(r, cend)
+                elif cid == M_SUBMESH:
+                    ret["submeshes"].append(_read_submesh_layout(r, cend))
+                elif cid == M_MESH_BOUNDS:
+                    ret["bounds"] = r.unpack("6f")  # min xyz, max xyz
+    return ret
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="print the properties of binary Ogre .mesh files as NDJSON")
+    parser.add_argument("infile", nargs="+", help="path to a ogre .mesh")
+    args = parser.parse_args()
+
+    for path in args.infile:
+        print(json.dumps(read_mesh_summary(path)))
@@ -0,0 +1,311 @@
+"""
+Stream meshes too large to load at once from a memory mapped binary .mesh
+
+The triangles of each triangle list submesh are bucketed into a grid, making spatially coherent chunks
+with their own bounds. The triangle numbers sorted by chunk go to a memory mapped temporary file,
+so neither the partition nor the source buffers have to fit into memory. Chunks are gathered on a worker
+thread and uploaded as meshes of their own, nearest visible first, while the farthest are dropped
+to stay within the memory budget.
+"""
+import collections
+import tempfile
+
+import numpy as np
+
+import Ogre
+
+from ogre_mesh_analysis import OT_TRIANGLE_LIST
+from ogre_mesh_buffers import create_index_buffer, create_vertex_buffer
+from ogre_mesh_reader import MeshFormatError, map_file, read_mesh_layout
+
+class MeshStream:
+    """
+    shows a .mesh chunk by chunk
+
+    partition runs once on a worker thread, afterwards update is called every frame on the render thread.
+    """
+
+    def __init__(self, path, scn_mgr, group, budget=512 << 20, chunk_triangles=1 << 16):
+        self.layout = read_mesh_layout(path)
+        if self.layout["endian"] != "<":
+            raise MeshFormatError("only little endian files can be streamed")
+        self.file = open(path, "rb")
+        self.buf = map_file(self.file)
+
+        self.scn_mgr = scn_mgr
+        self.group = group
+        self.node = scn_mgr.getRootSceneNode().createChildSceneNode()
+        self.prefix = "{}#{}/".format(path, id(self))
+        self.budget = budget
+        self.chunk_triangles = chunk_triangles
+        self.uploads_per_frame = 2
+        self.max_gathering = 2
+
+        self.executor = None
+        self.cancelled = False
+        self.progress = 0.0  # of the partition
+        self.partitioned = None  # future of partition
+        self.order_file = None
+        self.order = None  # triangle numbers grouped by chunk
+
+        # per chunk
+        self.submesh = None
+        self.start = None  # into order
+        self.count = None
+        self.bmin = None
+        self.bmax = None
+        self.estimate = None  # bytes before it is gathered
+
+        self.gathering = {}  # chunk: future of gather
+        self.loaded = {}  # chunk: (entity, bytes)
+        self.reserved = 0  # bytes of the chunks being gathered
+        self.uploaded = 0  # bytes of the loaded chunks
+        self.peak = 0
+        self.visible = 0
+        self.dropped = 0
+
+    @property
+    def num_chunks(self):
+        return 0 if self.count is None else len(self.count)
+
+    @property
+    def ready(self):
+        return self.partitioned is not None and self.partitioned.done() and self.partitioned.exception() is None
+
+    def start_partition(self, executor):
+        """partition on executor, which also gathers the chunks later"""
+        self.executor = executor
+        self.partitioned = executor.submit(self.partition)
+
+    def _geometry(self, sm):
+        return self.layout["shared"] if sm["geometry"] is None else sm["geometry"]
+
+    def _rows(self, geom, source):
+        offset, vertex_size = geom["buffers"][source]
+        return np.frombuffer(self.buf, np.uint8, geom["vertices"] * vertex_size, offset).reshape(-1, vertex_size)
+
+    def _positions(self, geom):
+        """strided float32 view of the positions"""
+        for source, vtype, semantic, offset, _ in geom["elements"]:
+            if semantic == Ogre.VES_POSITION:
+                if vtype not in (Ogre.VET_FLOAT3, Ogre.VET_FLOAT4):
+                    raise MeshFormatError("positions must be float3 or float4 to be streamed")
+                start, vertex_size = geom["buffers"][source]
+                return np.ndarray((geom["vertices"], 3), np.float32, self.buf, start + offset, (vertex_size, 4))
+        raise MeshFormatError("geometry without positions")
+
+    def _triangles(self, sm):
+        dtype = np.uint32 if sm["index_bits"] == 32 else np.uint16
+        count = sm["indices"] // 3 * 3
+        return np.frombuffer(self.buf, dtype, count, sm["index_offset"]).reshape(-1, 3)
+
+    def _cells(self, tris, positions, lo, cell_size, dims):
+        centroids = positions[tris.ravel()].reshape(-1, 3, 3).mean(axis=1)
+        xyz = np.clip(((centroids - lo) / cell_size).astype(np.int64), 0, dims - 1)
+        return (xyz[:, 0] * dims[1] + xyz[:, 1]) * dims[2] + xyz[:, 2]
+
+    def partition(self, block=1 << 20):
+        """
+        bucket the triangles of each submesh into chunks of about chunk_triangles
+
+        Two passes over the triangles, the first counts them and accumulates the bounds per grid cell,
+        the second writes their numbers to the cells' ranges in order.
+        """
+        submeshes = [(i, sm) for i, sm in enumerate(self.layout["submeshes"])
+                     if sm["operation"] == OT_TRIANGLE_LIST and sm["indices"] >= 3]
+        total = sum(sm["indices"] // 3 for _, sm in submeshes)
+        if total == 0:
+            raise MeshFormatError("no triangle lists to stream")
+        self.order_file = tempfile.TemporaryFile()
+        self.order = np.memmap(self.order_file, np.uint32, "w+", shape=(total,))
+
+        chunks = collections.defaultdict(list)
+        done, base = 0, 0
+        for i, sm in submeshes:
+            tris = self._triangles(sm)
+            positions = self._positions(self._geometry(sm))
+            if self.layout["bounds"] is not None:
+                lo, hi = np.array(self.layout["bounds"][:3]), np.array(self.layout["bounds"][3:])
+            else:
+                lo, hi = positions.min(axis=0).astype(np.float64), positions.max(axis=0).astype(np.float64)
+
+            # cubic cells, unless the mesh is flat along an axis
+            cells = max(1, len(tris) // self.chunk_triangles)
+            extent = np.maximum(hi - lo, (hi - lo).max() * 1e-3 + 1e-30)
+            cell_size = (np.prod(extent) / cells) ** (1 / 3)
+            dims = np.maximum(np.ceil(extent / cell_size), 1).astype(np.int64)
+            cell_size = extent / dims
+            ncells = int(np.prod(dims))
+
+            counts = np.zeros(ncells, np.int64)
+            bmin = np.full((ncells, 3), np.inf)
+            bmax = np.full((ncells, 3), -np.inf)
+            for s in range(0, len(tris), block):
+                if self.cancelled:
+                    return
+                t = tris[s:s + block]
+                cell = self._cells(t, positions, lo, cell_size, dims)
+                counts += np.bincount(cell, minlength=ncells)
+
+                corners = np.repeat(cell, 3)
+                order = np.argsort(corners, kind="stable")
+                used, first = np.unique(corners[order], return_index=True)
+                p = positions[t.ravel()][order]
+                bmin[used] = np.minimum(bmin[used], np.minimum.reduceat(p, first, axis=0))
+                bmax[used] = np.maximum(bmax[used], np.maximum.reduceat(p, first, axis=0))
+                done += len(t)
+                self.progress = 0.5 * done / total
+
+            offsets = base + np.concatenate(([0], np.cumsum(counts)[:-1]))
+            fill = offsets.copy()
+            for s in range(0, len(tris), block):
+                if self.cancelled:
+                    return
+                cell = self._cells(tris[s:s + block], positions, lo, cell_size, dims)
+                order = np.argsort(cell, kind="stable")
+                used, first, num = np.unique(cell[order], return_index=True, return_counts=True)
+                rank = np.arange(len(order)) - np.repeat(first, num)
+                self.order[fill[cell[order]] + rank] = s + order
+                fill[used] += num
+                done += len(order)
+                self.progress = 0.5 * done / total
+
+            vertex_size = sum(size for _, size in self._geometry(sm)["buffers"].values())
+            for c in np.flatnonzero(counts):
+                chunks["submesh"].append(i)
+                chunks["start"].append(offsets[c])
+                chunks["count"].append(counts[c])
+                chunks["bmin"].append(bmin[c])
+                chunks["bmax"].append(bmax[c])
+                # about half as many vertices as triangles in a closed mesh
+                chunks["estimate"].append(counts[c] * (3 * sm["index_bits"] // 8 + vertex_size // 2))
+            base += len(tris)
+
+        self.order.flush()
+        for key, values in chunks.items():
+            setattr(self, key, np.array(values))
+        self.progress = 1.0
+
+    def gather(self, chunk):
+        """copy the vertices and local indices of chunk, on a worker thread"""
+        sm = self.layout["submeshes"][self.submesh[chunk]]
+        geom = self._geometry(sm)
+        start = self.start[chunk]
+        # sorted, so the index data is read front to back
+        numbers = np.sort(self.order[start:start + self.count[chunk]])
+        used, indices = np.unique(self._triangles(sm)[numbers], return_inverse=True)
+        indices = indices.ravel().astype(np.uint16 if len(used) <= 0x10000 else np.uint32)
+        return {source: self._rows(geom, source)[used] for source in geom["buffers"]}, indices
+
+    def _upload(self, chunk, buffers, indices):
+        sm = self.layout["submeshes"][self.submesh[chunk]]
+        geom = self._geometry(sm)
+        mesh = Ogre.MeshManager.getSingleton().createManual(self.prefix + str(chunk), self.group)
+
+        vdata = Ogre.VertexData()
+        vdata.vertexCount = len(next(iter(buffers.values())))
+        decl = vdata.vertexDeclaration
+        for source, vtype, semantic, offset, index in geom["elements"]:
+            decl.addElement(source, offset, vtype, semantic, index)
+        for source, rows in buffers.items():
+            vdata.vertexBufferBinding.setBinding(source, create_vertex_buffer(rows))
+
+        sub = mesh.createSubMesh()
+        sub.useSharedVertices = False
+        vdata.disown()  # owned by the submesh now
+        sub.vertexData = vdata
+        sub.indexData.indexBuffer = create_index_buffer(indices)
+        sub.indexData.indexCount = len(indices)
+        sub.setMaterialName(sm["material"])
+
+        lo, hi = self.bmin[chunk], self.bmax[chunk]
+        box = Ogre.AxisAlignedBox(Ogre.Vector3(*map(float, lo)), Ogre.Vector3(*map(float, hi)))
+        mesh._setBounds(box)
+        # measured from the mesh origin, not the box centre, as chunks lie anywhere in the mesh
+        mesh._setBoundingSphereRadius(Ogre.Math.boundingRadiusFromAABB(box))
+        entity = self.scn_mgr.createEntity(mesh)
+        self.node.attachObject(entity)
+
+        nbytes = sum(rows.nbytes for rows in buffers.values()) + sub.indexData.indexBuffer.getSizeInBytes()
+        self.loaded[chunk] = (entity, nbytes)
+        self.uploaded += nbytes
+        self.peak = max(self.peak, self.uploaded)
+
+    def _drop(self, chunk):
+        entity, nbytes = self.loaded.pop(chunk)
+        mesh = entity.getMesh()
+        self.scn_mgr.destroyEntity(entity)
+        Ogre.MeshManager.getSingleton().remove(mesh)
+        self.uploaded -= nbytes
+        self.dropped += 1
+
+    def _visible(self, cam):
+        """mask of the chunks intersecting the view frustum"""
+        visible = np.ones(self.num_chunks, bool)
+        infinite = cam.getFarClipDistance() == 0
+        for i in range(6):
+            if i == Ogre.FRUSTUM_PLANE_FAR and infinite:
+                continue
+            plane = cam.getFrustumPlane(i)
+            n = np.array([plane.normal[0], plane.normal[1], plane.normal[2]])
+            # the box corner farthest along the inward normal
+            corner = np.where(n >= 0, self.bmax, self.bmin)
+            visible &= corner @ n + plane.d >= 0
+        return visible
+
+    def update(self, cam):
+        """upload the gathered chunks and request the next ones, raising what the partition raised"""
+        if not self.partitioned.done():
+            return
+        self.partitioned.result()
+
+        pos = cam.getDerivedPosition()
+        pos = np.array([pos[0], pos[1], pos[2]])
+        dist = (np.maximum(np.maximum(self.bmin - pos, pos - self.bmax), 0) ** 2).sum(axis=1)
+        visible = self._visible(cam)
+        self.visible = int(visible.sum())
+
+        uploads = 0
+        for chunk, future in list(self.gathering.items()):
+            if uploads == self.uploads_per_frame:
+                break
+            if not future.done():
+                continue
+            del self.gathering[chunk]
+            self.reserved -= self.estimate[chunk]
+            buffers, indices = future.result()
+            self._upload(chunk, buffers, indices)
+            uploads += 1
+
+        # the loaded chunks to drop first, invisible and farthest
+        victims = sorted(self.loaded, key=lambda c: (bool(visible[c]), -dist[c]))
+        wanted = [c for c in np.flatnonzero(visible)[np.argsort(dist[visible])]
+                  if c not in self.loaded and c not in self.gathering]
+        for chunk in wanted[:self.max_gathering - len(self.gathering)]:
+            while victims and self.uploaded + self.reserved + self.estimate[chunk] > self.budget and \
+                    (not visible[victims[0]] or dist[victims[0]] > dist[chunk]):
+                self._drop(victims.pop(0))
+            if self.uploaded + self.reserved + self.estimate[chunk] > self.budget:
+                break
+            self.reserved += self.estimate[chunk]
+            self.gathering[chunk] = self.executor.submit(self.gather, chunk)
+
+    def close(self):
+        """drop all chunks and wait for the worker to let go of the mapping"""
+        self.cancelled = True
+        for future in list(self.gathering.values()) + [self.partitioned]:
+            if future is not None and not future.cancel():
+                future.exception()
+        self.gathering = {}
+        for chunk in list(self.loaded):
+            self._drop(chunk)
+        self.scn_mgr.destroySceneNode(self.node)
+
+        self.order = None
+        if self.order_file is not None:
+            self.order_file.close()
+        try:
+            self.buf.close()
+        except BufferError:
+            pass  # still viewed by an array, unmapped once that is collected
+        self.file.close()
@@ -1,3 +1,6 @@
+import time
+IMPORT_START = time.perf_counter()
+
 import Ogre
 import Ogre.RTShader as OgreRTShader
 import Ogre.Bites as OgreBites
@@ -6,21 +9,67 @@ import Ogre.Overlay
 import Ogre.ImGui as ImGui
 
 import os.path
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import fnmatch
+import functools
+import itertools
+import json
+import math
+import sys
+import threading
+import types
+
+try:
+    import resource
+except ImportError:
+    resource = None  # not on Windows
+
+from ogre_mesh_reader import VES2STR, VET2STR, operation_name, read_mesh_summary
+from ogre_mesh_cache import ConversionCache, ScriptIndex, SummaryCache, script_symbols
+from ogre_mesh_cache import CONVERSION_CACHE_DIR, SCRIPT_INDEX_NAME, SUMMARY_CACHE_NAME
+from ogre_mesh_watch import create_watcher
+from ogre_mesh_animation import AnimationProfiler, apply_pose, bake_animation, release_bones
+
+try:
+    from ogre_mesh_analysis import analyze_mesh
+    from ogre_mesh_buffers import read_mesh_buffers
+    from ogre_mesh_bvh import build_mesh_bvh
+    from ogre_mesh_optimize import optimize_mesh
+    from ogre_mesh_compact import compact_mesh
+    from ogre_mesh_lod import LOD_STRATEGIES, apply_lods, generate_lods, lod_stats, set_lod_value
+    from ogre_mesh_stream import MeshStream
+except ImportError:
+    # the analysis, optimization, compaction, LOD generation, streaming and exact picking need numpy
+    analyze_mesh = None
+    build_mesh_bvh = None
+    optimize_mesh = None
+    compact_mesh = None
+    generate_lods = None
+    lod_stats = None
+    LOD_STRATEGIES = ()
+    MeshStream = None
 
 RGN_MESHVIEWER = "OgreMeshViewer"
+OPTIMIZED_SUFFIX = "_optimized.mesh"
+COMPACTED_SUFFIX = "_compacted.mesh"
+LOD_SUFFIX = "_lod.mesh"
+NATIVE_EXTS = (".mesh", ".scene")
+# formats offered by File -> Open, assimp reads many more
+OPENABLE_EXTS = NATIVE_EXTS + (".obj", ".fbx", ".ply", ".gltf", ".glb", ".dae", ".3ds", ".stl", ".blend")
+RECENT_FILES_NAME = "recent.json"
+# GL works with Mesa llvmpipe on headless nodes, given an X server like Xvfb
+THUMBNAIL_RENDER_SYSTEM = "OpenGL 3+ Rendering Subsystem"
 
-VES2STR = ("ERROR", "Position", "Blend Weights", "Blend Indices", "Normal", "Diffuse", "Specular", "Texcoord", "Binormal", "Tangent")
-VET2STR = ("float", "float2", "float3", "float4", "ERROR",
-           "short", "short2", "short3", "short4", "ubyte4", "argb", "abgr",
-           "double", "double2", "double3", "double4",
-           "ushort", "ushort2", "ushort3", "ushort4",
-           "int", "int2", "int3", "int4",
-           "uint", "uint2", "uint3", "uint4",
-           "byte4", "byte4n", "ubyte4n", "short2n", "short4n", "ushort2n", "ushort4n", "int1010102n")
+def conversion_settings():
+    """everything besides the source file that affects an import, the assimp codec has no options"""
+    return {"ogre": Ogre.OGRE_VERSION, "format": 1}
 
-ROP2STR = ("ERROR", "Point List", "Line List", "Line Strip", "Triangle List", "Triangle Strip", "Triangle Fan")
 
 def show_vertex_decl(decl):
+    """show the [semantic, type] pairs as returned by vertex_decl_summary"""
     ImGui.Columns(2)
     ImGui.Text("Semantic")
     ImGui.NextColumn()
@@ -28,28 +77,283 @@ def show_vertex_decl(decl):
     ImGui.NextColumn()
     ImGui.Separator()
 
-    for e in decl.getElements():
-        ImGui.Text(VES2STR[e.getSemantic()])
+    for semantic, vtype in decl:
+        ImGui.Text(semantic)
         ImGui.NextColumn()
-        ImGui.Text(VET2STR[e.getType()])
+        ImGui.Text(vtype)
         ImGui.NextColumn()
     ImGui.Columns(1)
 
 def printable(str):
     return str.encode("utf-8", "replace").decode()
 
+def vertex_decl_summary(decl):
+    return [[VES2STR[e.getSemantic()], VET2STR[e.getType()]] for e in decl.getElements()]
+
+def buffer_memory(vertex_data=None, index_data=None):
+    """bytes of the hardware buffers, shadow counts the additional copies in system memory"""
+    ret = {"vertex": 0, "index": 0, "shadow": 0}
+    if vertex_data:
+        for buf in vertex_data.vertexBufferBinding.getBindings().values():
+            ret["vertex"] += buf.getSizeInBytes()
+            ret["shadow"] += buf.getSizeInBytes() if buf.hasShadowBuffer() else 0
+    if index_data and index_data.indexCount:
+        buf = index_data.indexBuffer
+        ret["index"] = buf.getSizeInBytes()
+        ret["shadow"] += buf.getSizeInBytes() if buf.hasShadowBuffer() else 0
+    return ret
+
+def peak_rss():
+    """peak resident memory of the process in bytes or None where it is unknown"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+def texture_ptrs(mat):
+    """the loaded textures referenced by a material"""
+    if mat is None:
+        return
+    for tech in mat.getTechniques():
+        for p in tech.getPasses():
+            for tus in p.getTextureUnitStates():
+                for frame in range(tus.getNumFrames()):
+                    tex = tus._getTexturePtr(frame)
+                    if tex:
+                        yield tex
+
+def material_textures(mat):
+    """{texture name: bytes} of the loaded textures referenced by a material"""
+    return {tex.getName(): tex.getSize() for tex in texture_ptrs(mat)}
+
+def resource_path(name, group):
+    """the file a resource is loaded from or None if it is not in a file system location"""
+    rgm = Ogre.ResourceGroupManager.getSingleton()
+    try:
+        if group == Ogre.RGN_AUTODETECT:
+            group = rgm.findGroupContainingResource(name)
+        locations = rgm.listResourceLocations(group)
+    except RuntimeError:
+        return None
+
+    for loc in locations:
+        path = os.path.join(loc, name)
+        if os.path.isfile(path):
+            return os.path.abspath(path)
+    return None
+
+def script_materials(path):
+    """names of the materials defined in a material script"""
+    with open(path, errors="replace") as f:
+        return [name for kind, name in script_symbols(f.read())[0] if kind == "material"]
+
+def mesh_triangles(mesh):
+    """number of triangles drawn for the base LOD level of mesh"""
+    ret = 0
+    for sm in mesh.getSubMeshes():
+        if sm.indexData.indexCount:
+            count = sm.indexData.indexCount
+        else:
+            count = (mesh.sharedVertexData if sm.useSharedVertices else sm.vertexData).vertexCount
+
+        if sm.operationType == Ogre.RenderOperation.OT_TRIANGLE_LIST:
+            ret += count // 3
+        elif sm.operationType in (Ogre.RenderOperation.OT_TRIANGLE_STRIP, Ogre.RenderOperation.OT_TRIANGLE_FAN):
+            ret += max(count - 2, 0)
+    return ret
+
+def mesh_summary(mesh):
+    """collect the properties shown in the sidebar as json serializable types"""
+    ret = {"name": printable(mesh.getName())}
+
+    if mesh.sharedVertexData:
+        ret["shared_vertices"] = mesh.sharedVertexData.vertexCount
+        ret["shared_vertex_decl"] = vertex_decl_summary(mesh.sharedVertexData.vertexDeclaration)
+    else:
+        ret["shared_vertices"] = None
+
+    submeshes = []
+    for sm in mesh.getSubMeshes():
+        info = {"material": printable(sm.getMaterialName())}
+        info["operation"] = operation_name(sm.operationType)
+
+        info["indices"] = sm.indexData.indexCount
+        info["index_bits"] = sm.indexData.indexBuffer.getIndexSize() * 8 if sm.indexData.indexCount else None
+
+        if sm.vertexData:
+            info["vertices"] = sm.vertexData.vertexCount
+            info["vertex_decl"] = vertex_decl_summary(sm.vertexData.vertexDeclaration)
+        else:
+            info["vertices"] = None  # shared
+        submeshes.append(info)
+    ret["submeshes"] = submeshes
+
+    # textures are accounted for when drawing, as they are loaded separately
+    ret["memory"] = {"shared": buffer_memory(mesh.sharedVertexData) if mesh.sharedVertexData else None,
+                     "submeshes": [buffer_memory(None if sm.useSharedVertices else sm.vertexData, sm.indexData)
+                                   for sm in mesh.getSubMeshes()]}
+
+    ret["skeleton"] = mesh.getSkeletonName() if mesh.hasSkeleton() else None
+    ret["vertex_animation"] = mesh.hasVertexAnimation()
+
+    states = Ogre.AnimationStateSet()
+    mesh._initAnimationState(states)
+    ret["animations"] = [{"name": name, "length": astate.getLength()}
+                         for name, astate in states.getAnimationStates().items()]
+
+    ret["lod_strategy"] = mesh.getLodStrategy().getName()
+    ret["lod_levels"] = [mesh.getLodLevel(i).userValue for i in range(1, mesh.getNumLodLevels())]
+
+    bounds = mesh.getBounds()
+    s = bounds.getSize()
+    c = bounds.getCenter()
+    ret["bounds"] = {"size": [s[0], s[1], s[2]], "center": [c[0], c[1], c[2]],
+                     "radius": mesh.getBoundingSphereRadius()}
+    return ret
+
+def freeze(obj):
+    """read-only copy of a summary, so the sidebar model cannot drift from the mesh it was built from"""
+    if isinstance(obj, dict):
+        return types.MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(freeze(v) for v in obj)
+    return obj
+
+def mesh_key(mesh):
+    """meshes of the same name may exist in several resource groups"""
+    return mesh.getGroup(), mesh.getName()
+
+def movable_objects(scn_mgr):
+    """(type, name) of all movable objects including the cameras"""
+    ret = {("Camera", name) for name in scn_mgr.getCameras().keys()}
+    for type_name in Ogre.Root.getSingleton().getMovableObjectFactories().keys():
+        ret.update((type_name, name) for name in scn_mgr.getMovableObjects(type_name).keys())
+    return ret
+
+def load_recent(path):
+    try:
+        with open(path) as f:
+            return [p for p in json.load(f) if isinstance(p, str)]
+    except (OSError, ValueError):
+        return []
+
+def locate_rescfg(rescfg):
+    rgm = Ogre.ResourceGroupManager.getSingleton()
+    cfg = Ogre.ConfigFile()
+    cfg.loadDirect(rescfg)
+
+    for sec, settings in cfg.getSettingsBySection().items():
+        for kind, loc in settings.items():
+            rgm.addResourceLocation(loc, kind, sec)
+
+class ScriptResolver:
+    """
+    parses the material and GPU program scripts of a resource group only once something they define is needed
+
+    Which script defines which name is taken from a ScriptIndex. Only groups of plain directories are supported,
+    all other scripts, like particle systems, are parsed when the group is initialised as usual.
+    """
+
+    LAZY_PATTERNS = ("*.material", "*.program")
+
+    def __init__(self, index):
+        self.index = index
+        self.groups = {}  # group: locations, of the groups whose scripts were not parsed yet
+        self.defined = None  # (kind, name): [(group, script path)]
+        self.refs = {}  # script path: [(kind, name)]
+        self.parsed = set()
+
+    def initialise(self, group):
+        """initialise group without parsing its material and program scripts, False if it has other locations"""
+        rgm = Ogre.ResourceGroupManager.getSingleton()
+        locations = [os.path.abspath(loc) for loc in rgm.listResourceLocations(group)]
+        if not all(os.path.isdir(loc) for loc in locations):
+            return False
+
+        compiler = Ogre.ScriptCompilerManager.getSingleton()
+        rgm._unregisterScriptLoader(compiler)
+        try:
+            rgm.initialiseResourceGroup(group)
+        finally:
+            rgm._registerScriptLoader(compiler)
+
+        eager = [p for p in compiler.getScriptPatterns() if p not in self.LAZY_PATTERNS]
+        for loc in locations:
+            for fn in sorted(os.listdir(loc)):
+                if any(fnmatch.fnmatch(fn, p) for p in eager):
+                    compiler.parseScript(rgm.openResource(fn, group), group)
+
+        self.groups[group] = locations
+        self.defined = None  # scan again, including the new group
+        return True
+
+    def _scan(self):
+        scripts = {}
+        for group, locations in self.groups.items():
+            for loc in locations:
+                for fn in os.listdir(loc):
+                    if any(fnmatch.fnmatch(fn, p) for p in self.LAZY_PATTERNS):
+                        scripts[os.path.join(loc, fn)] = group
+
+        self.defined = collections.defaultdict(list)
+        for path, (defines, refs) in self.index.lookup(scripts).items():
+            for kind, name in defines:
+                self.defined[(kind, name)].append((scripts[path], path))
+            self.refs[path] = refs
+
+    def require(self, kind, name, group):
+        """parse the script defining name, preferably the one in group, and the scripts it depends on"""
+        if self.defined is None:
+            self._scan()
+
+        found = self.defined.get((kind, name), [])
+        found = [f for f in found if f[0] == group] or found[:1]
+        for script_group, path in found:
+            if path in self.parsed:
+                continue
+            self.parsed.add(path)
+            # parents and programs must be known before the script is compiled
+            for ref_kind, ref_name in self.refs[path]:
+                self.require(ref_kind, ref_name, script_group)
+
+            rgm = Ogre.ResourceGroupManager.getSingleton()
+            stream = rgm.openResource(os.path.basename(path), script_group)
+            Ogre.ScriptCompilerManager.getSingleton().parseScript(stream, script_group)
+
 class MaterialCreator(Ogre.MeshSerializerListener):
+    """
+    creates placeholders for the materials a mesh refers to, but that are not defined anywhere
 
-    def __init__(self):
+    processMaterialName runs on whichever thread deserializes the mesh, which is a worker thread
+    when the background queue loads it. The resource managers lock themselves, the state kept here
+    and the ScriptResolver do not, so every call holds the lock.
+    """
+
+    def __init__(self, scripts=None):
         Ogre.MeshSerializerListener.__init__(self)
+        self.lock = threading.Lock()
+        self.missing = []
+        self.scripts = scripts
+
+    def reset(self):
+        """forget the missing materials, before loading the next mesh"""
+        with self.lock:
+            self.missing = []
 
     def processMaterialName(self, mesh, name):
+        with self.lock:
+            self._ensure_material(mesh.getGroup(), name)
+
+    def _ensure_material(self, group, name):
         # ensure some material exists so we can display the name
         mat_mgr = Ogre.MaterialManager.getSingleton()
-        if not mat_mgr.resourceExists(name, mesh.getGroup()):
+        if self.scripts is not None and not mat_mgr.resourceExists(name, group):
+            self.scripts.require("material", name, group)
+        if not mat_mgr.resourceExists(name, group):
+            self.missing.append(printable(name))
             lmgr = Ogre.LogManager.getSingleton()
             try:
-                mat = mat_mgr.create(name, mesh.getGroup())
+                mat = mat_mgr.create(name, group)
                 lmgr.logWarning("could not find material '{}'".format(printable(mat.getName())))
             except RuntimeError:
                 # do not crash if name is ""
@@ -61,16 +365,59 @@ class MaterialCreator(Ogre.MeshSerializerListener):
     def processMeshCompleted(self, mesh): pass
 
 class LogWindow(Ogre.LogListener):
-    def __init__(self):
+    """keeps the last capacity messages in a ring buffer and only renders the visible rows"""
+
+    # minimal level shown by each filter choice
+    FILTERS = (("All", 0), ("Warnings+", 3), ("Errors only", 4))
+    # written with each line of the spill file, by LogMessageLevel
+    LEVEL_NAMES = {1: "TRIVIAL", 2: "NORMAL", 3: "WARNING", 4: "ERROR"}
+
+    def __init__(self, capacity=10000, spill_path=None):
         Ogre.LogListener.__init__(self)
 
         self.show = False
-        self.items = []
+        self.capacity = capacity
+        self.items = [None] * capacity
+        self.count = 0  # messages logged so far, the next one goes to items[count % capacity]
+        # message numbers at or above each filter level, never more than the ring buffer holds
+        self.index = {lvl: collections.deque(maxlen=capacity) for _, lvl in self.FILTERS if lvl > 0}
+        self.min_level = 0
+
+        # the spill file receives every message, including the ones dropped from the ring buffer
+        # line buffered, so it keeps the messages up to a crash
+        self.spill = open(spill_path, "a", buffering=1) if spill_path else None
 
         self.font = None
-    
+
+    @property
+    def dropped(self):
+        return max(0, self.count - self.capacity)
+
     def messageLogged(self, msg, lvl, *args):
-        self.items.append((printable(msg.replace("%", "%%")), lvl))
+        msg = printable(msg)
+        self.items[self.count % self.capacity] = (msg, lvl)
+        for min_level, index in self.index.items():
+            if lvl >= min_level:
+                index.append(self.count)
+        self.count += 1
+
+        if self.spill:
+            self.spill.write("{}: {}\n".format(self.LEVEL_NAMES.get(lvl, lvl), msg))
+
+    def close(self):
+        if self.spill:
+            self.spill.close()
+            self.spill = None
+
+    def visible(self):
+        """message numbers passing the current filter, oldest first"""
+        if self.min_level == 0:
+            return range(self.dropped, self.count)
+
+        index = self.index[self.min_level]
+        while index and index[0] < self.dropped:
+            index.popleft()
+        return index
 
     def draw(self):
         if not self.show:
@@ -79,18 +426,193 @@ class LogWindow(Ogre.LogListener):
         ImGui.SetNextWindowSize(ImGui.ImVec2(500, 400), ImGui.ImGuiCond_FirstUseEver)
         self.show = ImGui.Begin("Log", self.show)[1]
 
+        for label, lvl in self.FILTERS:
+            if ImGui.RadioButton(label, self.min_level == lvl):
+                self.min_level = lvl
+            ImGui.SameLine()
+        if self.dropped:
+            ImGui.TextDisabled("{} older messages dropped".format(self.dropped))
+        else:
+            ImGui.NewLine()
+        ImGui.Separator()
+
+        ImGui.BeginChild("LogLines", ImGui.ImVec2(0, 0), False, ImGui.ImGuiWindowFlags_HorizontalScrollbar)
         ImGui.PushFont(self.font)
-        for msg, lvl in self.items:
-            if lvl == 4:
-                ImGui.PushStyleColor(ImGui.ImGuiCol_Text, ImGui.ImVec4(1, 0.4, 0.4, 1))
-            elif lvl == 3:
-                ImGui.PushStyleColor(ImGui.ImGuiCol_Text, ImGui.ImVec4(1, 0.8, 0.4, 1))
-            ImGui.TextWrapped(msg)
-            if lvl > 2:
-                ImGui.PopStyleColor()
+
+        visible = self.visible()
+        clipper = ImGui.ImGuiListClipper()
+        clipper.Begin(len(visible))
+        while clipper.Step():
+            # indexing a deque walks it, so only iterate the clipped rows
+            for num in itertools.islice(visible, clipper.DisplayStart, clipper.DisplayEnd):
+                msg, lvl = self.items[num % self.capacity]
+                if lvl == 4:
+                    ImGui.PushStyleColor(ImGui.ImGuiCol_Text, ImGui.ImVec4(1, 0.4, 0.4, 1))
+                elif lvl == 3:
+                    ImGui.PushStyleColor(ImGui.ImGuiCol_Text, ImGui.ImVec4(1, 0.8, 0.4, 1))
+                # unlike TextWrapped, this keeps all rows at the same height as required by the clipper
+                ImGui.TextUnformatted(msg)
+                if lvl > 2:
+                    ImGui.PopStyleColor()
+
         ImGui.PopFont()
+        ImGui.EndChild()
         ImGui.End()
 
+class FrameProfiler:
+    """per-phase timings over a rolling window of frames, optionally dumped to CSV"""
+
+    PHASES = ("load", "controllers", "animation", "gui", "scene", "cull", "render", "swap")
+
+    def __init__(self, window=600, csv_path=None):
+        self.frames = collections.deque(maxlen=window)  # (frame ms, {phase: ms})
+        self.current = dict.fromkeys(self.PHASES, 0.0)
+        self.marks = {}
+        self.frame_start = None
+        self.frame_no = 0
+
+        self.csv_file = None
+        self.csv = None
+        if csv_path:
+            self.csv_file = open(csv_path, "w", newline="")
+            self.csv = csv.writer(self.csv_file)
+            self.csv.writerow(("frame", "frame_ms") + self.PHASES)
+
+    def begin(self, phase):
+        self.marks[phase] = time.perf_counter()
+
+    def end(self, phase):
+        start = self.marks.pop(phase, None)
+        if start is not None:
+            self.current[phase] += (time.perf_counter() - start) * 1000
+
+    def next_frame(self):
+        """close the running frame, measured from one frame start to the next"""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            frame_ms = (now - self.frame_start) * 1000
+            self.frames.append((frame_ms, self.current))
+            if self.csv:
+                self.csv.writerow([self.frame_no, "{:.3f}".format(frame_ms)] +
+                                  ["{:.3f}".format(self.current[p]) for p in self.PHASES])
+            self.frame_no += 1
+
+        self.frame_start = now
+        self.current = dict.fromkeys(self.PHASES, 0.0)
+        self.marks.clear()
+
+    def percentiles(self, qs=(50, 95, 99)):
+        ms = sorted(f[0] for f in self.frames)
+        if not ms:
+            return [0.0] * len(qs)
+        return [ms[min(len(ms) - 1, int(len(ms) * q / 100))] for q in qs]
+
+    def worst(self):
+        """frame time and phases of the slowest frame in the window"""
+        return max(self.frames, key=lambda f: f[0], default=(0.0, dict.fromkeys(self.PHASES, 0.0)))
+
+    def phase_means(self):
+        n = max(1, len(self.frames))
+        return {p: sum(f[1][p] for f in self.frames) / n for p in self.PHASES}
+
+    def close(self):
+        if self.csv_file:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv = None
+
+class StartupProfile:
+    """wall time of the startup phases, nested ones are included in their parents"""
+
+    def __init__(self):
+        self.phases = []  # [name, seconds, depth] in order of their start
+        self.depth = 0
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        entry = [name, None, self.depth]
+        self.phases.append(entry)
+        start = time.perf_counter()
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            entry[1] = time.perf_counter() - start
+
+    def add(self, name, seconds):
+        self.phases.append([name, seconds, self.depth])
+
+    def report(self):
+        lines = ["{:<24} {:>9.1f} ms".format("  " * depth + name, seconds * 1000)
+                 for name, seconds, depth in self.phases if seconds is not None]
+        lines.append("{:<24} {:>9.1f} ms".format("total", (time.perf_counter() - IMPORT_START) * 1000))
+        return lines
+
+class LodTimer:
+    """
+    frame and render time with each LOD level forced in turn
+
+    The first frames after switching the level are skipped, as they may still show the previous one.
+    The frame time is capped by vsync, while the render phase only covers issuing the draw calls.
+    """
+
+    def __init__(self, entity, num_levels, frames=60, warmup=5):
+        self.entity = entity
+        self.frames = frames
+        self.warmup = warmup
+        self.queue = collections.deque(range(num_levels))
+        self.level = None
+        self.skipped = 0
+        self.times = collections.defaultdict(list)  # level: [(frame ms, render ms)]
+
+    def step(self, frame):
+        """account the last frame as (frame ms, {phase: ms}) to the forced level, returns False once done"""
+        if self.level is not None:
+            if self.skipped < self.warmup:
+                self.skipped += 1
+            else:
+                self.times[self.level].append((frame[0], frame[1]["render"]))
+            if len(self.times[self.level]) < self.frames:
+                return True
+
+        if not self.queue:
+            self.finish()
+            return False
+        self.level = self.queue.popleft()
+        self.skipped = 0
+        self.entity.setMeshLodBias(1, self.level, self.level)
+        return True
+
+    def finish(self):
+        self.queue.clear()
+        self.entity.setMeshLodBias(1)
+
+    def results(self):
+        """{level: (mean frame ms, mean render ms)}"""
+        return {level: tuple(sum(t) / len(times) for t in zip(*times)) for level, times in self.times.items() if times}
+
+class SceneProfilerHooks(Ogre.SceneManager_Listener):
+    """times the scene graph update and culling of the scene manager"""
+
+    def __init__(self, profiler):
+        Ogre.SceneManager_Listener.__init__(self)
+        self.profiler = profiler
+
+    def preUpdateSceneGraph(self, scn_mgr, cam):
+        self.profiler.begin("scene")
+
+    def postUpdateSceneGraph(self, scn_mgr, cam):
+        self.profiler.end("scene")
+
+    def preFindVisibleObjects(self, scn_mgr, irs, vp):
+        self.profiler.begin("cull")
+
+    def postFindVisibleObjects(self, scn_mgr, irs, vp):
+        self.profiler.end("cull")
+        # ends in MeshViewerGui.postViewportUpdate
+        self.profiler.begin("render")
+
 class MeshViewerGui(Ogre.RenderTargetListener):
 
     def __init__(self, app):
@@ -102,8 +624,75 @@ class MeshViewerGui(Ogre.RenderTargetListener):
 
         self.highlighted = -1
         self.orig_mat = None
+        self.forced_lod = None
         self.logwin = app.logwin
 
+        # sidebar model, rebuilt only when the app loads a new summary
+        self.model = None
+        self.model_src = None
+        self.anim_states = {}
+
+        self.sidebar_ms = 0
+        self.rebuild_every_frame = False  # to compare against querying Ogre on each frame
+        self.expand_all = False  # open every sidebar node, e.g. for benchmarking the worst case
+        self.cache_size = 16  # post-transform cache entries assumed by the analysis
+        self.stress_count = 16  # clones for the animation stress test
+        self.lod_levels = 3  # to generate
+        self.lod_reduction = 0.5  # of the triangles per level
+        self.lod_strategy = "distance"
+
+        self.show_open = False
+        self.browse_dir = None
+        self.browse_entries = []  # (name, path, is directory) of browse_dir
+
+        # outliner counts per path of child indices from the attach_node, computed when first expanded
+        self.node_stats = {}
+        self.mesh_tris = {}  # mesh_key: triangles
+
+    def reset(self):
+        """forget the state tied to the entity, which is about to be destroyed"""
+        self.highlighted = -1
+        self.orig_mat = None
+        self.forced_lod = None
+        self.model = None
+        self.model_src = None
+        self.anim_states = {}
+        self.node_stats = {}
+        self.mesh_tris = {}
+
+    def browse(self, dirname):
+        self.browse_dir = dirname
+        try:
+            entries = [(e.name, e.path, e.is_dir()) for e in os.scandir(dirname) if not e.name.startswith(".")]
+        except OSError as e:
+            Ogre.LogManager.getSingleton().logError(str(e))
+            entries = []
+        self.browse_entries = sorted((e for e in entries if e[2] or e[0].lower().endswith(OPENABLE_EXTS)),
+                                     key=lambda e: (not e[2], e[0].lower()))
+
+    def draw_open(self):
+        """file browser listing the directories and the files the viewer can open"""
+        if self.browse_dir is None:
+            self.browse(os.path.abspath(self.app.filedir))
+
+        ImGui.SetNextWindowSize(ImGui.ImVec2(400, 400), ImGui.ImGuiCond_FirstUseEver)
+        self.show_open = ImGui.Begin("Open", self.show_open)[1]
+        ImGui.Text(self.browse_dir)
+        ImGui.Separator()
+
+        ImGui.BeginChild("Files", ImGui.ImVec2(0, 0), False, 0)
+        if ImGui.Selectable("../", False):
+            self.browse(os.path.dirname(self.browse_dir))
+        for name, path, is_dir in self.browse_entries:
+            if is_dir:
+                if ImGui.Selectable(name + "/", False):
+                    self.browse(path)
+            elif ImGui.Selectable(name, False):
+                self.app.open(path)
+                self.show_open = False
+        ImGui.EndChild()
+        ImGui.End()
+
     def draw_about(self):
         flags = ImGui.ImGuiWindowFlags_AlwaysAutoResize
         self.show_about = ImGui.Begin("About OgreMeshViewer", self.show_about, flags)[1]
@@ -129,182 +718,856 @@ class MeshViewerGui(Ogre.RenderTargetListener):
         ImGui.Text("Average FPS: {:.2f}".format(stats.avgFPS))
         ImGui.Text("Batches: {}".format(stats.batchCount))
         ImGui.Text("Triangles: {}".format(stats.triangleCount))
+        if stats.lastFPS > 0:
+            ImGui.Text("Frame: {:.2f} ms".format(1000 / stats.lastFPS))
+        ImGui.Text("Sidebar: {:.3f} ms".format(self.sidebar_ms))
+        rss = peak_rss()
+        if rss is not None:
+            ImGui.Text("Peak resident memory: {:.0f} MiB".format(rss / (1 << 20)))
+        stream = self.app.stream
+        if stream is not None:
+            ImGui.Text("Streamed: {:.0f} / {:.0f} MiB, peak {:.0f} MiB".format(
+                stream.uploaded / (1 << 20), stream.budget / (1 << 20), stream.peak / (1 << 20)))
+        before = self.app.unbatched_stats
+        if before is not None:
+            ImGui.Separator()
+            ImGui.Text("Before batching: {} batches, {:.2f} FPS".format(*before))
+            ImGui.Text("After batching:  {} batches, {:.2f} FPS".format(stats.batchCount, stats.avgFPS))
+        self.rebuild_every_frame = ImGui.Checkbox("Rebuild sidebar every frame", self.rebuild_every_frame)[1]
+
+        profiler = self.app.profiler
+        ImGui.Separator()
+        p50, p95, p99 = profiler.percentiles()
+        worst_ms, worst_phases = profiler.worst()
+        ImGui.Text("Frame p50/p95/p99: {:.2f} / {:.2f} / {:.2f} ms".format(p50, p95, p99))
+        ImGui.Text("Worst frame: {:.2f} ms".format(worst_ms))
+        if ImGui.IsItemHovered():
+            ImGui.SetTooltip("\n".join("{}: {:.2f} ms".format(p, worst_phases[p]) for p in profiler.PHASES))
+        for phase, ms in profiler.phase_means().items():
+            ImGui.BulletText("{}: {:.3f} ms".format(phase, ms))
+        self.draw_frame_plot(profiler)
         ImGui.End()
 
+    def draw_frame_plot(self, profiler, num_frames=120):
+        # PlotLines needs a float pointer, which the bindings do not map, so draw the lines ourselves
+        frames = list(profiler.frames)[-num_frames:]
+        width, height = 2 * num_frames, ImGui.GetFontSize() * 3
+        origin = ImGui.GetCursorScreenPos()
+        ImGui.Dummy(ImGui.ImVec2(width, height))
+        if len(frames) < 2:
+            return
+
+        draw_list = ImGui.GetWindowDrawList()
+        scale = height / max(max(f[0] for f in frames), 1000 / 30)
+        bottom = origin.y + height
+
+        # 30 and 60 FPS guides
+        guide_col = ImGui.GetColorU32(ImGui.ImVec4(1, 1, 1, 0.2))
+        for ms in (1000 / 30, 1000 / 60):
+            y = bottom - ms * scale
+            draw_list.AddLine(ImGui.ImVec2(origin.x, y), ImGui.ImVec2(origin.x + width, y), guide_col)
+
+        col = ImGui.GetColorU32(ImGui.ImVec4(0.4, 1, 0.4, 1))
+        for i in range(1, len(frames)):
+            p0 = ImGui.ImVec2(origin.x + (i - 1) * 2, bottom - frames[i - 1][0] * scale)
+            p1 = ImGui.ImVec2(origin.x + i * 2, bottom - frames[i][0] * scale)
+            draw_list.AddLine(p0, p1, col)
+
     def draw_loading(self):
         win = self.app.getRenderWindow()
         ImGui.SetNextWindowPos(ImGui.ImVec2(win.getWidth() * 0.5, win.getHeight() * 0.5), 0, ImGui.ImVec2(0.5, 0.5))
 
-        flags = ImGui.ImGuiWindowFlags_NoTitleBar | ImGui.ImGuiWindowFlags_NoResize | ImGui.ImGuiWindowFlags_NoSavedSettings
+        flags = ImGui.ImGuiWindowFlags_NoTitleBar | ImGui.ImGuiWindowFlags_NoResize | ImGui.ImGuiWindowFlags_NoSavedSettings | \
+                ImGui.ImGuiWindowFlags_AlwaysAutoResize
         ImGui.Begin("Loading", True, flags)
         ImGui.Text(self.app.filename)
         ImGui.Separator()
-        ImGui.Text("Loading..            ")
-        ImGui.End()
 
-    def preRenderTargetUpdate(self, evt):
-        if not self.app.cam.getViewport().getOverlaysEnabled():
+        loader = self.app.loader
+        if loader is None:
+            # .scene files are loaded in one go
+            ImGui.Text("Loading..            ")
+            ImGui.End()
             return
 
-        Ogre.Overlay.ImGuiOverlay.NewFrame()
+        if loader.error:
+            ImGui.TextColored(ImGui.ImVec4(1, 0.4, 0.4, 1), loader.error)
+            ImGui.End()
+            return
+
+        ImGui.Text("{}..".format(loader.phase))
+        if loader.total:
+            mb = 1 << 20
+            ImGui.ProgressBar(loader.bytes_read / loader.total, ImGui.ImVec2(ImGui.GetFontSize() * 15, 0),
+                              "{:.1f} / {:.1f} MB".format(loader.bytes_read / mb, loader.total / mb))
+        if loader.num_submeshes:
+            ImGui.Text("Submeshes: {} / {}".format(loader.num_visible, loader.num_submeshes))
+        if loader.textures_pending:
+            ImGui.Text("Textures pending: {}".format(loader.textures_pending))
+        ImGui.End()
 
+    def update_model(self):
+        summary = self.app.summary
         entity = self.app.entity
+        if self.rebuild_every_frame and entity is not None:
+            summary = mesh_summary(entity.getMesh())
 
-        if entity is None and self.app.attach_node is None:
-            self.draw_loading()
+        if summary is self.model_src:
             return
 
-        if ImGui.BeginMainMenuBar():
-            if ImGui.BeginMenu("File"):
-                if ImGui.MenuItem("Select Renderer"):
-                    self.app.getRoot().queueEndRendering()
-                    self.app.restart = True
-                if ImGui.MenuItem("Save Screenshot", "P"):
-                    self.app._save_screenshot()
-                if ImGui.MenuItem("Quit", "Esc"):
-                    self.app.getRoot().queueEndRendering()
-                ImGui.EndMenu()
-            if entity is not None and ImGui.BeginMenu("View"):
-                enode = entity.getParentSceneNode()
-                if ImGui.MenuItem("Show Axes", "A", self.app.axes_visible):
-                    self.app._toggle_axes()
-                if ImGui.MenuItem("Show Bounding Box", "B", enode.getShowBoundingBox()):
-                    self.app._toggle_bbox()
-                if entity.hasSkeleton() and ImGui.MenuItem("Show Skeleton", None, entity.getDisplaySkeleton()):
-                    entity.setDisplaySkeleton(not entity.getDisplaySkeleton())
-                ImGui.EndMenu()
-
-            if ImGui.BeginMenu("Help"):
-                if ImGui.MenuItem("Metrics", None, self.show_metrics):
-                    self.show_metrics = not self.show_metrics
-                if ImGui.MenuItem("Log"):
-                    self.logwin.show = True
-                if ImGui.MenuItem("About"):
-                    self.show_about = True
-                ImGui.EndMenu()
+        self.model_src = summary
+        self.model = freeze(summary) if summary is not None else None
 
-            ImGui.EndMainMenuBar()
+        self.anim_states = {}
+        if entity is not None and entity.getAllAnimationStates() is not None:
+            self.anim_states = dict(entity.getAllAnimationStates().getAnimationStates().items())
 
-        if self.show_about:
-            self.draw_about()
+    def set_highlight(self, highlight):
+        """swap the materials only when the hovered submesh changes"""
+        if highlight == self.highlighted:
+            return
 
-        if self.show_metrics:
-            self.draw_metrics()
+        sub_entities = self.app.entity.getSubEntities()
+        if self.highlighted > -1:
+            sub_entities[self.highlighted].setMaterial(self.orig_mat)
 
-        self.logwin.draw()
+        if highlight > -1:
+            self.orig_mat = sub_entities[highlight].getMaterial()
+            sub_entities[highlight].setMaterial(self.app.highlight_mat)
+        self.highlighted = highlight
 
-        if self.app.attach_node is not None:
-            # no sidebar yet when loading .scene
+    def force_lod(self, level):
+        if level == self.forced_lod:
             return
 
-        # Mesh Info Sidebar
-        mesh = entity.getMesh()
+        if level is None:
+            self.app.entity.setMeshLodBias(1)  # reset LOD override
+        else:
+            self.app.entity.setMeshLodBias(1, level, level)
+        self.forced_lod = level
+
+    def open_next(self):
+        if self.expand_all:
+            ImGui.SetNextItemOpen(True, ImGui.ImGuiCond_Always)
+
+    def draw_sidebar(self):
+        """
+        Mesh Info Sidebar
+
+        drawn from the immutable model, so Ogre is only queried for live state.
+        While loading, entity is None and only the model is shown.
+        """
+        model = self.model
+        entity = self.app.entity
 
         ImGui.SetNextWindowSize(ImGui.ImVec2(300, ImGui.GetFontSize()*25), ImGui.ImGuiCond_FirstUseEver)
         ImGui.SetNextWindowPos(ImGui.ImVec2(0, ImGui.GetFontSize()*1.5))
         flags = ImGui.ImGuiWindowFlags_NoTitleBar | ImGui.ImGuiWindowFlags_NoMove
         ImGui.Begin("MeshProps", None, flags)
-        ImGui.Text(mesh.getName())
+        ImGui.Text(model["name"])
 
-        highlight = -1
+        highlight = self.app.hovered_submesh
 
+        self.open_next()
         if ImGui.CollapsingHeader("Geometry"):
-            if mesh.sharedVertexData:
-                if ImGui.TreeNode("Shared Vertices: {}".format(mesh.sharedVertexData.vertexCount)):
-                    show_vertex_decl(mesh.sharedVertexData.vertexDeclaration)
+            if model["shared_vertices"] is not None:
+                self.open_next()
+                if ImGui.TreeNode("Shared Vertices: {}".format(model["shared_vertices"])):
+                    show_vertex_decl(model["shared_vertex_decl"])
                     ImGui.TreePop()
             else:
                 ImGui.Text("Shared Vertices: None")
 
-            for i, sm in enumerate(mesh.getSubMeshes()):
+            for i, sm in enumerate(model["submeshes"]):
+                self.open_next()
                 submesh_details = ImGui.TreeNode("SubMesh #{}".format(i))
                 if ImGui.IsItemHovered():
                     highlight = i
 
                 if submesh_details:
-                    ImGui.BulletText("Material: {}".format(printable(sm.getMaterialName())))
-                    op = ROP2STR[sm.operationType] if sm.operationType <= 6 else "Control Points"
-                    ImGui.BulletText("Operation: {}".format(op))
+                    ImGui.BulletText("Material: {}".format(sm["material"]))
+                    ImGui.BulletText("Operation: {}".format(sm["operation"]))
 
-                    if sm.indexData.indexCount:
-                        bits = sm.indexData.indexBuffer.getIndexSize() * 8
-                        ImGui.BulletText("Indices: {} ({} bit)".format(sm.indexData.indexCount, bits))
+                    if sm["indices"]:
+                        ImGui.BulletText("Indices: {} ({} bit)".format(sm["indices"], sm["index_bits"]))
                     else:
                         ImGui.BulletText("Indices: None")
 
-                    if sm.vertexData:
-                        if ImGui.TreeNode("Vertices: {}".format(sm.vertexData.vertexCount)):
-                            show_vertex_decl(sm.vertexData.vertexDeclaration)
+                    if sm["vertices"] is not None:
+                        self.open_next()
+                        if ImGui.TreeNode("Vertices: {}".format(sm["vertices"])):
+                            show_vertex_decl(sm["vertex_decl"])
                             ImGui.TreePop()
                     else:
                         ImGui.BulletText("Vertices: shared")
                     ImGui.TreePop()
 
-        if self.highlighted > -1:
-            entity.getSubEntities()[self.highlighted].setMaterialName(self.orig_mat)
+            if entity is not None and self.app.loader is None and optimize_mesh is not None:
+                self.draw_optimize()
 
-        if highlight > -1:
-            self.orig_mat = printable(entity.getSubEntities()[highlight].getMaterial().getName())
-            entity.getSubEntities()[highlight].setMaterial(self.app.highlight_mat)
-            self.highlighted = highlight
+        self.open_next()
+        if "memory" in model and ImGui.CollapsingHeader("Memory"):
+            self.draw_memory(model["memory"], entity.getMesh() if entity is not None else None)
+
+        if entity is not None and self.app.loader is None:
+            # the sub-entities still carry placeholder materials while loading
+            self.set_highlight(highlight)
+
+            self.open_next()
+            if ImGui.CollapsingHeader("Analysis"):
+                self.draw_analysis(model.get("analysis"))
 
-        animations = entity.getAllAnimationStates()
-        if animations is not None and ImGui.CollapsingHeader("Animations"):
+        self.open_next()
+        if model["animations"] and ImGui.CollapsingHeader("Animations"):
             controller_mgr = Ogre.ControllerManager.getSingleton()
 
-            if entity.hasSkeleton():
-                ImGui.Text("Skeleton: {}".format(mesh.getSkeletonName()))
+            if model["skeleton"]:
+                ImGui.Text("Skeleton: {}".format(model["skeleton"]))
                 # self.entity.setUpdateBoundingBoxFromSkeleton(True)
-            if mesh.hasVertexAnimation():
+            if model["vertex_animation"]:
                 ImGui.Text("Vertex Animations")
 
-            for name, astate in animations.getAnimationStates().items():
+            for anim in model["animations"]:
+                name = anim["name"]
+                astate = self.anim_states.get(name)
+                if astate is None:
+                    ImGui.BulletText("{}: {:.3f}s".format(name, anim["length"]))
+                    continue
+
+                self.open_next()
                 if ImGui.TreeNode(name):
                     if astate.getEnabled():
                         if ImGui.Button("Reset"):
                             astate.setEnabled(False)
                             astate.setTimePosition(0)
                             if name in self.app.active_controllers:
-                                controller_mgr.destroyController(self.app.active_controllers[name])
+                                controller_mgr.destroyController(self.app.active_controllers.pop(name))
                     elif ImGui.Button("Play"):
+                        # the bones may still be posed from the baked animation
+                        release_bones(entity)
                         astate.setEnabled(True)
                         self.app.active_controllers[name] = controller_mgr.createFrameTimePassthroughController(
                             Ogre.AnimationStateControllerValue.create(astate, True))
                     changed = False
-                    if astate.getLength() > 0:
+                    if anim["length"] > 0:
                         ImGui.SameLine()
-                        changed, value = ImGui.SliderFloat("", astate.getTimePosition(), 0, astate.getLength(), "%.3fs")
+                        changed, value = ImGui.SliderFloat("", astate.getTimePosition(), 0, anim["length"], "%.3fs")
                     if changed:
-                        astate.setEnabled(True)
-                        astate.setTimePosition(value)
-                    ImGui.TreePop()
+                        self.app.scrub(name, value)
 
-        lod_count = mesh.getNumLodLevels()
-        if lod_count > 1 and ImGui.CollapsingHeader("LOD levels"):
-            entity.setMeshLodBias(1)  # reset LOD override
-            strategy = mesh.getLodStrategy().getName()
-            curr_idx = entity.getCurrentLodIndex()
-            ImGui.Text("Strategy: {}".format(strategy))
-            for i in range(lod_count):
-                txt = "Base Mesh" if i == 0 else "Level {}: {:.2f}".format(i, mesh.getLodLevel(i).userValue)
-                ImGui.Bullet()
-                ImGui.Selectable(txt, i == curr_idx)
-                if ImGui.IsItemHovered():
-                    # force this LOD level
-                    entity.setMeshLodBias(1, i, i)
+                    baked = self.app.baked.get(name)
+                    if baked is not None:
+                        ImGui.Text("Baked: {} poses at {} Hz".format(len(baked.poses), baked.rate))
+                    elif entity.hasSkeleton() and ImGui.Button("Bake for scrubbing"):
+                        self.app.bake(name)
+                    ImGui.TreePop()
 
-        if ImGui.CollapsingHeader("Bounds"):
-            bounds = mesh.getBounds()
-            s = bounds.getSize()
+            if entity is not None and self.anim_states:
+                self.draw_animation_profile(entity)
+
+        forced_lod = None
+        self.open_next()
+        editable = entity is not None and self.app.loader is None and generate_lods is not None
+        if (model["lod_levels"] or editable) and ImGui.CollapsingHeader("LOD levels"):
+            curr_idx = entity.getCurrentLodIndex() if entity is not None else -1
+            ImGui.Text("Strategy: {}".format(model["lod_strategy"]))
+            stats = self.app.lod_info() if editable else None
+            if stats is not None:
+                forced_lod = self.draw_lod_table(model, stats, curr_idx)
+            else:
+                for i in range(len(model["lod_levels"]) + 1):
+                    txt = "Base Mesh" if i == 0 else "Level {}: {:.2f}".format(i, model["lod_levels"][i - 1])
+                    ImGui.Bullet()
+                    ImGui.Selectable(txt, i == curr_idx)
+                    if ImGui.IsItemHovered():
+                        forced_lod = i
+            if editable:
+                self.draw_lod_generate(entity.getMesh())
+
+        # the LodTimer forces the levels meanwhile
+        if entity is not None and self.app.lod_timer is None:
+            self.force_lod(forced_lod)
+
+        self.open_next()
+        if self.app.stream is not None and ImGui.CollapsingHeader("Streaming"):
+            self.draw_stream(self.app.stream)
+
+        self.open_next()
+        if model["bounds"] is not None and ImGui.CollapsingHeader("Bounds"):
+            s = model["bounds"]["size"]
             ImGui.BulletText("Size: {:.2f}, {:.2f}, {:.2f}".format(s[0], s[1], s[2]))
-            c = bounds.getCenter()
+            c = model["bounds"]["center"]
             ImGui.BulletText("Center: {:.2f}, {:.2f}, {:.2f}".format(c[0], c[1], c[2]))
-            ImGui.BulletText("Radius: {:.2f}".format(mesh.getBoundingSphereRadius()))
+            ImGui.BulletText("Radius: {:.2f}".format(model["bounds"]["radius"]))
 
         ImGui.End()
 
+    def draw_lod_table(self, model, stats, curr_idx):
+        """levels with their sizes, editable values and measured times, returns the hovered level"""
+        app = self.app
+        hovered = None
+        ImGui.Columns(6)
+        for label in ("", "Value", "Tris", "Verts", "Index KiB", "Frame ms"):
+            ImGui.Text(label)
+            ImGui.NextColumn()
+        ImGui.Separator()
+        for i, level in enumerate(stats):
+            ImGui.Selectable("Base Mesh" if i == 0 else "Level {}".format(i), i == curr_idx)
+            if ImGui.IsItemHovered():
+                hovered = i
+            ImGui.NextColumn()
+            if i == 0:
+                ImGui.Text("-")
+            else:
+                changed, value = ImGui.DragFloat("##lod{}".format(i), model["lod_levels"][i - 1],
+                                                 max(abs(model["lod_levels"][i - 1]) * 0.01, 1e-4))
+                if changed:
+                    app.set_lod_value(i, value)
+            ImGui.NextColumn()
+            for value in (level["triangles"], level["vertices"], "{:.0f}".format(level["index_bytes"] / 1024)):
+                ImGui.Text(str(value))
+                ImGui.NextColumn()
+            times = app.lod_times.get(i) if app.lod_times else None
+            ImGui.Text("{:.2f}".format(times[0]) if times else "-")
+            if times and ImGui.IsItemHovered():
+                ImGui.SetTooltip("render phase {:.3f} ms".format(times[1]))
+            ImGui.NextColumn()
+        ImGui.Columns(1)
+        ImGui.TextDisabled("all levels share the vertex buffers")
+
+        if app.lod_timer is not None:
+            ImGui.Text("Measuring level {}..".format(app.lod_timer.level))
+        elif len(stats) > 1 and ImGui.Button("Measure frame times"):
+            app.time_lods()
+        return hovered
+
+    def draw_lod_generate(self, mesh):
+        ImGui.Separator()
+        if mesh.hasManualLodLevel():
+            ImGui.TextDisabled("manual LOD levels, which are separate meshes")
+            return
+
+        app = self.app
+        self.lod_levels = ImGui.SliderInt("Levels", self.lod_levels, 1, 8)[1]
+        self.lod_reduction = ImGui.SliderFloat("Reduction", self.lod_reduction, 0.1, 0.9, "%.2f")[1]
+        if ImGui.IsItemHovered():
+            ImGui.SetTooltip("fraction of the triangles of the previous level to keep")
+        for name in LOD_STRATEGIES:
+            if ImGui.RadioButton(name, self.lod_strategy == name):
+                self.lod_strategy = name
+            ImGui.SameLine()
+        ImGui.NewLine()
+
+        if app.lod_job is not None:
+            ImGui.Text("Generating..")
+        elif ImGui.Button("Generate LOD levels"):
+            app.generate(self.lod_levels, self.lod_reduction, self.lod_strategy)
+        if mesh.getNumLodLevels() > 1 and app.mesh_modified:
+            ImGui.SameLine()
+            if ImGui.Button("Save mesh with LOD"):
+                app.save_mesh(LOD_SUFFIX)
+        if app.saved_path:
+            ImGui.TextDisabled("saved as {}".format(os.path.basename(app.saved_path)))
+
+    def draw_stream(self, stream):
+        if not stream.ready:
+            ImGui.Text("Partitioning..")
+            ImGui.ProgressBar(stream.progress, ImGui.ImVec2(ImGui.GetFontSize() * 15, 0))
+            return
+
+        mib = 1 / (1 << 20)
+        ImGui.Text("Chunks: {} loaded, {} visible, {} total".format(len(stream.loaded), stream.visible,
+                                                                    stream.num_chunks))
+        ImGui.Text("Gathering: {}, dropped: {}".format(len(stream.gathering), stream.dropped))
+        ImGui.ProgressBar(stream.uploaded / stream.budget, ImGui.ImVec2(ImGui.GetFontSize() * 15, 0),
+                          "{:.0f} / {:.0f} MiB".format(stream.uploaded * mib, stream.budget * mib))
+        budget = ImGui.SliderInt("Budget MiB", stream.budget >> 20, 64, 8192)[1]
+        stream.budget = budget << 20
+
+    def draw_animation_profile(self, entity):
+        ImGui.Separator()
+        app = self.app
+        if entity.hasSkeleton():
+            hardware = ImGui.Checkbox("Hardware skinning (RTSS)", app.hardware_skinning is not None)[1]
+            if hardware != (app.hardware_skinning is not None):
+                app.set_hardware_skinning(hardware)
+
+        if app.anim_profiler is not None:
+            ImGui.Text("Profiling, {} samples left..".format(len(app.anim_profiler.queue)))
+        elif ImGui.Button("Profile animations"):
+            app.profile_animations()
+
+        if app.anim_profile:
+            ImGui.Columns(5)
+            for label in ("", "Evaluate", "Software", "Configured", "Baked"):
+                ImGui.Text(label)
+                ImGui.NextColumn()
+            ImGui.Separator()
+            for name, times in sorted(app.anim_profile.items()):
+                ImGui.Text(name)
+                ImGui.NextColumn()
+                for key in ("evaluate", "software", "configured", "baked"):
+                    ImGui.Text("{:.3f}".format(times[key]) if key in times else "-")
+                    ImGui.NextColumn()
+            ImGui.Columns(1)
+            ImGui.TextDisabled("ms per frame, skinning includes evaluating the animation")
+
+        ImGui.Separator()
+        if app.stress_clones:
+            ImGui.Text("{} clones playing all animations".format(len(app.stress_clones)))
+            ImGui.SameLine()
+            if ImGui.Button("Stop"):
+                app.stop_stress()
+        else:
+            self.stress_count = ImGui.SliderInt("##clones", self.stress_count, 1, 256)[1]
+            ImGui.SameLine()
+            if ImGui.Button("Stress test"):
+                app.start_stress(self.stress_count)
+            if ImGui.IsItemHovered():
+                ImGui.SetTooltip("play all animations on this many clones, see Help > Metrics for the frame time")
+
+    def draw_outliner(self):
+        """scene graph of the .scene, only walking the expanded nodes"""
+        app = self.app
+        ImGui.SetNextWindowSize(ImGui.ImVec2(300, ImGui.GetFontSize()*25), ImGui.ImGuiCond_FirstUseEver)
+        ImGui.SetNextWindowPos(ImGui.ImVec2(0, ImGui.GetFontSize()*1.5))
+        flags = ImGui.ImGuiWindowFlags_NoTitleBar | ImGui.ImGuiWindowFlags_NoMove
+        ImGui.Begin("SceneOutliner", None, flags)
+        ImGui.Text(app.filename)
+
+        if app.static_geometry is None:
+            if ImGui.Button("Batch static entities"):
+                app.batch_scene()
+            if ImGui.IsItemHovered():
+                ImGui.SetTooltip("merge entities without animation into StaticGeometry regions, per material")
+        else:
+            if ImGui.Button("Unbatch"):
+                app.unbatch_scene()
+            ImGui.SameLine()
+            ImGui.Text("{} entities in {} regions".format(*app.batched_counts))
+        ImGui.Separator()
+
+        self.draw_scene_node(app.attach_node, ())
+        ImGui.End()
+
+    def scene_stats(self, node, path):
+        """triangles and batches of the visible entities below node"""
+        stats = self.node_stats.get(path)
+        if stats is not None:
+            return stats
+
+        tris, batches = 0, 0
+        for obj in node.getAttachedObjects():
+            if obj.getMovableType() != "Entity" or not obj.isVisible():
+                continue
+            entity = obj.castEntity()
+            key = mesh_key(entity.getMesh())
+            if key not in self.mesh_tris:
+                self.mesh_tris[key] = mesh_triangles(entity.getMesh())
+            tris += self.mesh_tris[key]
+            batches += sum(sub.isVisible() for sub in entity.getSubEntities())
+
+        for i, child in enumerate(node.getChildren()):
+            child_tris, child_batches = self.scene_stats(child.castSceneNode(), path + (i,))
+            tris += child_tris
+            batches += child_batches
+
+        self.node_stats[path] = (tris, batches)
+        return self.node_stats[path]
+
+    def draw_scene_node(self, node, path):
+        # the id is the path, so nodes stay open when their name is shown differently
+        label = "{} ({} children)##{}".format(
+            printable(node.getName()) or "Node", node.numChildren(), "/".join(map(str, path)))
+
+        self.open_next()
+        if not ImGui.TreeNode(label):
+            return
+        # only counted once expanded, which caches the counts of the whole subtree
+        ImGui.TextDisabled("{} tris, {} batches".format(*self.scene_stats(node, path)))
+        for obj in node.getAttachedObjects():
+            ImGui.BulletText("{}: {}".format(obj.getMovableType(), printable(obj.getName())))
+        for i, child in enumerate(node.getChildren()):
+            self.draw_scene_node(child.castSceneNode(), path + (i,))
+        ImGui.TreePop()
+
+    def draw_optimize(self):
+        ImGui.Separator()
+        if ImGui.Button("Optimize vertex cache"):
+            self.app.optimize(self.cache_size)
+
+        report = self.app.optimize_report
+        if report is None:
+            return
+        ImGui.SameLine()
+        if ImGui.Button("Save optimized mesh"):
+            self.app.save_mesh(OPTIMIZED_SUFFIX)
+        if self.app.saved_path:
+            ImGui.TextDisabled("saved as {}".format(os.path.basename(self.app.saved_path)))
+
+        kib = 1 / 1024
+        for i, info in enumerate(report):
+            if info is None:
+                continue
+            before, after = info["before"], info["after"]
+            ImGui.BulletText("#{}: ACMR {:.3f} -> {:.3f}".format(i, before["acmr"], after["acmr"]))
+            ImGui.Indent()
+            ImGui.Text("vertices {} -> {}, {:.0f} -> {:.0f} KiB".format(
+                before["vertices"], after["vertices"], before["vertex_bytes"] * kib, after["vertex_bytes"] * kib))
+            ImGui.Text("indices {:.0f} -> {:.0f} KiB".format(before["index_bytes"] * kib, after["index_bytes"] * kib))
+            if not info["vertices_rewritten"]:
+                ImGui.TextDisabled("vertex order kept, as they are referenced elsewhere")
+            ImGui.Unindent()
+
+    def draw_memory(self, memory, mesh):
+        """buffer and texture sizes in KiB, textures only once the mesh is loaded"""
+        kib = 1 / 1024
+        ImGui.Columns(5)
+        for label in ("", "Vertex", "Index", "Shadow", "Textures"):
+            ImGui.Text(label)
+            ImGui.NextColumn()
+        ImGui.Separator()
+
+        def row(label, mem, textures=None):
+            ImGui.Text(label)
+            ImGui.NextColumn()
+            for value in (mem["vertex"], mem["index"], mem["shadow"]):
+                ImGui.Text("{:.0f}".format(value * kib))
+                ImGui.NextColumn()
+            ImGui.Text("{:.0f}".format(sum(textures.values()) * kib) if textures is not None else "-")
+            ImGui.NextColumn()
+
+        total = {"vertex": 0, "index": 0, "shadow": 0}
+        all_textures = {} if mesh is not None else None
+        if memory["shared"] is not None:
+            row("Shared", memory["shared"])
+            total = {k: total[k] + v for k, v in memory["shared"].items()}
+
+        submeshes = mesh.getSubMeshes() if mesh is not None else [None] * len(memory["submeshes"])
+        for i, (mem, sm) in enumerate(zip(memory["submeshes"], submeshes)):
+            textures = material_textures(sm.getMaterial()) if sm is not None else None
+            row("#{}".format(i), mem, textures)
+            total = {k: total[k] + v for k, v in mem.items()}
+            if textures is not None:
+                all_textures.update(textures)
+
+        ImGui.Separator()
+        # textures shared between submeshes only count once
+        row("Total", total, all_textures)
+        ImGui.Columns(1)
+
+        if mesh is not None and self.app.loader is None and compact_mesh is not None:
+            self.draw_compact()
+
+    def draw_compact(self):
+        ImGui.Separator()
+        if ImGui.Button("Preview compaction"):
+            self.app.compact(False)
+        ImGui.SameLine()
+        if ImGui.Button("Compact"):
+            self.app.compact(True)
+
+        report = self.app.compact_report
+        if report is None:
+            return
+        if report["applied"]:
+            ImGui.SameLine()
+            if ImGui.Button("Save compacted mesh"):
+                self.app.save_mesh(COMPACTED_SUFFIX)
+
+        before, after = report["bytes"]
+        ImGui.Text("{} {:.0f} -> {:.0f} KiB ({:.0f}%)".format(
+            "Compacted" if report["applied"] else "Projected", before / 1024, after / 1024,
+            100 * (after - before) / max(before, 1)))
+        ImGui.Text("Max error: {:.2g}".format(report["max_error"]))
+        if report["shared"] is not None and report["shared"]["split"]:
+            ImGui.BulletText("Shared vertices split per submesh")
+
+        for i, sm in enumerate(report["submeshes"]):
+            if sm["index_bits"][0] != sm["index_bits"][1]:
+                ImGui.BulletText("#{}: {} -> {} bit indices".format(i, *sm["index_bits"]))
+            for c in sm["conversions"]:
+                ImGui.BulletText("#{}: {} {} -> {}, error {:.2g}".format(i, c["semantic"], c["from"], c["to"],
+                                                                        c["max_error"]))
+        if report["shared"] is not None:
+            for c in report["shared"]["conversions"]:
+                ImGui.BulletText("Shared: {} {} -> {}, error {:.2g}".format(c["semantic"], c["from"], c["to"],
+                                                                           c["max_error"]))
+
+    def draw_analysis(self, analysis):
+        if analyze_mesh is None:
+            ImGui.TextDisabled("requires numpy")
+            return
+
+        self.cache_size = ImGui.SliderInt("Cache size", self.cache_size, 4, 64)[1]
+        if self.app.analysis is not None:
+            ImGui.Text("Analyzing..")
+        elif ImGui.Button("Analyze"):
+            self.app.analyze(self.cache_size)
+
+        if analysis is None:
+            return
+
+        def check(label, value, ok=0):
+            if value is None:
+                return
+            if value != ok:
+                ImGui.PushStyleColor(ImGui.ImGuiCol_Text, ImGui.ImVec4(1, 0.8, 0.4, 1))
+            ImGui.BulletText("{}: {}".format(label, value))
+            if value != ok:
+                ImGui.PopStyleColor()
+
+        if analysis["cache_size"] != self.cache_size:
+            ImGui.TextDisabled("results for cache size {}".format(analysis["cache_size"]))
+        if "overdraw" in analysis:
+            ImGui.BulletText("Overdraw: {:.2f}".format(analysis["overdraw"]))
+        check("Shared duplicate vertices", analysis.get("shared_duplicate_vertices"))
+        check("Shared unreferenced vertices", analysis.get("shared_unreferenced_vertices"))
+
+        for i, sm in enumerate(analysis["submeshes"]):
+            self.open_next()
+            if not ImGui.TreeNode("SubMesh #{}##analysis".format(i)):
+                continue
+            if not sm["operation_supported"]:
+                ImGui.TextDisabled("no triangles")
+            else:
+                ImGui.BulletText("Triangles: {}".format(sm["triangles"]))
+                ImGui.BulletText("ACMR: {:.3f}, ATVR: {:.3f}".format(sm["acmr"], sm["atvr"]))
+                check("Degenerate triangles", sm["degenerate_triangles"])
+                check("Duplicate triangles", sm["duplicate_triangles"])
+                check("Unreferenced vertices", sm["unreferenced_vertices"])
+                check("Duplicate vertices", sm["duplicate_vertices"])
+            check("32 bit indices for 16 bit vertex count", sm["wasteful_32bit"], False)
+            ImGui.TreePop()
+
+    def postViewportUpdate(self, evt):
+        self.app.profiler.end("render")
+
+    def preRenderTargetUpdate(self, evt):
+        if not self.app.cam.getViewport().getOverlaysEnabled():
+            return
+
+        self.app.profiler.begin("gui")
+        Ogre.Overlay.ImGuiOverlay.NewFrame()
+        self.draw()
+        self.app.profiler.end("gui")
+
+    def draw(self):
+        entity = self.app.entity
+
+        if entity is None and self.app.attach_node is None and self.app.stream is None:
+            self.draw_loading()
+            self.update_model()
+            if self.model is not None:
+                self.draw_sidebar()
+            return
+
+        if ImGui.BeginMainMenuBar():
+            if ImGui.BeginMenu("File"):
+                if ImGui.MenuItem("Open..", "O"):
+                    self.show_open = True
+                if ImGui.BeginMenu("Open Recent", bool(self.app.recent)):
+                    for path in self.app.recent:
+                        if ImGui.MenuItem(path):
+                            self.app.open(path)
+                    ImGui.EndMenu()
+                ImGui.Separator()
+                if ImGui.MenuItem("Select Renderer"):
+                    self.app.getRoot().queueEndRendering()
+                    self.app.restart = True
+                if ImGui.MenuItem("Save Screenshot", "P"):
+                    self.app._save_screenshot()
+                if ImGui.MenuItem("Quit", "Esc"):
+                    self.app.getRoot().queueEndRendering()
+                ImGui.EndMenu()
+            if entity is not None and ImGui.BeginMenu("View"):
+                enode = entity.getParentSceneNode()
+                if ImGui.MenuItem("Show Axes", "A", self.app.axes_visible):
+                    self.app._toggle_axes()
+                if ImGui.MenuItem("Show Bounding Box", "B", enode.getShowBoundingBox()):
+                    self.app._toggle_bbox()
+                if entity.hasSkeleton() and ImGui.MenuItem("Show Skeleton", None, entity.getDisplaySkeleton()):
+                    entity.setDisplaySkeleton(not entity.getDisplaySkeleton())
+                ImGui.EndMenu()
+
+            if ImGui.BeginMenu("Help"):
+                if ImGui.MenuItem("Metrics", None, self.show_metrics):
+                    self.show_metrics = not self.show_metrics
+                if ImGui.MenuItem("Log"):
+                    self.logwin.show = True
+                if ImGui.MenuItem("About"):
+                    self.show_about = True
+                ImGui.EndMenu()
+
+            ImGui.EndMainMenuBar()
+
+        if self.show_about:
+            self.draw_about()
+
+        if self.show_open:
+            self.draw_open()
+
+        if self.show_metrics:
+            self.draw_metrics()
+
+        self.logwin.draw()
+
+        if self.app.loader is not None:
+            self.draw_loading()
+
+        if self.app.attach_node is not None:
+            self.draw_outliner()
+            return
+
+        start = time.perf_counter()
+        self.update_model()
+        self.draw_sidebar()
+        # smoothed, so the overlay stays readable
+        self.sidebar_ms += 0.05 * ((time.perf_counter() - start) * 1000 - self.sidebar_ms)
+
         # ImGui.ShowDemoWindow()
 
+class MeshLoader:
+    """
+    loads the mesh over several frames, so the window keeps rendering
+
+    The file is read and prepared on worker threads and the materials are prepared in the background,
+    revealing each sub-entity once its material is ready. Only creating the hardware buffers
+    from the prepared data blocks the render thread.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.name = app.mesh_name
+        self.path = os.path.join(app.mesh_dir, app.mesh_name)
+        self.total = os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+        self.bytes_read = 0
+        self.header = None  # summary from the .mesh header, set by the reader thread
+        self.header_shown = False
+        self.cancelled = False
+
+        self.phase = "Reading"
+        self.error = None
+        self.start = time.perf_counter()
+
+        self.rbq = Ogre.ResourceBackgroundQueue.getSingleton()
+        self.ticket = None
+        self.mesh = None
+        self.pending = {}  # material name: (ticket, MaterialPtr, sub-entities, number of textures)
+
+        self.num_submeshes = 0
+        self.num_visible = 0
+
+        resident = Ogre.MeshManager.getSingleton().getByName(self.name, app.mesh_group)
+        if resident is not None and resident.isLoaded():
+            # kept from an earlier view, so there is nothing to read or prepare
+            self.total = 0
+            self.phase = "Creating buffers"
+            return
+
+        self.thread = threading.Thread(target=self._read, daemon=True)
+        self.thread.start()
+
+    @property
+    def textures_pending(self):
+        return sum(p[3] for p in self.pending.values())
+
+    def _read(self):
+        if not self.total:
+            return  # a resource name rather than a path, leave it to Ogre
+
+        if self.path.lower().endswith(".mesh"):
+            try:
+                # the header is quick to read and gives us the bounds
+                self.header = read_mesh_summary(self.path)
+            except Exception:
+                pass  # Ogre will report the error when loading
+
+        # read ahead, so Ogre finds the file in the page cache and we can show progress meanwhile
+        with open(self.path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                if self.cancelled:
+                    return
+                self.bytes_read += len(block)
+
+    def cancel(self):
+        self.cancelled = True
+        if self.ticket is not None:
+            self.rbq.abortRequest(self.ticket)
+        for ticket, *_ in self.pending.values():
+            self.rbq.abortRequest(ticket)
+
+    def update(self):
+        """advance by one step per frame, returns False once done"""
+        if self.error:
+            return True
+        try:
+            return self._update()
+        except RuntimeError as e:
+            self.error = str(e)
+            Ogre.LogManager.getSingleton().logError(self.error)
+            return True
+
+    def _update(self):
+        if self.phase == "Reading":
+            if self.header is not None and not self.header_shown:
+                self.header_shown = True
+                self.app.show_preview(self.header)
+            if self.thread.is_alive():
+                return True
+            self.ticket = self.rbq.prepare("Mesh", self.name, self.app.mesh_group)
+            self.phase = "Preparing"
+        elif self.phase == "Preparing":
+            if not self.rbq.isProcessComplete(self.ticket):
+                return True
+            self.ticket = None
+            # render the phase before blocking on it
+            self.phase = "Creating buffers"
+        elif self.phase == "Creating buffers":
+            self.mesh = Ogre.MeshManager.getSingleton().getByName(self.name, self.app.mesh_group)
+            if self.mesh is None:
+                raise RuntimeError("could not prepare '{}'".format(self.name))
+            self.mesh.load()
+            self.app.attach_mesh(self.mesh, time.perf_counter() - self.start)
+            self._prepare_materials()
+            self.phase = "Preparing materials"
+        elif self.phase == "Preparing materials":
+            self._reveal()
+            if not self.pending:
+                return False
+        return True
+
+    def _prepare_materials(self):
+        sub_entities = self.app.entity.getSubEntities()
+        self.num_submeshes = len(sub_entities)
+
+        for sm, sub in zip(self.mesh.getSubMeshes(), sub_entities):
+            mat = sm.getMaterial()
+            if mat is None:
+                # empty material name, reveal with the default material right away
+                sub.setMaterial(mat)
+                sub.setVisible(True)
+                self.num_visible += 1
+                continue
+
+            name = mat.getName()
+            if name not in self.pending:
+                textures = sum(len(p.getTextureUnitStates()) for t in mat.getTechniques() for p in t.getPasses())
+                ticket = self.rbq.prepare("Material", name, mat.getGroup())
+                self.pending[name] = (ticket, mat, [], textures)
+            self.pending[name][2].append(sub)
+
+    def _reveal(self):
+        for name, (ticket, mat, subs, _) in list(self.pending.items()):
+            if not self.rbq.isProcessComplete(ticket):
+                continue
+            for sub in subs:
+                # loads the prepared material, which only uploads the textures
+                sub.setMaterial(mat)
+                sub.setVisible(True)
+            self.num_visible += len(subs)
+            del self.pending[name]
+
 class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
 
     def __init__(self, infile, rescfg):
@@ -315,6 +1578,38 @@ class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
         self.filedir = os.path.dirname(infile)
         self.rescfg = rescfg
 
+        # what is actually loaded, differs from filename if a cached conversion is used
+        self.mesh_name = self.filename
+        self.mesh_dir = self.filedir
+        self.mesh_group = Ogre.RGN_AUTODETECT
+        self.conversions = None
+        self.conversion_key = None  # set if the import should be stored in the conversion cache
+
+        self.pending_open = None  # path to show once the current frame is done
+        self.recent = None  # most recently viewed paths first
+        self.resident = collections.OrderedDict()  # mesh_key: MeshPtr kept loaded after viewing it
+        self.resident_bytes = 256 << 20
+        self.mesh_modified = False  # by optimize or compact, so it must not stay resident
+        self.scene_objects = set()  # (type, name) created by loading the .scene
+        self.static_geometry = None  # batching the static entities of the .scene
+        self.batched_counts = None  # (entities, regions)
+        self.batched_entities = []
+        self.unbatched_stats = None  # (batches, FPS) of the last frames before batching
+
+        self.watch_files = True
+        self.watcher = None
+        self.watched = {}  # path: (kind, resource name, group) of the files the current view was loaded from
+        self.keep_view = False  # while reloading the current file
+        self.restore_anims = {}  # animation name: time position to continue after reloading
+
+        self.baked = {}  # animation name: BakedAnimation of the entity
+        self.bake_rate = 30
+        self.anim_profiler = None
+        self.anim_profile = None  # {animation: {measurement: ms}} of the last AnimationProfiler run
+        self.hardware_skinning = None  # RTSS sub-render state while enabled
+        self.stress_clones = []  # (entity, scene node) playing all animations
+        self.stress_controllers = []
+
         self.entity = None
         self.attach_node = None
         self.highlight_mat = None
@@ -323,6 +1618,116 @@ class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
 
         self.active_controllers = {}
 
+        self.cache = None
+        self.summary = None
+
+        self.loader = None
+        self.diam = None
+        self.bounds_preview = None
+
+        self.executor = None
+        self.analysis = None  # future of the running mesh analysis
+        self.bvhs = {}  # mesh_key: future of its BVH
+        self.hovered_submesh = -1
+
+        self.optimize_report = None
+        self.compact_report = None
+        self.saved_path = None
+
+        self.stream_mode = False
+        self.stream_budget = 512 << 20
+        self.stream = None  # MeshStream of the viewed file in stream_mode
+
+        self.lod_job = None  # (future of the generated indices, strategy name)
+        self.lod_stats = None  # per level sizes as returned by lod_stats, computed when first shown
+        self.lod_timer = None
+        self.lod_times = None  # {level: (frame ms, render ms)} of the last LodTimer run
+
+        self.log_file = None
+
+        self.profiler = None
+        self.frame_times = None  # CSV path for the per-frame timings
+        self.startup = None  # StartupProfile, reported once the first file is shown
+
+        self.lazy_scripts = False
+        self.script_index = None
+        self.scripts = None  # ScriptResolver in lazy_scripts mode
+        self.pending_groups = []  # located before the default group was initialised
+
+    def startup_phase(self, name):
+        return self.startup.phase(name) if self.startup is not None else contextlib.nullcontext()
+
+    def frameStarted(self, evt):
+        self.profiler.next_frame()
+        if self.pending_open is not None:
+            # between frames, so nothing is rendering what gets destroyed
+            path, self.pending_open = self.pending_open, None
+            self.unload_file()
+            self.filename = os.path.basename(path)
+            self.filedir = os.path.dirname(path)
+            self.locate_file()
+            self.load_file()
+
+        if self.loader is not None:
+            self.profiler.begin("load")
+            if not self.loader.update():
+                self.loader = None
+                self._hide_preview()
+                self.update_watch()
+            self.profiler.end("load")
+
+        if self.stream is not None:
+            self.profiler.begin("load")
+            self.update_stream()
+            self.profiler.end("load")
+
+        # not during the warm-up frames of initApp
+        if self.startup is not None and self.startup.depth == 0 and self.loader is None:
+            lmgr = Ogre.LogManager.getSingleton()
+            for line in ["startup"] + self.startup.report():
+                lmgr.logMessage(line)
+            self.startup = None
+
+        if self.watcher is not None and self.loader is None:
+            changed = self.watcher.changes()
+            if changed:
+                self.reload(changed)
+
+        if self.analysis is not None and self.analysis.done():
+            self._store_analysis()
+        if self.lod_job is not None and self.lod_job[0].done():
+            self._apply_lods()
+        if self.lod_timer is not None and self.profiler.frames and not self.lod_timer.step(self.profiler.frames[-1]):
+            self.lod_times = self.lod_timer.results()
+            self.lod_timer = None
+
+        # update the controllers here, so they can be timed separately from the scene graph update
+        self.profiler.begin("controllers")
+        Ogre.ControllerManager.getSingleton().updateAllControllers()
+        self.profiler.end("controllers")
+
+        # evaluate the animations and skin before rendering, so they can be timed separately,
+        # which also updates entities that the culling would skip
+        self.profiler.begin("animation")
+        if self.anim_profiler is not None and not self.anim_profiler.step():
+            self.anim_profile = self.anim_profiler.results()
+            self.anim_profiler = None
+        for entity in self.animated_entities():
+            entity._updateAnimation()
+        self.profiler.end("animation")
+
+        return OgreBites.ApplicationContext.frameStarted(self, evt)
+
+    def frameRenderingQueued(self, evt):
+        ret = OgreBites.ApplicationContext.frameRenderingQueued(self, evt)
+        # buffers are swapped after this returns, ends in frameEnded
+        self.profiler.begin("swap")
+        return ret
+
+    def frameEnded(self, evt):
+        self.profiler.end("swap")
+        return OgreBites.ApplicationContext.frameEnded(self, evt)
+
     def keyPressed(self, evt):
         if evt.keysym.sym == OgreBites.SDLK_ESCAPE:
             self.getRoot().queueEndRendering()
@@ -332,24 +1737,97 @@ class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
             self._toggle_axes()
         elif evt.keysym.sym == ord("p"):
             self._save_screenshot()
+        elif evt.keysym.sym == ord("o"):
+            self.gui.show_open = True
 
         return True
 
-    def mousePressed(self, evt):
-        if evt.clicks != 2:
-            return True
+    def pick(self, x, y):
+        """
+        closest object at the viewport pixel as (world position, movable, submesh index) or None
+
+        Entities are tested triangle exact once the BVH of their mesh is built, which starts on the first pick
+        rather than on load, as copying the buffers blocks the render thread.
+        Until then and for other objects the bounding box is used and the submesh index is -1.
+        Animated entities are tested in their binding pose.
+        """
         vp = self.cam.getViewport()
-        ray = self.cam.getCameraToViewportRay(evt.x / vp.getActualWidth(), evt.y / vp.getActualHeight())
+        ray = self.cam.getCameraToViewportRay(x / vp.getActualWidth(), y / vp.getActualHeight())
         self.ray_query.setRay(ray)
+
+        best = None
         for hit in self.ray_query.execute():
-            self.camman.setPivotOffset(ray.getPoint(hit.distance))
-            break
+            if best is not None and hit.distance >= best[0]:
+                break  # sorted by box distance, which is a lower bound of the triangle distance
+
+            movable = hit.movable
+            dist, submesh = hit.distance, -1
+            bvh = None
+            if movable.getMovableType() == "Entity":
+                movable = self.scn_mgr.getEntity(movable.getName())
+                bvh = self.mesh_bvh(movable.getMesh())
+
+            if bvh is not None:
+                xf = movable.getParentNode()._getFullTransform().inverse()
+                o = xf * ray.getOrigin()
+                d = xf * (ray.getOrigin() + ray.getDirection()) - o
+                # the ray parameter stays the same in local space, as d is not normalized
+                res = bvh.intersect([o[0], o[1], o[2]], [d[0], d[1], d[2]])
+                if res is None:
+                    continue  # only passes through the bounding box
+                dist, submesh = res[0], res[1]
+
+            if best is None or dist < best[0]:
+                best = (dist, movable, submesh)
+
+        if best is None:
+            return None
+        return ray.getPoint(best[0]), best[1], best[2]
+
+    def mesh_bvh(self, mesh):
+        """the BVH of mesh or None while it is built in the background, starting the build if needed"""
+        # streamed chunks come and go, so they are picked by their bounds
+        if build_mesh_bvh is None or self.stream is not None:
+            return None
+
+        future = self.bvhs.get(mesh_key(mesh))
+        if future is None:
+            submeshes, shared = read_mesh_buffers(mesh)
+            future = self.bvhs[mesh_key(mesh)] = self.worker().submit(build_mesh_bvh, submeshes, shared)
+        if not future.done():
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            Ogre.LogManager.getSingleton().logError("could not build BVH of '{}': {}".format(mesh.getName(), e))
+            # fall back to the bounding box instead of failing on every pick
+            self.bvhs[mesh_key(mesh)] = concurrent.futures.Future()
+            self.bvhs[mesh_key(mesh)].set_result(None)
+            return None
+
+    def mouseMoved(self, evt):
+        self.hovered_submesh = -1
+        if self.entity is None or self.loader is not None or ImGui.GetIO().WantCaptureMouse:
+            return True
+
+        # hovering a submesh highlights it like hovering its sidebar entry
+        hit = self.pick(evt.x, evt.y)
+        if hit is not None and hit[1].getName() == self.entity.getName():
+            self.hovered_submesh = hit[2]
+        return True
+
+    def mousePressed(self, evt):
+        if evt.clicks != 2:
+            return True
+        hit = self.pick(evt.x, evt.y)
+        if hit is not None:
+            self.camman.setPivotOffset(hit[0])
         return True
 
     def _toggle_bbox(self):
-        if self.attach_node is not None:
-            show = self.attach_node.getCreator().getShowBoundingBoxes()
-            self.attach_node.getCreator().showBoundingBoxes(not show)
+        if self.attach_node is not None or self.stream is not None:
+            show = self.scn_mgr.getShowBoundingBoxes()
+            self.scn_mgr.showBoundingBoxes(not show)
             return
 
         enode = self.entity.getParentSceneNode()
@@ -363,6 +1841,498 @@ class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
         
         self.axes_visible = not self.axes_visible
 
+    def fit_view(self, diam):
+        """fit camera, clip distance and axes to an object of the given diameter"""
+        if self.diam is not None and abs(diam - self.diam) <= 1e-3 * diam:
+            return
+        self.diam = diam
+
+        self.cam.setNearClipDistance(diam * 0.01)
+        if not self.keep_view:
+            self.camman.setYawPitchDist(0, 0.3, diam)
+
+        axes = Ogre.DefaultDebugDrawer()
+        axes.setStatic(True)
+        axes.drawAxes(Ogre.Affine3.IDENTITY, diam / 4)
+        if self.axes_visible:
+            if self.axes is not None:
+                self.scn_mgr.removeListener(self.axes)
+            self.scn_mgr.addListener(axes)
+        self.axes = axes
+
+    def show_preview(self, summary):
+        """show a summary read before the mesh is loaded, outlining its bounds if known"""
+        if self.summary is None:
+            self.summary = summary
+
+        bounds = summary.get("bounds")
+        if bounds is None or self.bounds_preview is not None:
+            return
+
+        c, s = bounds["center"], bounds["size"]
+        aabb = Ogre.AxisAlignedBox(Ogre.Vector3(c[0] - s[0] / 2, c[1] - s[1] / 2, c[2] - s[2] / 2),
+                                   Ogre.Vector3(c[0] + s[0] / 2, c[1] + s[1] / 2, c[2] + s[2] / 2))
+        self.bounds_preview = Ogre.DefaultDebugDrawer()
+        self.bounds_preview.setStatic(True)
+        self.bounds_preview.drawWireBox(aabb, Ogre.ColourValue(1, 1, 0))
+        self.scn_mgr.addListener(self.bounds_preview)
+
+        self.fit_view((s[0] ** 2 + s[1] ** 2 + s[2] ** 2) ** 0.5)
+
+    def _hide_preview(self):
+        if self.bounds_preview is not None:
+            self.scn_mgr.removeListener(self.bounds_preview)
+            self.bounds_preview = None
+
+    def attach_mesh(self, mesh, load_time):
+        """create the entity with all sub-entities hidden, MeshLoader reveals them once their material is ready"""
+        # creating the entity would load all materials at once, so swap in a placeholder meanwhile
+        materials = [sm.getMaterial() for sm in mesh.getSubMeshes()]
+        for sm in mesh.getSubMeshes():
+            sm.setMaterial(self.loading_mat)
+        if self.startup is not None:
+            self.startup.add("mesh loading", load_time)
+        with self.startup_phase("entity creation"):
+            self.entity = self.scn_mgr.createEntity(mesh)
+        for sm, mat in zip(mesh.getSubMeshes(), materials):
+            sm.setMaterial(mat)
+        for sub in self.entity.getSubEntities():
+            sub.setVisible(False)
+
+        self.scn_mgr.getRootSceneNode().createChildSceneNode().attachObject(self.entity)
+        self._restore_animations()
+        if self.hardware_skinning is not None and self.entity.hasSkeleton():
+            OgreRTShader.HardwareSkinningFactory.getSingleton().prepareEntityForSkinning(self.entity)
+        self.fit_view(self.entity.getBoundingBox().getSize().length())
+
+        # the loaded mesh is authoritative, a cached summary was only a preview
+        preview = self.summary
+        self.summary = mesh_summary(mesh)
+        self.summary.update(load_time=load_time, missing_materials=self.mat_creator.missing)
+        if preview is not None and "analysis" in preview:
+            # still valid, as the cache entry matched size and mtime
+            self.summary["analysis"] = preview["analysis"]
+        meshpath = os.path.join(self.filedir, self.filename)
+        if os.path.exists(meshpath):
+            self.summary["size"] = os.path.getsize(meshpath)
+            self.cache.put(meshpath, self.summary)
+
+        if self.conversion_key is not None:
+            self.store_conversion(mesh)
+
+    def animated_entities(self):
+        if self.entity is None or self.entity.getAllAnimationStates() is None:
+            return []
+        return [self.entity] + [clone for clone, _ in self.stress_clones]
+
+    def bake(self, name):
+        self.baked[name] = bake_animation(self.entity, name, self.bake_rate)
+
+    def scrub(self, name, time_pos):
+        """show the animation name at time_pos, from the baked poses if available"""
+        astate = self.gui.anim_states[name]
+        astate.setTimePosition(time_pos)
+        baked = self.baked.get(name)
+        if baked is None:
+            astate.setEnabled(True)
+            return
+
+        controller = self.active_controllers.pop(name, None)
+        if controller is not None:
+            Ogre.ControllerManager.getSingleton().destroyController(controller)
+        astate.setEnabled(False)
+        apply_pose(self.entity, baked, time_pos)
+
+    def profile_animations(self):
+        self.anim_profile = None
+        self.anim_profiler = AnimationProfiler(self.entity, self.baked)
+
+    def set_hardware_skinning(self, enable):
+        """skin in the vertex shaders generated by the RTSS instead of on the CPU"""
+        shadergen = OgreRTShader.ShaderGenerator.getSingleton()
+        render_state = shadergen.getRenderState(Ogre.MSN_SHADERGEN)
+        if enable and self.hardware_skinning is None:
+            self.hardware_skinning = shadergen.createSubRenderState(OgreRTShader.HardwareSkinning.Type)
+            render_state.addTemplateSubRenderState(self.hardware_skinning)
+            OgreRTShader.HardwareSkinningFactory.getSingleton().prepareEntityForSkinning(self.entity)
+        elif not enable and self.hardware_skinning is not None:
+            render_state.removeSubRenderState(self.hardware_skinning)
+            self.hardware_skinning = None
+        shadergen.invalidateScheme(Ogre.MSN_SHADERGEN)
+
+    def start_stress(self, count):
+        """play all animations on count clones of the entity, laid out on a grid next to it"""
+        self.stop_stress()
+        controller_mgr = Ogre.ControllerManager.getSingleton()
+        spacing = self.entity.getBoundingBox().getSize().length()
+        columns = math.ceil(math.sqrt(count + 1))
+        for i in range(1, count + 1):
+            clone = self.entity.clone("MeshViewer/StressClone{}".format(i))
+            node = self.scn_mgr.getRootSceneNode().createChildSceneNode(
+                Ogre.Vector3((i % columns) * spacing, 0, (i // columns) * spacing))
+            node.attachObject(clone)
+            for astate in clone.getAllAnimationStates().getAnimationStates().values():
+                astate.setEnabled(True)
+                astate.setLoop(True)
+                self.stress_controllers.append(controller_mgr.createFrameTimePassthroughController(
+                    Ogre.AnimationStateControllerValue.create(astate, True)))
+            self.stress_clones.append((clone, node))
+        self.getRenderWindow().resetStatistics()
+
+    def stop_stress(self):
+        controller_mgr = Ogre.ControllerManager.getSingleton()
+        for controller in self.stress_controllers:
+            controller_mgr.destroyController(controller)
+        for clone, node in self.stress_clones:
+            self.scn_mgr.destroyEntity(clone)
+            self.scn_mgr.destroySceneNode(node)
+        self.stress_controllers = []
+        self.stress_clones = []
+
+    def _restore_animations(self):
+        restore, self.restore_anims = self.restore_anims, {}
+        if not restore or self.entity.getAllAnimationStates() is None:
+            return
+
+        controller_mgr = Ogre.ControllerManager.getSingleton()
+        states = dict(self.entity.getAllAnimationStates().getAnimationStates().items())
+        for name, time_pos in restore.items():
+            astate = states.get(name)
+            if astate is None:
+                continue
+            astate.setEnabled(True)
+            astate.setTimePosition(min(time_pos, astate.getLength()))
+            self.active_controllers[name] = controller_mgr.createFrameTimePassthroughController(
+                Ogre.AnimationStateControllerValue.create(astate, True))
+
+    def watched_resources(self):
+        """{path: (kind, resource name, group)} of the files the current view was loaded from"""
+        ret = {}
+        srcpath = os.path.join(self.filedir, self.filename)
+        if os.path.isfile(srcpath):
+            kind = "scene" if self.filename.lower().endswith(".scene") else "mesh"
+            ret[os.path.abspath(srcpath)] = (kind, self.filename, self.mesh_group)
+        if self.entity is None:
+            return ret
+
+        mesh = self.entity.getMesh()
+        if mesh.hasSkeleton():
+            skel = mesh.getSkeleton()
+            path = resource_path(skel.getName(), skel.getGroup())
+            if path:
+                ret[path] = ("skeleton", skel.getName(), skel.getGroup())
+
+        for sm in mesh.getSubMeshes():
+            mat = sm.getMaterial()
+            if mat is None:
+                continue
+            path = resource_path(mat.getOrigin(), mat.getGroup()) if mat.getOrigin() else None
+            if path:
+                ret[path] = ("material", mat.getOrigin(), mat.getGroup())
+            for tex in texture_ptrs(mat):
+                path = resource_path(tex.getName(), tex.getGroup())
+                if path:
+                    ret[path] = ("texture", tex.getName(), tex.getGroup())
+        return ret
+
+    def update_watch(self):
+        if self.watcher is None:
+            return
+        self.watched = self.watched_resources()
+        self.watcher.watch(self.watched)
+
+    def reload(self, paths):
+        """reload what was loaded from the changed files, only the mesh, skeleton and .scene need a new entity"""
+        changed = {p: self.watched[p] for p in paths if p in self.watched}
+        log = Ogre.LogManager.getSingleton()
+        for kind, name, _ in changed.values():
+            log.logMessage("reloading {} '{}'".format(kind, name))
+
+        if any(kind in ("mesh", "skeleton", "scene") for kind, _, _ in changed.values()):
+            self.reload_file()
+            return
+
+        for path, (kind, name, group) in changed.items():
+            try:
+                if kind == "texture":
+                    tex = Ogre.TextureManager.getSingleton().getByName(name, group)
+                    if tex is not None:
+                        tex.reload()
+                elif kind == "material":
+                    self.reload_script(path, name, group)
+            except (RuntimeError, OSError) as e:
+                log.logError("could not reload '{}': {}".format(name, e))
+        # a material may now reference other textures
+        self.update_watch()
+
+    def reload_script(self, path, origin, group):
+        """parse a changed material script again and apply its materials to the entity"""
+        mat_mgr = Ogre.MaterialManager.getSingleton()
+        shadergen = OgreRTShader.ShaderGenerator.getSingleton()
+        self.gui.set_highlight(-1)
+
+        # the materials must be removed to be defined again
+        names = script_materials(path)
+        for name in names:
+            mat = mat_mgr.getByName(name, group)
+            if mat is not None:
+                shadergen.removeAllShaderBasedTechniques(name, group)
+                mat_mgr.remove(mat)
+
+        stream = Ogre.ResourceGroupManager.getSingleton().openResource(origin, group)
+        mat_mgr.parseScript(stream, group)
+
+        for sm, sub in zip(self.entity.getMesh().getSubMeshes(), self.entity.getSubEntities()):
+            if sm.getMaterialName() not in names:
+                continue
+            mat = mat_mgr.getByName(sm.getMaterialName(), group)
+            if mat is None:
+                continue
+            mat.load()
+            sm.setMaterial(mat)
+            sub.setMaterial(mat)
+
+    def reload_file(self):
+        """load the changed file again, keeping the view and the playing animations"""
+        skeleton = None
+        if self.entity is not None:
+            self.restore_anims = {name: astate.getTimePosition() for name, astate in self.gui.anim_states.items()
+                                  if name in self.active_controllers}
+            if self.entity.getMesh().hasSkeleton():
+                skeleton = self.entity.getMesh().getSkeleton()
+
+        # the mesh must be loaded from disk again rather than staying resident
+        self.mesh_modified = True
+        self.unload_file()
+        if skeleton is not None:
+            Ogre.SkeletonManager.getSingleton().remove(skeleton)
+        self.locate_file()
+        self.load_file(keep_view=True)
+
+    def batch_scene(self, regions_per_axis=4):
+        """
+        merge the static entities of the .scene into StaticGeometry, to measure the scene once batched
+
+        entities with a skeleton or vertex animation stay as they are.
+        """
+        stats = self.getRenderWindow().getStatistics()
+        self.unbatched_stats = (stats.batchCount, stats.avgFPS)
+
+        # entities sharing mesh and materials end up next to each other in the regions
+        groups = collections.defaultdict(list)
+        for type_name, name in self.scene_objects:
+            if type_name != "Entity":
+                continue
+            entity = self.scn_mgr.getEntity(name)
+            if not entity.isAttached() or not entity.isVisible() or entity.hasSkeleton() or \
+                    entity.getMesh().hasVertexAnimation():
+                continue
+            materials = tuple(sub.getMaterialName() for sub in entity.getSubEntities())
+            groups[(mesh_key(entity.getMesh()), materials)].append(entity)
+
+        self.attach_node._update(True, False)
+        bounds = self.attach_node._getWorldAABB()
+        sg = self.scn_mgr.createStaticGeometry("MeshViewer/Batched")
+        if not bounds.isNull():
+            sg.setOrigin(bounds.getMinimum())
+            size = bounds.getSize() / regions_per_axis
+            sg.setRegionDimensions(Ogre.Vector3(max(size.x, 1e-3), max(size.y, 1e-3), max(size.z, 1e-3)))
+
+        num_entities = 0
+        for entities in groups.values():
+            for entity in entities:
+                node = entity.getParentSceneNode()
+                sg.addEntity(entity, node._getDerivedPosition(), node._getDerivedOrientation(), node._getDerivedScale())
+                entity.setVisible(False)
+                num_entities += 1
+        sg.build()
+
+        self.static_geometry = sg
+        self.batched_counts = (num_entities, len(sg.getRegions()))
+        self.batched_entities = [e.getName() for entities in groups.values() for e in entities]
+        self.gui.node_stats = {}
+        self.getRenderWindow().resetStatistics()
+
+    def unbatch_scene(self):
+        for name in self.batched_entities:
+            self.scn_mgr.getEntity(name).setVisible(True)
+        self.scn_mgr.destroyStaticGeometry(self.static_geometry)
+        self.static_geometry = None
+        self.batched_counts = None
+        self.batched_entities = []
+        self.unbatched_stats = None
+        self.gui.node_stats = {}
+        self.getRenderWindow().resetStatistics()
+
+    def use_conversion(self, srcpath):
+        """load the cached binary conversion of an imported file, if there is one"""
+        if self.conversions is None:
+            self.conversions = ConversionCache(self.getFSLayer().getWritablePath(CONVERSION_CACHE_DIR))
+
+        key = self.conversions.key(srcpath, conversion_settings())
+        entry = self.conversions.get(key)
+        if entry is None:
+            self.conversion_key = key
+            return
+
+        self.mesh_group = self.add_location(entry)
+        self.mesh_name = self.filename + ".mesh"
+        self.mesh_dir = entry
+        Ogre.LogManager.getSingleton().logMessage("using cached conversion '{}'".format(entry))
+
+    def store_conversion(self, mesh):
+        """write the imported mesh and its materials to the conversion cache"""
+        key, self.conversion_key = self.conversion_key, None
+        if mesh.hasSkeleton():
+            # there is no skeleton serializer in the python bindings
+            Ogre.LogManager.getSingleton().logMessage("not caching '{}', as it has a skeleton".format(self.filename))
+            return
+
+        staging = self.conversions.begin(key)
+        try:
+            Ogre.MeshSerializer().exportMesh(mesh, os.path.join(staging, self.filename + ".mesh"))
+
+            mat_serializer = Ogre.MaterialSerializer()
+            exported = set()
+            for sm in mesh.getSubMeshes():
+                mat = sm.getMaterial()
+                if mat is not None and mat.getName() not in exported:
+                    mat_serializer.queueForExport(mat)
+                    exported.add(mat.getName())
+            if exported:
+                mat_serializer.exportQueued(os.path.join(staging, self.filename + ".material"))
+        except RuntimeError as e:
+            self.conversions.abort(staging)
+            Ogre.LogManager.getSingleton().logError("could not cache conversion: {}".format(e))
+            return
+        self.conversions.commit(key, staging)
+
+    def worker(self):
+        """executor for the numpy work, which must not stall the render thread"""
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(1)
+        return self.executor
+
+    def analyze(self, cache_size):
+        """copy the buffers on the render thread and analyze them on a worker thread"""
+        submeshes, shared = read_mesh_buffers(self.entity.getMesh())
+        self.analysis = self.worker().submit(analyze_mesh, submeshes, shared, cache_size)
+
+    def _store_analysis(self):
+        future, self.analysis = self.analysis, None
+        try:
+            result = future.result()
+        except Exception as e:
+            Ogre.LogManager.getSingleton().logError("mesh analysis failed: {}".format(e))
+            return
+
+        # a new summary object, so the sidebar model is rebuilt
+        self.summary = dict(self.summary, analysis=result)
+        meshpath = os.path.join(self.filedir, self.filename)
+        if os.path.exists(meshpath):
+            self.cache.put(meshpath, self.summary)
+
+    def optimize(self, cache_size):
+        """optimize the loaded mesh in place, which is only written to disk by save_optimized"""
+        mesh = self.entity.getMesh()
+        self.optimize_report = optimize_mesh(mesh, cache_size)
+        self._mesh_modified(mesh)
+
+    def compact(self, apply):
+        """compact the loaded mesh in place or only project the savings"""
+        mesh = self.entity.getMesh()
+        self.compact_report = dict(compact_mesh(mesh, apply), applied=apply)
+        if apply:
+            self._mesh_modified(mesh)
+
+    def generate(self, levels, reduction, strategy):
+        """copy the buffers on the render thread and decimate them on a worker thread"""
+        submeshes, shared = read_mesh_buffers(self.entity.getMesh())
+        self.lod_job = (self.worker().submit(generate_lods, submeshes, shared, levels, reduction), strategy)
+
+    def _apply_lods(self):
+        (future, strategy), self.lod_job = self.lod_job, None
+        mesh = self.entity.getMesh()
+        try:
+            apply_lods(mesh, future.result(), strategy)
+        except Exception as e:
+            Ogre.LogManager.getSingleton().logError("LOD generation failed: {}".format(e))
+            return
+        self.lod_times = None
+        self._mesh_modified(mesh)
+
+    def lod_info(self):
+        """sizes per level of the viewed mesh, None for manual LOD levels"""
+        if self.lod_stats is None:
+            self.lod_stats = lod_stats(self.entity.getMesh())
+        return self.lod_stats
+
+    def set_lod_value(self, level, value):
+        mesh = self.entity.getMesh()
+        if not set_lod_value(mesh, level, value):
+            return
+        self.mesh_modified = True
+        self.saved_path = None
+        self.summary = dict(self.summary, lod_levels=[mesh.getLodLevel(i).userValue
+                                                      for i in range(1, mesh.getNumLodLevels())])
+
+    def time_lods(self):
+        """measure the frame time with each level forced, over the next frames"""
+        self.gui.force_lod(None)
+        self.lod_timer = LodTimer(self.entity, self.entity.getMesh().getNumLodLevels())
+
+    def start_stream(self, path):
+        """show the .mesh at path chunk by chunk, returns False if it has to be loaded at once"""
+        lmgr = Ogre.LogManager.getSingleton()
+        if MeshStream is None or not path.lower().endswith(".mesh") or not os.path.isfile(path):
+            lmgr.logWarning("streaming needs numpy and a binary .mesh, loading '{}' at once".format(path))
+            return False
+        try:
+            self.stream = MeshStream(path, self.scn_mgr, RGN_MESHVIEWER, self.stream_budget)
+            header = read_mesh_summary(path)
+        except Exception as e:
+            lmgr.logError("cannot stream '{}', loading it at once: {}".format(path, e))
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            return False
+
+        self.stream.start_partition(self.worker())
+        if self.summary is None:
+            self.summary = header
+        # changes to the file start streaming it again
+        self.update_watch()
+        return True
+
+    def update_stream(self):
+        try:
+            self.stream.update(self.cam)
+        except Exception as e:
+            Ogre.LogManager.getSingleton().logError("streaming failed: {}".format(e))
+            self.stream.close()
+            self.stream = None
+            return
+        if self.stream.ready:
+            self._hide_preview()
+
+    def _mesh_modified(self, mesh):
+        self.mesh_modified = True
+        self.saved_path = None
+        # the triangles and vertices moved
+        self.bvhs.pop(mesh_key(mesh), None)
+        self.lod_stats = None
+
+        # show the new buffers, but keep the cache describing the file
+        summary = mesh_summary(mesh)
+        summary.update(load_time=self.summary.get("load_time"), missing_materials=self.mat_creator.missing)
+        self.summary = summary
+
+    def save_mesh(self, suffix):
+        """save the modified mesh next to the original"""
+        self.saved_path = suffixed_path(os.path.join(self.filedir, self.filename), suffix)
+        Ogre.MeshSerializer().exportMesh(self.entity.getMesh(), self.saved_path)
+        Ogre.LogManager.getSingleton().logMessage("saved mesh to '{}'".format(self.saved_path))
+
     def _save_screenshot(self):
         name = os.path.splitext(self.filename)[0]
         outpath = os.path.join(self.filedir, "screenshot_{}_".format(name))
@@ -373,7 +2343,16 @@ class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
         self.cam.getViewport().setOverlaysEnabled(True)
 
     def locateResources(self):
+        with self.startup_phase("locateResources"):
+            self._locate_resources()
+
+    def _locate_resources(self):
         rgm = Ogre.ResourceGroupManager.getSingleton()
+        if self.lazy_scripts:
+            if self.script_index is None:
+                self.script_index = ScriptIndex(self.getFSLayer().getWritablePath(SCRIPT_INDEX_NAME))
+            # nothing is parsed with a new root
+            self.scripts = ScriptResolver(self.script_index)
         # ensure our resource group is separate, even with a local resources.cfg
         rgm.createResourceGroup(RGN_MESHVIEWER, False)
 
@@ -387,28 +2366,72 @@ class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
             rgm.addResourceLocation(trays_loc, "Zip", RGN_MESHVIEWER)
 
         if self.rescfg:
-            cfg = Ogre.ConfigFile()
-            cfg.loadDirect(self.rescfg)
+            locate_rescfg(self.rescfg)
+
+        self.locate_file()
 
-            for sec, settings in cfg.getSettingsBySection().items():
-                for kind, loc in settings.items():
-                    rgm.addResourceLocation(loc, kind, sec)
+    def add_location(self, dirname):
+        """
+        make the files in dirname loadable and return their resource group
 
+        that is a group of its own, once the default group is initialised
+        """
+        rgm = Ogre.ResourceGroupManager.getSingleton()
+        if rgm.resourceLocationExists(dirname, Ogre.RGN_DEFAULT):
+            return Ogre.RGN_DEFAULT
+        if rgm.resourceGroupExists(dirname):
+            return dirname
+
+        # lazily resolved scripts are looked up per group, so keep dirname out of the default group
+        if not rgm.isResourceGroupInitialised(Ogre.RGN_DEFAULT) and self.scripts is None:
+            rgm.addResourceLocation(dirname, "FileSystem", Ogre.RGN_DEFAULT)
+            return Ogre.RGN_DEFAULT
+        # initialising the new group parses the scripts in dirname
+        rgm.addResourceLocation(dirname, "FileSystem", dirname)
+        if rgm.isResourceGroupInitialised(Ogre.RGN_DEFAULT):
+            self.initialise_group(dirname)
+        else:
+            self.pending_groups.append(dirname)
+        return dirname
+
+    def initialise_group(self, group):
+        """initialise group, in lazy_scripts mode its materials and programs are parsed when they are used"""
+        if self.scripts is None or not self.scripts.initialise(group):
+            Ogre.ResourceGroupManager.getSingleton().initialiseResourceGroup(group)
+
+    def locate_file(self):
         # explicitly add mesh location to be safe
-        if not rgm.resourceLocationExists(self.filedir, Ogre.RGN_DEFAULT):
-            rgm.addResourceLocation(self.filedir, "FileSystem", Ogre.RGN_DEFAULT)
+        group = self.add_location(self.filedir)
+
+        # imported formats are only converted once, also across restarts
+        self.mesh_name = self.filename
+        self.mesh_dir = self.filedir
+        self.conversion_key = None
+        srcpath = os.path.join(self.filedir, self.filename)
+        # a resource name rather than a path may be found in any group
+        self.mesh_group = group if os.path.isfile(srcpath) else Ogre.RGN_AUTODETECT
+        if not self.filename.lower().endswith(NATIVE_EXTS) and os.path.isfile(srcpath):
+            self.use_conversion(srcpath)
         
     def loadResources(self):
-        rgm = Ogre.ResourceGroupManager.getSingleton()
-        rgm.initialiseResourceGroup(Ogre.RGN_INTERNAL)
-        rgm.initialiseResourceGroup(RGN_MESHVIEWER)
-
-        # only capture default group
-        self.logwin = LogWindow()
-        Ogre.LogManager.getSingleton().getDefaultLog().addListener(self.logwin)
-        rgm.initialiseResourceGroup(Ogre.RGN_DEFAULT)
+        with self.startup_phase("loadResources"):
+            rgm = Ogre.ResourceGroupManager.getSingleton()
+            rgm.initialiseResourceGroup(Ogre.RGN_INTERNAL)
+            rgm.initialiseResourceGroup(RGN_MESHVIEWER)
+
+            # only capture default group
+            self.logwin = LogWindow(spill_path=self.log_file)
+            Ogre.LogManager.getSingleton().getDefaultLog().addListener(self.logwin)
+            self.initialise_group(Ogre.RGN_DEFAULT)
+            for group in self.pending_groups:
+                self.initialise_group(group)
+            self.pending_groups = []
 
     def setup(self):
+        if self.profiler is None:
+            # frame listener callbacks start with the base setup; kept across restarts
+            self.profiler = FrameProfiler(csv_path=self.frame_times)
+
         OgreBites.ApplicationContext.setup(self)
         self.addInputListener(self)
 
@@ -422,7 +2445,7 @@ class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
         self.scn_mgr = scn_mgr
 
         # set listener to deal with missing materials
-        self.mat_creator = MaterialCreator()
+        self.mat_creator = MaterialCreator(self.scripts)
         Ogre.MeshManager.getSingleton().setListener(self.mat_creator)
 
         # HiDPI
@@ -432,6 +2455,9 @@ class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
 
         # for picking
         self.ray_query = scn_mgr.createRayQuery(Ogre.Ray())
+        self.ray_query.setSortByDistance(True)
+        self.bvhs = {}
+        self.resident = collections.OrderedDict()
 
         imgui_overlay.addFont("SdkTrays/Value", RGN_MESHVIEWER)
         self.logwin.font = ImGui.GetIO().Fonts.AddFontDefault()
@@ -448,12 +2474,13 @@ class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
 
         self.highlight_mat = Ogre.MaterialManager.getSingleton().create("Highlight", RGN_MESHVIEWER)
         self.highlight_mat.getTechniques()[0].getPasses()[0].setEmissive((1, 1, 0))
+        # for sub-entities that are still hidden while loading
+        self.loading_mat = Ogre.MaterialManager.getSingleton().create("Loading", RGN_MESHVIEWER)
 
-        main_cam_name = "MeshViewer/Cam"
-        self.cam = scn_mgr.createCamera(main_cam_name)
+        self.cam = scn_mgr.createCamera("MeshViewer/Cam")
         self.cam.setAutoAspectRatio(True)
-        camnode = scn_mgr.getRootSceneNode().createChildSceneNode()
-        camnode.attachObject(self.cam)
+        self.camnode = scn_mgr.getRootSceneNode().createChildSceneNode()
+        self.camnode.attachObject(self.cam)
 
         vp = self.getRenderWindow().addViewport(self.cam)
         vp.setBackgroundColour((.3, .3, .3))
@@ -461,74 +2488,702 @@ class MeshViewer(OgreBites.ApplicationContext, OgreBites.InputListener):
         self.gui = MeshViewerGui(self)
         self.getRenderWindow().addListener(self.gui)
 
-        self.getRoot().renderOneFrame()
-        self.getRoot().renderOneFrame()
+        self.scene_hooks = SceneProfilerHooks(self.profiler)
+        scn_mgr.addListener(self.scene_hooks)
+
+        self.axes = None
 
+        self.camman = OgreBites.CameraMan(self.camnode)
+        self.camman.setStyle(OgreBites.CS_ORBIT)
+        self.camman.setFixedYaw(False)
+
+        self.cache = SummaryCache(self.getFSLayer().getWritablePath(SUMMARY_CACHE_NAME))
+        if self.watch_files and self.watcher is None:
+            self.watcher = create_watcher()
+        if self.recent is None:
+            self.recent = load_recent(self.getFSLayer().getWritablePath(RECENT_FILES_NAME))
+        self.load_file(prerender=True)
+
+        self.imgui_input = OgreBites.ImGuiInputListener()
+        self.input_dispatcher = OgreBites.InputListenerChain([self.imgui_input, self.camman])
+        self.addInputListener(self.input_dispatcher)
+
+    def open(self, path):
+        """view another file in this window, once the current frame is done"""
+        self.pending_open = os.path.abspath(path)
+
+    def load_file(self, prerender=False, keep_view=False):
+        """show filename, a .scene right away and a mesh over the next frames by the MeshLoader"""
+        scn_mgr = self.scn_mgr
+        self.keep_view = keep_view
+        self.diam = None
+        self.analysis = None
+        self.hovered_submesh = -1
+        self.optimize_report = None
+        self.compact_report = None
+        self.saved_path = None
+        self.mesh_modified = False
+        self.lod_job = None
+        self.lod_stats = None
+        self.lod_times = None
+        # the mesh is current again, not merely resident
+        self.resident.pop((self.mesh_group, self.mesh_name), None)
+
+        # a cached summary lets us show the sidebar while the mesh is loading
+        meshpath = os.path.join(self.filedir, self.filename)
+        self.summary = self.cache.get(meshpath)
+        self.add_recent(os.path.abspath(meshpath))
+
+        diam = 1  # until the bounds are known
         if self.filename.lower().endswith(".scene"):
+            if prerender:
+                with self.startup_phase("warm-up frames"):
+                    self.getRoot().renderOneFrame()
+                    self.getRoot().renderOneFrame()
+
+            before = movable_objects(scn_mgr)
             self.attach_node = scn_mgr.getRootSceneNode().createChildSceneNode()
-            self.attach_node.loadChildren(self.filename)
+            with self.startup_phase("entity creation"):
+                self.attach_node.loadChildren(self.filename)
+            self.scene_objects = movable_objects(scn_mgr) - before
 
             self.attach_node._update(True, False)
             diam = self.attach_node._getWorldAABB().getSize().length()
 
             for c in scn_mgr.getCameras().values():
-                if c.getName() == main_cam_name:
+                if c.getName() == self.cam.getName():
                     continue
                 # the camera frustum of any contained camera blows the above heuristic
                 # so use the camera position instead
                 diam = c.getDerivedPosition().length()
                 break
+            self.update_watch()
         else:
-            self.entity = scn_mgr.createEntity(self.filename)
-            scn_mgr.getRootSceneNode().createChildSceneNode().attachObject(self.entity)
-            diam = self.entity.getBoundingBox().getSize().length()
-
-        self.cam.setNearClipDistance(diam * 0.01)
-
-        self.axes = Ogre.DefaultDebugDrawer()
-        self.axes.setStatic(True)
-        self.axes.drawAxes(Ogre.Affine3.IDENTITY, diam / 4)
+            self.mat_creator.reset()
+            if not (self.stream_mode and self.start_stream(meshpath)):
+                self.loader = MeshLoader(self)
 
         if len(scn_mgr.getMovableObjects("Light")) == 0:
             # skip creating light, if scene already contains one
             light = scn_mgr.createLight("MainLight")
             light.setType(Ogre.Light.LT_DIRECTIONAL)
             light.setSpecularColour(Ogre.ColourValue.White)
-            camnode.attachObject(light)
+            self.camnode.attachObject(light)
+
+        self.fit_view(diam)
+        if self.summary is not None:
+            self.show_preview(self.summary)
+
+    def unload_file(self):
+        """destroy what shows the current file, keeping the mesh resident for switching back"""
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader = None
+        self._hide_preview()
+
+        if self.anim_profiler is not None:
+            self.anim_profiler.finish()
+            self.anim_profiler = None
+        self.anim_profile = None
+        self.lod_timer = None
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        self.baked = {}
+        self.stop_stress()
+
+        controller_mgr = Ogre.ControllerManager.getSingleton()
+        for controller in self.active_controllers.values():
+            controller_mgr.destroyController(controller)
+        self.active_controllers = {}
+        self.gui.reset()
 
-        self.camman = OgreBites.CameraMan(camnode)
-        self.camman.setStyle(OgreBites.CS_ORBIT)
-        self.camman.setYawPitchDist(0, 0.3, diam)
-        self.camman.setFixedYaw(False)
+        if self.entity is not None:
+            mesh = self.entity.getMesh()
+            node = self.entity.getParentSceneNode()
+            self.scn_mgr.destroyEntity(self.entity)
+            self.scn_mgr.destroySceneNode(node)
+            self.entity = None
+            self.keep_resident(mesh)
 
-        self.imgui_input = OgreBites.ImGuiInputListener()
-        self.input_dispatcher = OgreBites.InputListenerChain([self.imgui_input, self.camman])
-        self.addInputListener(self.input_dispatcher)
+        if self.attach_node is not None:
+            if self.static_geometry is not None:
+                self.unbatch_scene()
+            for type_name, name in self.scene_objects:
+                if type_name == "Camera":
+                    self.scn_mgr.destroyCamera(name)
+                elif self.scn_mgr.hasMovableObject(name, type_name):
+                    self.scn_mgr.destroyMovableObject(name, type_name)
+            self.scene_objects = set()
+            self.attach_node.removeAndDestroyAllChildren()
+            self.scn_mgr.destroySceneNode(self.attach_node)
+            self.attach_node = None
+            Ogre.MeshManager.getSingleton().unloadUnreferencedResources()
+
+        Ogre.TextureManager.getSingleton().unloadUnreferencedResources()
+
+    def keep_resident(self, mesh):
+        """keep the mesh loaded, dropping the least recently viewed ones beyond resident_bytes"""
+        mesh_mgr = Ogre.MeshManager.getSingleton()
+        if self.mesh_modified or mesh.getSize() > self.resident_bytes:
+            self.bvhs.pop(mesh_key(mesh), None)
+            mesh_mgr.remove(mesh)
+            return
+
+        self.resident[mesh_key(mesh)] = mesh
+        while sum(m.getSize() for m in self.resident.values()) > self.resident_bytes:
+            key, evicted = self.resident.popitem(last=False)
+            self.bvhs.pop(key, None)
+            mesh_mgr.remove(evicted)
+
+    def add_recent(self, path, max_entries=10):
+        self.recent = [path] + [p for p in self.recent if p != path][:max_entries - 1]
+        try:
+            with open(self.getFSLayer().getWritablePath(RECENT_FILES_NAME), "w") as f:
+                json.dump(self.recent, f)
+        except OSError as e:
+            Ogre.LogManager.getSingleton().logWarning("could not store recent files: {}".format(e))
 
     def shutdown(self):
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader = None
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        self.bounds_preview = None
+        # gone with the root
+        self.resident.clear()
+
         Ogre.LogManager.getSingleton().getDefaultLog().removeListener(self.logwin)
+        self.logwin.close()
         OgreBites.ApplicationContext.shutdown(self)
 
         self.entity = None
         self.axes = None
+        if self.cache is not None:
+            self.cache.close()
         if self.restart:
             # make sure empty rendersystem is written
             self.getRoot().shutdown()
             self.getRoot().setRenderSystem(None)
+        else:
+            self.profiler.close()
+            if self.conversions is not None:
+                self.conversions.close()
+            if self.watcher is not None:
+                self.watcher.close()
+            if self.script_index is not None:
+                self.script_index.close()
+
+class MeshInspector(OgreBites.ApplicationContext):
+    """windowless context that loads meshes just to read their properties"""
+
+    def __init__(self, rescfg):
+        OgreBites.ApplicationContext.__init__(self, "OgreMeshViewer")
+        self.rescfg = rescfg
+        self.group = None
+
+    def oneTimeConfig(self):
+        # the software renderer needs no display and provides the buffer manager we need for loading
+        root = self.getRoot()
+        root.setRenderSystem(root.getRenderSystemByName("Tiny Rendering Subsystem"))
+        return True
+
+    def setup(self):
+        self.getRoot().initialise(False)
 
+        if self.rescfg:
+            locate_rescfg(self.rescfg)
+        Ogre.ResourceGroupManager.getSingleton().initialiseAllResourceGroups()
+
+        self.mat_creator = MaterialCreator()
+        Ogre.MeshManager.getSingleton().setListener(self.mat_creator)
+
+    def use_directory(self, dirname):
+        """make dirname the only mesh location, so its scripts are parsed once per batch"""
+        if dirname == self.group:
+            return
+        rgm = Ogre.ResourceGroupManager.getSingleton()
+        if self.group is not None:
+            rgm.destroyResourceGroup(self.group)
+        rgm.createResourceGroup(dirname)
+        rgm.addResourceLocation(dirname, "FileSystem", dirname)
+        rgm.initialiseResourceGroup(dirname)
+        self.group = dirname
+
+    def inspect(self, path):
+        ret = {"file": path, "size": os.path.getsize(path)}
+        self.use_directory(os.path.dirname(path))
+        self.mat_creator.reset()
+
+        mesh_mgr = Ogre.MeshManager.getSingleton()
+        start = time.perf_counter()
+        try:
+            mesh = mesh_mgr.load(os.path.basename(path), self.group)
+        except RuntimeError as e:
+            ret["error"] = str(e)
+            return ret
+        ret["load_time"] = time.perf_counter() - start
+
+        ret.update(mesh_summary(mesh))
+        ret["missing_materials"] = self.mat_creator.missing
+        mesh_mgr.remove(mesh)
+        return ret
+
+    def rewrite(self, path, process, suffix, in_place=False):
+        """load path, modify the mesh by process, which returns the record, and export it"""
+        ret = {"file": path}
+        self.use_directory(os.path.dirname(path))
+
+        mesh_mgr = Ogre.MeshManager.getSingleton()
+        try:
+            mesh = mesh_mgr.load(os.path.basename(path), self.group)
+        except RuntimeError as e:
+            ret["error"] = str(e)
+            return ret
+
+        try:
+            ret.update(process(mesh))
+        except ValueError as e:
+            ret["error"] = str(e)
+            mesh_mgr.remove(mesh)
+            return ret
+        ret["output"] = path if in_place else suffixed_path(path, suffix)
+        Ogre.MeshSerializer().exportMesh(mesh, ret["output"])
+        mesh_mgr.remove(mesh)
+        return ret
+
+class ThumbnailRenderer(MeshInspector):
+    """renders meshes offscreen from evenly spaced angles around them, reusing one context and render texture"""
+
+    def __init__(self, rescfg, size=256, angles=1, render_system=THUMBNAIL_RENDER_SYSTEM):
+        MeshInspector.__init__(self, rescfg)
+        self.size = size
+        self.angles = angles
+        self.render_system = render_system
+
+    def oneTimeConfig(self):
+        root = self.getRoot()
+        rs = root.getRenderSystemByName(self.render_system)
+        if rs is None:
+            raise RuntimeError("render system '{}' is not available".format(self.render_system))
+        root.setRenderSystem(rs)
+        return True
+
+    def setup(self):
+        root = self.getRoot()
+        root.initialise(False)
+        # the context comes with a window, that is never shown
+        self.window = root.createRenderWindow("OgreMeshViewer Thumbnails", 1, 1, False, {"hidden": "true"})
+
+        # for the system-wide RTShaderLib
+        OgreBites.ApplicationContext.locateResources(self)
+        if self.rescfg:
+            locate_rescfg(self.rescfg)
+        self.initialiseRTShaderSystem()
+        Ogre.ResourceGroupManager.getSingleton().initialiseAllResourceGroups()
+
+        self.mat_creator = MaterialCreator()
+        Ogre.MeshManager.getSingleton().setListener(self.mat_creator)
+
+        scn_mgr = root.createSceneManager()
+        OgreRTShader.ShaderGenerator.getSingleton().addSceneManager(scn_mgr)
+        scn_mgr.setAmbientLight((.1, .1, .1))
+        self.scn_mgr = scn_mgr
+
+        # same camera and light as the viewer
+        self.cam = scn_mgr.createCamera("Thumbnails/Cam")
+        self.cam.setAspectRatio(1)
+        camnode = scn_mgr.getRootSceneNode().createChildSceneNode()
+        camnode.attachObject(self.cam)
+        light = scn_mgr.createLight("MainLight")
+        light.setType(Ogre.Light.LT_DIRECTIONAL)
+        light.setSpecularColour(Ogre.ColourValue.White)
+        camnode.attachObject(light)
+
+        self.camman = OgreBites.CameraMan(camnode)
+        self.camman.setStyle(OgreBites.CS_ORBIT)
+        self.camman.setFixedYaw(False)
+
+        tex = Ogre.TextureManager.getSingleton().createManual(
+            "Thumbnails/Target", Ogre.RGN_INTERNAL, Ogre.TEX_TYPE_2D, self.size, self.size, 0,
+            Ogre.PF_BYTE_RGBA, Ogre.TU_RENDERTARGET)
+        self.target = tex.getBuffer().getRenderTarget()
+        self.target.setAutoUpdated(False)
+        vp = self.target.addViewport(self.cam)
+        vp.setBackgroundColour((.3, .3, .3))
+        vp.setOverlaysEnabled(False)
+
+    def render(self, path, outdir):
+        """write the views of path as outdir/NUM.png, one per angle"""
+        ret = {"file": path}
+        self.use_directory(os.path.dirname(path))
+
+        mesh_mgr = Ogre.MeshManager.getSingleton()
+        start = time.perf_counter()
+        try:
+            mesh = mesh_mgr.load(os.path.basename(path), self.group)
+        except RuntimeError as e:
+            ret["error"] = str(e)
+            return ret
+
+        entity = self.scn_mgr.createEntity(mesh)
+        node = self.scn_mgr.getRootSceneNode().createChildSceneNode()
+        node.attachObject(entity)
+
+        # the heuristic of MeshViewer.fit_view
+        diam = entity.getBoundingBox().getSize().length()
+        self.cam.setNearClipDistance(diam * 0.01)
+        ret["images"] = []
+        for i in range(self.angles):
+            self.camman.setYawPitchDist(2 * math.pi * i / self.angles, 0.3, diam)
+            self.target.update()
+            ret["images"].append("{}.png".format(i))
+            self.target.writeContentsToFile(os.path.join(outdir, ret["images"][-1]))
+        ret["render_time"] = time.perf_counter() - start
+
+        # only keep what the next mesh may share
+        self.scn_mgr.destroyEntity(entity)
+        self.scn_mgr.destroySceneNode(node)
+        mesh_mgr.remove(mesh)
+        Ogre.MaterialManager.getSingleton().unloadUnreferencedResources()
+        Ogre.TextureManager.getSingleton().unloadUnreferencedResources()
+        return ret
+
+def thumbnail_settings(size, angles, render_system):
+    return {"ogre": Ogre.OGRE_VERSION, "size": size, "angles": angles, "render_system": render_system}
+
+def suffixed_path(path, suffix):
+    return os.path.splitext(path)[0] + suffix
+
+_inspector = None
+
+def _inspect_init(rescfg):
+    global _inspector
+    # keep the log off stdout, which carries the records
+    logmgr = Ogre.LogManager()
+    logmgr.createLog("", True, False, True)
+
+    _inspector = MeshInspector(rescfg)
+    _inspector.initApp()
+    _inspector.logmgr = logmgr
+
+def _inspect_batch(paths):
+    return [_inspector.inspect(path) for path in paths]
+
+def _optimize_batch(paths, cache_size, in_place):
+    def process(mesh):
+        return {"submeshes": optimize_mesh(mesh, cache_size)}
+    return [_inspector.rewrite(path, process, OPTIMIZED_SUFFIX, in_place) for path in paths]
+
+def _compact_batch(paths, in_place):
+    return [_inspector.rewrite(path, compact_mesh, COMPACTED_SUFFIX, in_place) for path in paths]
+
+def _lod_batch(paths, levels, reduction, strategy, in_place):
+    def process(mesh):
+        submeshes, shared = read_mesh_buffers(mesh)
+        apply_lods(mesh, generate_lods(submeshes, shared, levels, reduction), strategy)
+        return {"lod_strategy": mesh.getLodStrategy().getName(), "lod_levels": lod_stats(mesh)}
+    return [_inspector.rewrite(path, process, LOD_SUFFIX, in_place) for path in paths]
+
+def _thumbnail_init(rescfg, outdir, size, angles, render_system):
+    global _inspector
+    logmgr = Ogre.LogManager()
+    logmgr.createLog("", True, False, True)
+
+    _inspector = ThumbnailRenderer(rescfg, size, angles, render_system)
+    _inspector.initApp()
+    _inspector.logmgr = logmgr
+    _inspector.thumbnails = ConversionCache(outdir, max_bytes=None)
+    _inspector.settings = thumbnail_settings(size, angles, render_system)
+
+def _thumbnail_batch(paths):
+    ret = []
+    for path in paths:
+        # rendered to a staging entry, that the parent process commits
+        key = _inspector.thumbnails.key(path, _inspector.settings)
+        staging = _inspector.thumbnails.begin(key)
+        rec = _inspector.render(path, staging)
+        rec["key"] = key
+        rec["staging"] = staging
+        ret.append(rec)
+    return ret
+
+def _read_header_batch(paths):
+    ret = []
+    for path in paths:
+        rec = {"file": path, "size": os.path.getsize(path)}
+        start = time.perf_counter()
+        try:
+            rec.update(read_mesh_summary(path))
+        except Exception as e:
+            rec["error"] = str(e)
+        rec["load_time"] = time.perf_counter() - start
+        ret.append(rec)
+    return ret
+
+def find_meshes(paths, exts=(".mesh",)):
+    """expand directories to the contained mesh files, keeping files from one directory together"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield os.path.abspath(path)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for fn in sorted(filenames):
+                if fn.lower().endswith(exts):
+                    yield os.path.abspath(os.path.join(dirpath, fn))
+
+def inspect_batches(files, batch_size=64):
+    batch = []
+    for path in files:
+        # a batch shares one resource group, so it must not span directories
+        if batch and (len(batch) == batch_size or os.path.dirname(batch[0]) != os.path.dirname(path)):
+            yield batch
+            batch = []
+        batch.append(path)
+    if batch:
+        yield batch
+
+def run_batches(work, files, rescfg, jobs=None, initializer=_inspect_init):
+    """results of work for each batch of files, using a pool of worker processes unless jobs is 1"""
+    if jobs == 1:
+        if initializer:
+            initializer(rescfg)
+        yield from map(work, inspect_batches(files))
+        return
+
+    # shut the workers down once the caller is done, or stops early
+    with concurrent.futures.ProcessPoolExecutor(jobs, initializer=initializer, initargs=(rescfg,)) as pool:
+        yield from pool.map(work, inspect_batches(files))
+
+def open_output(path):
+    """the file to write the batch records to, stdout without path"""
+    return open(path, "w") if path else contextlib.nullcontext(sys.stdout)
+
+def inspect_meshes(paths, rescfg, out, jobs=None, header_only=False, cache=None):
+    """
+    write one json record per mesh to out, using a pool of worker processes
+
+    with header_only, the records are read from the binary .mesh headers without loading anything into Ogre.
+    Otherwise records found in the summary cache are written right away and only the others are loaded.
+    """
+    def write(rec):
+        out.write(json.dumps(rec) + "\n")
+
+    def uncached(files):
+        for path in files:
+            rec = cache.get(path)
+            if rec is None:
+                yield path
+                continue
+            rec["file"] = path
+            rec["cached"] = True
+            write(rec)
+
+    files = find_meshes(paths)
+    if cache is not None and not header_only:
+        files = uncached(files)
+
+    work = _read_header_batch if header_only else _inspect_batch
+    initializer = None if header_only else _inspect_init
+
+    for records in run_batches(work, files, rescfg, jobs, initializer):
+        for rec in records:
+            write(rec)
+            if cache is not None and not header_only and "error" not in rec:
+                cache.put(rec["file"], {k: v for k, v in rec.items() if k != "file"})
+        out.flush()
+
+def rewrite_meshes(paths, rescfg, out, work, jobs=None):
+    """
+    modify and export all meshes by work, e.g. _optimize_batch, and write its json record per mesh to out
+
+    outputs of earlier runs are skipped
+    """
+    files = (f for f in find_meshes(paths) if not f.endswith((OPTIMIZED_SUFFIX, COMPACTED_SUFFIX, LOD_SUFFIX)))
+    for records in run_batches(work, files, rescfg, jobs):
+        for rec in records:
+            out.write(json.dumps(rec) + "\n")
+        out.flush()
+
+def render_thumbnails(paths, rescfg, out, outdir, size=256, angles=1, render_system=THUMBNAIL_RENDER_SYSTEM,
+                      jobs=None):
+    """
+    render the views of all meshes to outdir and write one json record per mesh to out
+
+    outdir is a ConversionCache keyed by the mesh content and the settings,
+    so meshes rendered by an earlier run are not rendered again.
+    It is not size bounded, so no thumbnails are evicted while they are rendered.
+    Meshes with the same key are rendered once and all get the records of that entry.
+    """
+    cache = ConversionCache(outdir, max_bytes=None)
+    settings = thumbnail_settings(size, angles, render_system)
+
+    def write(rec, entry):
+        rec["images"] = [os.path.join(entry, fn) for fn in sorted(os.listdir(entry), key=lambda fn: int(fn[:-4]))]
+        out.write(json.dumps(rec) + "\n")
+
+    # paths with the same content and settings as a dispatched one, by key
+    shared = {}
+
+    def unrendered(files):
+        for path in files:
+            key = cache.key(path, settings)
+            if key in shared:
+                shared[key].append(path)
+                continue
+            entry = cache.get(key)
+            if entry is None:
+                shared[key] = []
+                yield path
+                continue
+            write({"file": path, "cached": True}, entry)
+
+    init = functools.partial(_thumbnail_init, outdir=outdir, size=size, angles=angles, render_system=render_system)
+    for records in run_batches(_thumbnail_batch, unrendered(find_meshes(paths)), rescfg, jobs, init):
+        for rec in records:
+            key, staging = rec.pop("key"), rec.pop("staging")
+            if "error" in rec:
+                cache.abort(staging)
+                for path in [rec["file"]] + shared.pop(key):
+                    out.write(json.dumps(dict(rec, file=path)) + "\n")
+                continue
+            cache.commit(key, staging)
+            entry = cache.get(key)
+            write(rec, entry)
+            for path in shared.pop(key):
+                write({"file": path, "same_as": rec["file"]}, entry)
+        out.flush()
+    cache.close()
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Ogre Mesh Viewer")
-    parser.add_argument("infile", help="path to a ogre .mesh, ogre .scene or any format supported by assimp")
+    parser.add_argument("infile", nargs="+", help="path to a ogre .mesh, ogre .scene or any format supported by assimp")
     parser.add_argument("-c", "--rescfg", help="path to the resources.cfg")
+    parser.add_argument("--log-file", help="also append every message shown in the log window to this file")
+    parser.add_argument("--frame-times", help="write per-frame timings of the render loop phases to this CSV file")
+    parser.add_argument("--no-watch", action="store_true",
+                        help="do not reload the mesh, its materials and textures when they change on disk")
+    parser.add_argument("--lazy-scripts", action="store_true",
+                        help="only parse the material and program scripts the viewed file uses, "
+                        "instead of all scripts next to it and in RESCFG")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="log how long the startup phases took, once the file is shown")
+    parser.add_argument("--stream", action="store_true",
+                        help="show a .mesh chunk by chunk from the memory mapped file, for meshes too large to load at once")
+    parser.add_argument("--stream-budget-mb", type=int, default=512,
+                        help="memory for the --stream chunks, the farthest are dropped beyond it (default: %(default)s)")
+    parser.add_argument("--resident-mb", type=int, default=256,
+                        help="memory for keeping recently viewed meshes loaded after opening another file "
+                        "(default: %(default)s)")
+    parser.add_argument("--inspect", action="store_true",
+                        help="print the mesh properties of all given files and directories as NDJSON instead of viewing")
+    parser.add_argument("--optimize", action="store_true",
+                        help="optimize all given .mesh files and directories for the vertex caches instead of viewing, "
+                        "writing NAME{} next to each".format(OPTIMIZED_SUFFIX))
+    parser.add_argument("--compact", action="store_true",
+                        help="convert all given .mesh files and directories to compact vertex and index formats "
+                        "instead of viewing, writing NAME{} next to each".format(COMPACTED_SUFFIX))
+    parser.add_argument("--lod", action="store_true",
+                        help="generate LOD levels for all given .mesh files and directories instead of viewing, "
+                        "writing NAME{} next to each".format(LOD_SUFFIX))
+    parser.add_argument("--lod-levels", type=int, default=3, help="number of --lod levels (default: %(default)s)")
+    parser.add_argument("--lod-reduction", type=float, default=0.5,
+                        help="fraction of the triangles of the previous level kept by each --lod level "
+                        "(default: %(default)s)")
+    parser.add_argument("--lod-strategy", default="distance",
+                        help="--lod strategy, distance, pixel_count or screen_ratio_pixel_count (default: %(default)s)")
+    parser.add_argument("--thumbnails", metavar="OUTDIR",
+                        help="render all given .mesh files and directories offscreen to OUTDIR instead of viewing, "
+                        "skipping the ones rendered before")
+    parser.add_argument("--thumbnail-size", type=int, default=256,
+                        help="width and height of the --thumbnails in pixels (default: %(default)s)")
+    parser.add_argument("--angles", type=int, default=1,
+                        help="number of --thumbnails per mesh, evenly spaced around it (default: %(default)s)")
+    parser.add_argument("--render-system", default=THUMBNAIL_RENDER_SYSTEM,
+                        help="render system used for the --thumbnails (default: %(default)s)")
+    parser.add_argument("--in-place", action="store_true",
+                        help="let --optimize, --compact or --lod overwrite the input files")
+    parser.add_argument("--cache-size", type=int, default=16,
+                        help="post-transform cache size assumed by --optimize (default: %(default)s)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="number of --inspect, --optimize, --compact, --lod or --thumbnails worker processes "
+                        "(default: cpu count)")
+    parser.add_argument("-o", "--output",
+                        help="write --inspect, --optimize, --compact, --lod or --thumbnails records to this file "
+                        "instead of stdout")
+    parser.add_argument("--header-only", action="store_true",
+                        help="let --inspect read binary .mesh headers directly instead of loading the meshes with Ogre")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the summary cache for --inspect")
+    parser.add_argument("--hash", action="store_true",
+                        help="also match summary cache entries by content, e.g. for fresh checkouts")
     args = parser.parse_args()
-    app = MeshViewer(args.infile, args.rescfg)
+
+    if args.inspect:
+        cache = None
+        if not args.no_cache:
+            cache_path = Ogre.FileSystemLayer("OgreMeshViewer").getWritablePath(SUMMARY_CACHE_NAME)
+            cache = SummaryCache(cache_path, use_hash=args.hash)
+        try:
+            with open_output(args.output) as out:
+                inspect_meshes(args.infile, args.rescfg, out, args.jobs, args.header_only, cache)
+        finally:
+            if cache is not None:
+                cache.close()
+        sys.exit(0)
+
+    if args.thumbnails:
+        import shutil
+
+        if args.render_system == THUMBNAIL_RENDER_SYSTEM and not os.environ.get("DISPLAY") and shutil.which("xvfb-run"):
+            # headless, so render with Mesa in a virtual X server
+            env = dict(os.environ, LIBGL_ALWAYS_SOFTWARE="1")
+            os.execvpe("xvfb-run", ["xvfb-run", "-a", sys.executable, os.path.abspath(__file__)] + sys.argv[1:], env)
+
+        with open_output(args.output) as out:
+            render_thumbnails(args.infile, args.rescfg, out, args.thumbnails, args.thumbnail_size, args.angles,
+                              args.render_system, args.jobs)
+        sys.exit(0)
+
+    if args.optimize or args.compact or args.lod:
+        if optimize_mesh is None:
+            parser.error("--optimize, --compact and --lod require numpy")
+        if args.optimize:
+            work = functools.partial(_optimize_batch, cache_size=args.cache_size, in_place=args.in_place)
+        elif args.compact:
+            work = functools.partial(_compact_batch, in_place=args.in_place)
+        else:
+            if args.lod_strategy not in LOD_STRATEGIES:
+                parser.error("--lod-strategy must be one of " + ", ".join(LOD_STRATEGIES))
+            work = functools.partial(_lod_batch, levels=args.lod_levels, reduction=args.lod_reduction,
+                                     strategy=args.lod_strategy, in_place=args.in_place)
+        with open_output(args.output) as out:
+            rewrite_meshes(args.infile, args.rescfg, out, work, args.jobs)
+        sys.exit(0)
+
+    if len(args.infile) > 1:
+        parser.error("only one file can be viewed at a time")
+
+    app = MeshViewer(args.infile[0], args.rescfg)
+    app.log_file = args.log_file
+    app.frame_times = args.frame_times
+    app.resident_bytes = args.resident_mb << 20
+    app.stream_mode = args.stream
+    app.stream_budget = args.stream_budget_mb << 20
+    app.watch_files = not args.no_watch
+    app.lazy_scripts = args.lazy_scripts
+    if args.profile_startup:
+        app.startup = StartupProfile()
+        app.startup.add("imports", time.perf_counter() - IMPORT_START)
 
     while True:  # allow auto restart
         try:
-            app.initApp()
+            with app.startup_phase("initApp"):
+                app.initApp()
             app.getRoot().startRendering()
             app.closeApp()
         except RuntimeError as e:
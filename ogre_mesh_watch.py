@@ -0,0 +1,149 @@
+"""
+Watch files for changes, e.g. by an exporter writing a mesh or texture
+
+On Linux the containing directories are watched with inotify, so files replaced by a rename
+are noticed too. Elsewhere the files are polled. Bursts of events are coalesced and only
+reported once the files stayed unchanged for a moment.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+class FileWatcher:
+    """
+    reports changed files of a watched set, coalescing bursts of writes
+
+    subclasses implement _run, which start runs on a thread until close
+    """
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.files = frozenset()
+        self.pending = {}  # path: time of the last event
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def watch(self, paths):
+        """replace the watched files"""
+        with self.lock:
+            self.files = frozenset(os.path.abspath(p) for p in paths)
+            self.pending = {p: t for p, t in self.pending.items() if p in self.files}
+
+    def changes(self, quiet=0.3):
+        """the files changed since the last call, once none of them changed for quiet seconds"""
+        with self.lock:
+            if not self.pending or time.monotonic() - max(self.pending.values()) < quiet:
+                return set()
+            ret = set(self.pending)
+            self.pending = {}
+        return ret
+
+    def close(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+    def _changed(self, path):
+        with self.lock:
+            if path in self.files:
+                self.pending[path] = time.monotonic()
+
+    def _run(self):
+        raise NotImplementedError
+
+class PollingWatcher(FileWatcher):
+    """compares size and mtime of the watched files every interval"""
+
+    def _run(self):
+        stats = {}
+        while self.running:
+            for path in self.files:
+                try:
+                    st = os.stat(path)
+                    stat = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    stat = None
+                if path in stats and stats[path] != stat:
+                    self._changed(path)
+                stats[path] = stat
+            time.sleep(self.interval)
+
+class InotifyWatcher(FileWatcher):
+    """watches the directories containing the files"""
+
+    def __init__(self, interval=0.5):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}  # watch descriptor: directory
+        FileWatcher.__init__(self, interval)
+
+    def watch(self, paths):
+        FileWatcher.watch(self, paths)
+        wanted = {os.path.dirname(p) for p in self.files}
+        with self.lock:
+            for wd, dirname in list(self.dirs.items()):
+                if dirname not in wanted:
+                    self.libc.inotify_rm_watch(self.fd, wd)
+                    del self.dirs[wd]
+            mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+            for dirname in wanted - set(self.dirs.values()):
+                wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dirname), mask)
+                if wd >= 0:
+                    self.dirs[wd] = dirname
+
+    def close(self):
+        FileWatcher.close(self)
+        os.close(self.fd)
+
+    def _run(self):
+        while self.running:
+            if not select.select([self.fd], [], [], self.interval)[0]:
+                continue
+            try:
+                buf = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                continue
+
+            pos = 0
+            while pos < len(buf):
+                wd, _, _, length = EVENT_HEADER.unpack_from(buf, pos)
+                pos += EVENT_HEADER.size
+                name = os.fsdecode(buf[pos:pos + length].rstrip(b"\0"))
+                pos += length
+                with self.lock:
+                    dirname = self.dirs.get(wd)
+                if dirname is not None and name:
+                    self._changed(os.path.join(dirname, name))
+
+def create_watcher(interval=0.5):
+    """inotify based watcher if available, polling otherwise"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(interval).start()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(interval).start()
@@ -0,0 +1,58 @@
+import collections
+
+import numpy as np
+import pytest
+
+from ogre_mesh_analysis import (OT_TRIANGLE_FAN, OT_TRIANGLE_STRIP, acmr, cache_misses, duplicate_triangles,
+                                duplicate_vertices, triangles, unreferenced_vertices)
+
+def lru_misses(indices, cache_size):
+    cache = collections.OrderedDict()
+    ret = []
+    for i in indices:
+        hit = i in cache
+        if hit:
+            cache.move_to_end(i)
+        else:
+            cache[i] = None
+            if len(cache) > cache_size:
+                cache.popitem(last=False)
+        ret.append(not hit)
+    return np.array(ret)
+
+@pytest.mark.parametrize("cache_size", [4, 16, 32])
+@pytest.mark.parametrize("vertices", [8, 50, 400])
+def test_cache_misses_match_lru(cache_size, vertices):
+    rng = np.random.default_rng(cache_size * vertices)
+    indices = rng.integers(0, vertices, 3000)
+    expected = lru_misses(indices, cache_size)
+    assert np.array_equal(cache_misses(indices, cache_size, max_window=len(indices)), expected)
+
+def test_cache_misses_long_window_missed():
+    # the 0 is reused after 20 distinct vertices, which a default window of 8 * 2 does not cover
+    indices = np.array([0] + list(range(1, 21)) + [0])
+    assert cache_misses(indices, 2)[-1]
+
+def test_acmr_grid():
+    # each vertex of a strip ordered grid is transformed once with a large cache
+    n = 10
+    a = (np.arange(n - 1)[:, None] * n + np.arange(n - 1)[None, :]).ravel()
+    tris = np.stack([a, a + 1, a + n, a + 1, a + n + 1, a + n], 1).reshape(-1, 3)
+    assert acmr(tris, cache_size=64) == pytest.approx(n * n / len(tris))
+
+def test_triangles_strip_and_fan():
+    indices = np.arange(5)
+    assert triangles(indices, OT_TRIANGLE_STRIP).tolist() == [[0, 1, 2], [2, 1, 3], [2, 3, 4]]
+    assert triangles(indices, OT_TRIANGLE_FAN).tolist() == [[0, 1, 2], [0, 2, 3], [0, 3, 4]]
+    assert triangles(indices, 2) is None
+
+def test_duplicate_triangles():
+    big = 1 << 21
+    tris = np.array([[0, 1, 2], [2, 0, 1], [1, 2, 0], [0, 1, 2 + big], [3, 4, 5]], dtype=np.uint32)
+    assert duplicate_triangles(tris) == 2
+    assert duplicate_triangles(tris[:0]) == 0
+
+def test_duplicate_and_unreferenced_vertices():
+    raw = np.array([[1, 2, 3], [1, 2, 3], [1, 2, 4]], dtype=np.uint8)
+    assert duplicate_vertices(raw) == 1
+    assert unreferenced_vertices(np.array([[0, 1, 1]]), 4) == 2
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from ogre_mesh_analysis import OT_TRIANGLE_LIST
+from ogre_mesh_bvh import BVH, build_mesh_bvh
+
+def brute_force(tris, positions, origin, direction):
+    """closest hit as (t, triangle index) or None, testing every triangle in double precision"""
+    p = positions.astype(np.float64)
+    v0 = p[tris[:, 0]]
+    e1, e2 = p[tris[:, 1]] - v0, p[tris[:, 2]] - v0
+    pvec = np.cross(direction, e2)
+    det = (e1 * pvec).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tvec = origin - v0
+        u = (tvec * pvec).sum(axis=1) / det
+        qvec = np.cross(tvec, e1)
+        v = qvec @ direction / det
+        t = (e2 * qvec).sum(axis=1) / det
+    hit = (np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    if not hit.any():
+        return None
+    best = np.nonzero(hit)[0][np.argmin(t[hit])]
+    return t[best], best
+
+@pytest.fixture
+def soup():
+    rng = np.random.default_rng(1)
+    positions = rng.uniform(-1, 1, (600, 3)).astype(np.float32)
+    tris = np.arange(600).reshape(-1, 3)
+    return tris, positions
+
+def test_intersect_matches_brute_force(soup):
+    tris, positions = soup
+    bvh = BVH(tris, positions, np.zeros(len(tris), np.int32), leaf_size=4, branching=4)
+
+    rng = np.random.default_rng(2)
+    hits = 0
+    for _ in range(200):
+        origin = rng.uniform(-3, 3, 3)
+        direction = rng.uniform(-0.5, 0.5, 3) - origin
+        expected = brute_force(tris, positions, origin, direction)
+        res = bvh.intersect(origin, direction)
+        if expected is None:
+            assert res is None
+            continue
+        hits += 1
+        assert res[0] == pytest.approx(expected[0], rel=1e-4)
+        assert res[2] == expected[1]
+    assert hits > 50
+
+def test_axis_aligned_ray(soup):
+    tris, positions = soup
+    bvh = BVH(tris, positions, np.zeros(len(tris), np.int32))
+    origin, direction = np.array([0.1, 0.2, -5.0]), np.array([0.0, 0.0, 1.0])
+    expected = brute_force(tris, positions, origin, direction)
+    assert bvh.intersect(origin, direction)[2] == expected[1]
+
+def test_build_mesh_submesh_ids():
+    quad = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], dtype=np.float32)
+    indices = np.array([0, 1, 2, 0, 2, 3], dtype=np.uint16)
+    submeshes = [{"positions": quad, "indices": indices, "operation": OT_TRIANGLE_LIST},
+                 {"positions": None, "indices": indices, "operation": OT_TRIANGLE_LIST}]
+    shared = {"positions": quad + np.float32([0, 0, 1])}
+    bvh = build_mesh_bvh(submeshes, shared)
+
+    # the shared quad at z = 1 is in front of the first submesh at z = 0
+    t, submesh, _ = bvh.intersect([0.3, 0.6, 5], [0, 0, -1])
+    assert (t, submesh) == (pytest.approx(4), 1)
+    t, submesh, _ = bvh.intersect([0.3, 0.6, -5], [0, 0, 1])
+    assert (t, submesh) == (pytest.approx(5), 0)
+    assert bvh.intersect([2, 2, 5], [0, 0, -1]) is None
+
+def test_empty():
+    assert build_mesh_bvh([]).intersect([0, 0, 0], [0, 0, 1]) is None
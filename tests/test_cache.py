@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+
+from ogre_mesh_cache import ConversionCache, SummaryCache
+
+SUMMARY = {"submeshes": [], "padding": "x" * 100}
+SUMMARY_BYTES = len(json.dumps(SUMMARY))
+
+@pytest.fixture
+def meshes(tmp_path):
+    ret = []
+    for name in "abc":
+        path = tmp_path / (name + ".mesh")
+        path.write_bytes(name.encode())
+        ret.append(str(path))
+    return ret
+
+def test_summary_hit_and_stale(tmp_path, meshes):
+    cache = SummaryCache(str(tmp_path / "cache.sqlite"))
+    assert cache.get(meshes[0]) is None
+    cache.put(meshes[0], SUMMARY)
+    assert cache.get(meshes[0]) == SUMMARY
+
+    with open(meshes[0], "ab") as f:
+        f.write(b"modified")
+    assert cache.get(meshes[0]) is None
+    cache.close()
+
+def test_summary_persists(tmp_path, meshes):
+    dbpath = str(tmp_path / "cache.sqlite")
+    cache = SummaryCache(dbpath)
+    cache.put(meshes[0], SUMMARY)
+    cache.close()
+
+    cache = SummaryCache(dbpath)
+    assert cache.get(meshes[0]) == SUMMARY
+    assert cache.total == SUMMARY_BYTES
+    cache.close()
+
+def test_summary_hash(tmp_path, meshes):
+    cache = SummaryCache(str(tmp_path / "cache.sqlite"), use_hash=True)
+    cache.put(meshes[0], SUMMARY)
+    copy = tmp_path / "copy.mesh"
+    copy.write_bytes(b"a")
+    assert cache.get(str(copy)) == SUMMARY
+    cache.close()
+
+def test_summary_evicts_least_recently_used(tmp_path, meshes):
+    # trimmed to 90% of max_bytes, which still holds two
+    cache = SummaryCache(str(tmp_path / "cache.sqlite"), max_bytes=int(SUMMARY_BYTES * 2 / 0.9) + 1)
+    cache.put(meshes[0], SUMMARY)
+    cache.put(meshes[1], SUMMARY)
+    assert cache.get(meshes[0]) is not None
+    cache.put(meshes[2], SUMMARY)
+
+    assert cache.get(meshes[1]) is None
+    assert cache.get(meshes[0]) is not None
+    assert cache.get(meshes[2]) is not None
+    assert cache.total == SUMMARY_BYTES * 2
+    cache.close()
+
+def test_conversion_commit_keeps_first(tmp_path, meshes):
+    cache = ConversionCache(str(tmp_path / "conversions"))
+    key = cache.key(meshes[0], {"setting": 1})
+    assert key != cache.key(meshes[0], {"setting": 2})
+    assert cache.get(key) is None
+
+    first, second = cache.begin(key), cache.begin(key)
+    assert first != second
+    for staging, text in ((first, "first"), (second, "second")):
+        with open(os.path.join(staging, "out.txt"), "w") as f:
+            f.write(text)
+    cache.commit(key, first)
+    cache.commit(key, second)
+
+    with open(os.path.join(cache.get(key), "out.txt")) as f:
+        assert f.read() == "first"
+    assert not os.path.exists(second)
+    cache.close()
+
+def test_conversion_evict(tmp_path, meshes):
+    cache = ConversionCache(str(tmp_path / "conversions"), max_bytes=150)
+    keys = []
+    for path in meshes:
+        key = cache.key(path, {})
+        staging = cache.begin(key)
+        with open(os.path.join(staging, "out.bin"), "wb") as f:
+            f.write(b"x" * 100)
+        cache.commit(key, staging)
+        keys.append(key)
+
+    # only one entry fits, the older ones are dropped
+    assert [cache.get(key) is not None for key in keys] == [False, False, True]
+    cache.close()
@@ -0,0 +1,78 @@
+import struct
+
+import numpy as np
+import pytest
+
+from ogre_mesh_reader import MeshFormatError, read_mesh_layout, read_mesh_summary
+
+def chunk(cid, payload):
+    return struct.pack("<HI", cid, 6 + len(payload)) + payload
+
+def grid_mesh(n=4, version="1.100"):
+    """bytes of a .mesh with one submesh of an n x n vertex grid, its positions and indices"""
+    u, v = np.meshgrid(np.arange(n, dtype=np.float32), np.arange(n, dtype=np.float32))
+    pos = np.stack([u, v, u * v], -1).reshape(-1, 3)
+    a = (np.arange(n - 1)[:, None] * n + np.arange(n - 1)[None, :]).ravel()
+    idx = np.stack([a, a + 1, a + n, a + 1, a + n + 1, a + n], 1).reshape(-1).astype(np.uint16)
+
+    # position float3 and normal float3 in one buffer
+    elems = chunk(0x5110, struct.pack("<5H", 0, 2, 1, 0, 0)) + chunk(0x5110, struct.pack("<5H", 0, 2, 4, 12, 0))
+    verts = np.hstack([pos, np.tile(np.float32([0, 0, 1]), (len(pos), 1))])
+    geom = chunk(0x5000, struct.pack("<I", len(pos)) + chunk(0x5100, elems) +
+                 chunk(0x5200, struct.pack("<2H", 0, 24) + chunk(0x5210, verts.tobytes())))
+    sub = chunk(0x4000, b"Grid\n" + struct.pack("<?I?", False, len(idx), False) + idx.tobytes() + geom)
+    lo, hi = pos.min(0), pos.max(0)
+    bounds = chunk(0x9000, struct.pack("<7f", *lo, *hi, 1.0))
+    mesh = chunk(0x3000, struct.pack("<?", False) + sub + bounds)
+    data = struct.pack("<H", 0x1000) + "[MeshSerializer_v{}]\n".format(version).encode() + mesh
+    return data, pos, idx
+
+@pytest.fixture
+def mesh_file(tmp_path):
+    def write(data, name="grid.mesh"):
+        path = tmp_path / name
+        path.write_bytes(data)
+        return str(path)
+    return write
+
+def test_summary(mesh_file):
+    data, pos, idx = grid_mesh()
+    ret = read_mesh_summary(mesh_file(data))
+
+    assert ret["name"] == "grid.mesh"
+    assert ret["shared_vertices"] is None
+    sm, = ret["submeshes"]
+    assert sm["material"] == "Grid"
+    assert sm["indices"] == len(idx)
+    assert sm["index_bits"] == 16
+    assert sm["operation"] == "Triangle List"
+    assert sm["vertices"] == len(pos)
+    assert sm["vertex_decl"] == [["Position", "float3"], ["Normal", "float3"]]
+    assert ret["bounds"]["size"] == pytest.approx(list(pos.max(0) - pos.min(0)))
+
+def test_layout_offsets(mesh_file):
+    data, pos, idx = grid_mesh()
+    ret = read_mesh_layout(mesh_file(data))
+
+    assert ret["endian"] == "<"
+    sm, = ret["submeshes"]
+    assert np.array_equal(np.frombuffer(data, np.uint16, sm["indices"], sm["index_offset"]), idx)
+
+    geom = sm["geometry"]
+    assert geom["vertices"] == len(pos)
+    offset, vertex_size = geom["buffers"][0]
+    raw = np.frombuffer(data, np.float32, geom["vertices"] * vertex_size // 4, offset)
+    assert np.array_equal(raw.reshape(-1, 6)[:, :3], pos)
+
+@pytest.mark.parametrize("data, message", [
+    (b"", "empty file"),
+    (b"\x12\x34[MeshSerializer_v1.100]\n", "not an Ogre binary file"),
+    (b"\x00\x10[MeshSerializer_v1.100]", "unterminated string"),
+    (grid_mesh(version="9.9")[0], "unknown serializer version"),
+    (grid_mesh()[0][:-10], "corrupt chunk 0x3000"),
+])
+def test_corrupt(mesh_file, data, message):
+    path = mesh_file(data)
+    for read in (read_mesh_summary, read_mesh_layout):
+        with pytest.raises(MeshFormatError, match=message):
+            read(path)
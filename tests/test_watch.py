@@ -0,0 +1,71 @@
+import os
+import time
+
+import pytest
+
+import ogre_mesh_watch
+from ogre_mesh_watch import FileWatcher, PollingWatcher
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    ret = Clock()
+    monkeypatch.setattr(ogre_mesh_watch.time, "monotonic", ret)
+    return ret
+
+def test_coalesce_until_quiet(tmp_path, clock):
+    a, b = str(tmp_path / "a.mesh"), str(tmp_path / "b.png")
+    watcher = FileWatcher()
+    watcher.watch([a, b])
+
+    watcher._changed(a)
+    clock.now += 0.2
+    watcher._changed(b)
+    watcher._changed(a)
+    clock.now += 0.2
+    assert watcher.changes(quiet=0.3) == set()  # b changed 0.2 s ago
+
+    clock.now += 0.2
+    assert watcher.changes(quiet=0.3) == {a, b}
+    assert watcher.changes(quiet=0.3) == set()
+    watcher.close()
+
+def test_unwatched_dropped(tmp_path, clock):
+    a, b = str(tmp_path / "a.mesh"), str(tmp_path / "b.png")
+    watcher = FileWatcher()
+    watcher.watch([a, b])
+    watcher._changed(a)
+    watcher._changed(str(tmp_path / "other.mesh"))
+    watcher.watch([b])
+
+    clock.now += 1
+    assert watcher.changes() == set()
+    watcher.close()
+
+def test_polling_reports_burst_once(tmp_path):
+    path = tmp_path / "a.mesh"
+    path.write_bytes(b"0")
+    watcher = PollingWatcher(0.02).start()
+    watcher.watch([str(path)])
+    time.sleep(0.1)  # first poll records the initial state
+
+    for i in range(5):
+        path.write_bytes(b"x" * (i + 2))
+        time.sleep(0.03)
+
+    deadline = time.monotonic() + 5
+    changed = set()
+    while not changed and time.monotonic() < deadline:
+        time.sleep(0.05)
+        changed = watcher.changes(quiet=0.1)
+    assert changed == {os.path.abspath(str(path))}
+
+    time.sleep(0.3)
+    assert watcher.changes(quiet=0.1) == set()
+    watcher.close()